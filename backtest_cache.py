@@ -0,0 +1,253 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Location of the on-disk tier
+BACKTEST_CACHE_DIR = os.environ.get(
+    "BACKTEST_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "backtest_cache")
+)
+
+# Results kept in memory
+BACKTEST_CACHE_MEMORY_ENTRIES = int(os.environ.get("BACKTEST_CACHE_MEMORY_ENTRIES", 64))
+
+# Size cap of the on-disk tier in megabytes (0 disables the disk tier)
+BACKTEST_CACHE_DISK_MB = float(os.environ.get("BACKTEST_CACHE_DISK_MB", 256))
+
+
+def result_key(parameters, universe, data_version):
+    """
+    Content address of a backtest result
+
+    Args:
+        parameters: Keyword arguments of run_momentum_backtest
+        universe: Universe name
+        data_version: Version of the price data (see price_source.data_version)
+
+    Returns:
+        Hex digest identifying the result
+    """
+    # Imported here: the web layer imports this module at startup, pandas is
+    # only needed once a backtest is requested
+    import pandas as pd
+
+    normalized = {
+        "universe": universe,
+        "data_version": data_version,
+        "symbols": list(parameters["symbols"]),
+        "start_date": pd.Timestamp(parameters["start_date"]).strftime('%Y-%m-%d'),
+        "end_date": pd.Timestamp(parameters["end_date"]).strftime('%Y-%m-%d'),
+        "initial_investment": float(parameters.get("initial_investment", 500000.0)),
+        "rebalance_period_days": int(parameters.get("rebalance_period_days", 14)),
+        "lookback_days": int(parameters.get("lookback_days", 20)),
+        "top_n": int(parameters.get("top_n", 10))
+    }
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class BacktestResultCache:
+    """
+    Two-tier LRU cache of backtest results
+
+    Results are addressed by result_key, so a change of parameters, universe
+    or price data version simply produces a new key; superseded entries are
+    never hit again and age out of both tiers. The memory tier holds the most
+    recently used results, the disk tier (one pickle per result) survives
+    restarts and is shared by every process using the same directory.
+    """
+
+    def __init__(
+        self,
+        directory=BACKTEST_CACHE_DIR,
+        memory_entries=BACKTEST_CACHE_MEMORY_ENTRIES,
+        disk_bytes=int(BACKTEST_CACHE_DISK_MB * 1024 * 1024)
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            directory: Directory of the disk tier
+            memory_entries: Maximum number of results kept in memory
+            disk_bytes: Size cap of the disk tier (0 disables it)
+        """
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+            "disk_errors": 0
+        }
+        if self.disk_bytes > 0:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _remember(self, key, value):
+        """Put a value in the memory tier (caller holds the lock)"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["memory_evictions"] += 1
+
+    def get(self, key):
+        """
+        Look a result up in memory, then on disk
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return self._memory[key]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, value)
+        return value
+
+    def _read_disk(self, key):
+        if self.disk_bytes <= 0:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            # Refresh the modification time, the disk tier evicts the oldest files
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable backtest cache entry {key}: {str(e)}")
+            with self._lock:
+                self._stats["disk_errors"] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, key, value):
+        """Store a result in both tiers"""
+        with self._lock:
+            self._remember(key, value)
+
+        if self.disk_bytes <= 0:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write backtest cache entry {key}: {str(e)}")
+            with self._lock:
+                self._stats["disk_errors"] += 1
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        """Return (mtime, size, path) of every disk entry"""
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_disk(self):
+        """Remove the least recently used files until the disk tier fits its cap"""
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._stats["disk_evictions"] += 1
+            if total <= self.disk_bytes:
+                break
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached result for key, computing and storing it on a miss
+
+        Args:
+            key: Result key (see result_key)
+            compute: Callable with no arguments producing the result. Results
+                that are not dictionaries or carry an "error" are not stored.
+
+        Returns:
+            Tuple of (result, hit)
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        value = compute()
+        if isinstance(value, dict) and "error" not in value and value.get("result"):
+            self.put(key, value)
+        return value, False
+
+    def clear(self):
+        """Remove every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for _, _, path in self._disk_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return hit, miss and eviction counters and the size of both tiers"""
+        entries = self._disk_entries() if self.disk_bytes > 0 else []
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None
+        stats["disk_entries"] = len(entries)
+        stats["disk_bytes"] = sum(size for _, size, _ in entries)
+        stats["disk_limit_bytes"] = self.disk_bytes
+        stats["memory_limit_entries"] = self.memory_entries
+        return stats
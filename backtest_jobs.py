@@ -0,0 +1,247 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Backtests running at the same time
+BACKTEST_JOB_WORKERS = int(os.environ.get("BACKTEST_JOB_WORKERS", 2))
+
+# Jobs allowed to wait for a worker before submissions are rejected
+BACKTEST_JOB_QUEUE = int(os.environ.get("BACKTEST_JOB_QUEUE", 16))
+
+# Seconds a finished job (and its result) is kept
+BACKTEST_JOB_TTL = int(os.environ.get("BACKTEST_JOB_TTL", 900))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+def run_momentum_backtest(**parameters):
+    """Default runner: momentum_backtest.run_momentum_backtest, imported on first use"""
+    from momentum_backtest import run_momentum_backtest as run
+    return run(**parameters)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running backtest when its job has been cancelled"""
+
+
+class _Job:
+    """State of one submitted backtest"""
+
+    def __init__(self, parameters):
+        self.id = uuid.uuid4().hex
+        self.parameters = parameters
+        self.state = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.completed = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = threading.Event()
+        self.future = None
+
+    def snapshot(self):
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+        # Report the number of symbols rather than the full list
+        parameters = dict(self.parameters)
+        if "symbols" in parameters:
+            parameters["symbols"] = len(parameters["symbols"])
+
+        return {
+            "job_id": self.id,
+            "status": self.state,
+            "parameters": parameters,
+            "progress": {
+                "completed_rebalances": self.completed,
+                "total_rebalances": self.total
+            },
+            "submitted_at": timestamp(self.submitted_at),
+            "started_at": timestamp(self.started_at),
+            "finished_at": timestamp(self.finished_at),
+            "cancel_requested": self.cancel_requested.is_set(),
+            "error": self.error
+        }
+
+
+class BacktestJobManager:
+    """
+    Run backtests in the background on a bounded pool of threads
+
+    Submitting returns a job id immediately. Jobs wait in a capped queue until
+    one of the workers is free, report per-rebalance progress while running,
+    can be cancelled, and are forgotten result_ttl_seconds after finishing.
+    Jobs live in the memory of the process that accepted them.
+    """
+
+    def __init__(
+        self,
+        max_workers=BACKTEST_JOB_WORKERS,
+        max_queued=BACKTEST_JOB_QUEUE,
+        result_ttl_seconds=BACKTEST_JOB_TTL,
+        runner=run_momentum_backtest
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            max_workers: Backtests running at the same time
+            max_queued: Jobs allowed to wait for a worker
+            result_ttl_seconds: Seconds a finished job is kept
+            runner: Callable running one backtest; receives the job parameters
+                as keyword arguments plus a progress callback
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl_seconds = result_ttl_seconds
+        self.runner = runner
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backtest-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    def _expire(self):
+        """Drop finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired:
+            logger.debug(f"Expired {len(expired)} backtest jobs")
+
+    def submit(self, **parameters):
+        """
+        Queue a backtest
+
+        Args:
+            **parameters: Keyword arguments for the runner
+
+        Returns:
+            Snapshot of the new job
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            self._expire()
+            waiting = sum(1 for job in self._jobs.values() if job.state == QUEUED)
+            if waiting >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError(f"Backtest queue is full ({waiting} jobs waiting)")
+
+            job = _Job(parameters)
+            self._jobs[job.id] = job
+            self.submitted += 1
+            job.future = self._executor.submit(self._run, job)
+
+        logger.info(f"Queued backtest job {job.id}")
+        return job.snapshot()
+
+    def _run(self, job):
+        with self._lock:
+            if job.state != QUEUED:
+                return
+            job.state = RUNNING
+            job.started_at = time.time()
+
+        def progress(completed, total):
+            if job.cancel_requested.is_set():
+                raise JobCancelled()
+            job.completed = completed
+            job.total = total
+
+        try:
+            result = self.runner(progress=progress, **job.parameters)
+            with self._lock:
+                job.result = result
+                job.state = SUCCEEDED
+            logger.info(f"Backtest job {job.id} finished")
+        except JobCancelled:
+            with self._lock:
+                job.state = CANCELLED
+            logger.info(f"Backtest job {job.id} cancelled")
+        except Exception as e:
+            with self._lock:
+                job.error = str(e)
+                job.state = FAILED
+            logger.error(f"Backtest job {job.id} failed: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if it is unknown or expired"""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def result(self, job_id):
+        """
+        Return the state and result of a job
+
+        Returns:
+            Tuple of (snapshot, result); result is None unless the job succeeded.
+            Both are None if the job is unknown or expired.
+        """
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None, None
+            return job.snapshot(), job.result
+
+    def cancel(self, job_id):
+        """
+        Cancel a job
+
+        A queued job is removed from the queue. A running job stops at its next
+        rebalance. Finished jobs are left as they are.
+
+        Returns:
+            Snapshot of the job, or None if it is unknown or expired
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.state == QUEUED and job.future.cancel():
+                job.state = CANCELLED
+                job.finished_at = time.time()
+            elif job.state in (QUEUED, RUNNING):
+                job.cancel_requested.set()
+            return job.snapshot()
+
+    def stats(self):
+        """Return queue and job counters"""
+        with self._lock:
+            self._expire()
+            states = [job.state for job in self._jobs.values()]
+            return {
+                "workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "queued": states.count(QUEUED),
+                "running": states.count(RUNNING),
+                "finished": sum(1 for state in states if state in FINISHED_STATES),
+                "submitted": self.submitted,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,201 @@
+import os
+import time
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from momentum_backtest import MomentumBacktest
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of combinations a single sweep may run
+MAX_SWEEP_COMBINATIONS = int(os.environ.get("MAX_SWEEP_COMBINATIONS", 5000))
+
+# Upper bound on the worker processes of a single sweep
+MAX_SWEEP_PROCESSES = int(os.environ.get("MAX_SWEEP_PROCESSES", os.cpu_count() or 1))
+
+SWEEP_COLUMNS = [
+    "lookback_days",
+    "rebalance_period_days",
+    "top_n",
+    "total_return_pct",
+    "annualized_return_pct",
+    "max_drawdown_pct",
+    "turnover_pct",
+    "number_of_rebalances"
+]
+
+# Per-process state of sweep workers, set by _init_worker
+_worker = {}
+
+
+def _evaluate(price_df, symbols, start_date, end_date, initial_investment, combination):
+    """Run one backtest on pre-loaded prices and return its table row"""
+    lookback_days, rebalance_period_days, top_n = combination
+    backtest = MomentumBacktest(
+        symbols=symbols,
+        start_date=start_date,
+        end_date=end_date,
+        initial_investment=initial_investment,
+        rebalance_period_days=rebalance_period_days,
+        lookback_days=lookback_days,
+        top_n=top_n,
+        price_df=price_df
+    )
+    result = backtest.run_backtest()
+    if not result:
+        return [lookback_days, rebalance_period_days, top_n, None, None, None, None, 0]
+
+    max_drawdown = backtest.max_drawdown()
+    return [
+        lookback_days,
+        rebalance_period_days,
+        top_n,
+        round(result['total_return_pct'], 4),
+        round(result['annualized_return_pct'], 4),
+        None if np.isnan(max_drawdown) else round(max_drawdown * 100, 4),
+        round(result['turnover_pct'], 4),
+        result['number_of_rebalances']
+    ]
+
+
+def _init_worker(shm_name, shape, dates, symbols, start_date, end_date, initial_investment):
+    """Attach a sweep worker to the shared price matrix"""
+    # Keep worker output quiet, every backtest logs its progress
+    logging.getLogger("momentum_backtest").setLevel(logging.WARNING)
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker.update({
+        "shm": shm,
+        "price_df": pd.DataFrame(values, index=pd.DatetimeIndex(dates), columns=symbols, copy=False),
+        "symbols": symbols,
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_investment": initial_investment
+    })
+
+
+def _run_chunk(combinations):
+    """Evaluate a chunk of combinations inside a sweep worker"""
+    return [
+        _evaluate(
+            _worker["price_df"],
+            _worker["symbols"],
+            _worker["start_date"],
+            _worker["end_date"],
+            _worker["initial_investment"],
+            combination
+        )
+        for combination in combinations
+    ]
+
+
+def run_parameter_sweep(
+    symbols,
+    start_date=None,
+    end_date=None,
+    initial_investment=500000.0,
+    lookback_days=(20,),
+    rebalance_period_days=(14,),
+    top_n=(10,),
+    processes=None,
+    price_df=None
+):
+    """
+    Run momentum backtests over a grid of parameters
+
+    The price matrix is loaded once. With more than one process it is copied
+    into a shared memory block that every worker maps directly, so tasks only
+    carry the parameter tuples.
+
+    Args:
+        symbols: List of stock symbols
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        initial_investment: Initial investment amount in Rs
+        lookback_days: Momentum lookback windows to try
+        rebalance_period_days: Rebalance periods to try
+        top_n: Portfolio sizes to try
+        processes: Worker processes (default: CPU count, 1 runs in-process),
+            capped at MAX_SWEEP_PROCESSES
+        price_df: Optional pre-loaded price panel (dates x symbols)
+
+    Returns:
+        Dictionary with the sweep parameters, a compact table ("columns" and
+        "rows", one row per combination) and timing information
+    """
+    start = time.perf_counter()
+    grid = {}
+    for name, values in (("lookback_days", lookback_days), ("rebalance_period_days", rebalance_period_days), ("top_n", top_n)):
+        grid[name] = sorted(set(int(v) for v in values))
+        if not grid[name] or grid[name][0] <= 0:
+            raise ValueError(f"{name} must be positive integers, got {list(values)}")
+    combinations = list(itertools.product(grid["lookback_days"], grid["rebalance_period_days"], grid["top_n"]))
+    if len(combinations) > MAX_SWEEP_COMBINATIONS:
+        raise ValueError(f"Sweep has {len(combinations)} combinations, the limit is {MAX_SWEEP_COMBINATIONS}")
+    if processes is not None and processes <= 0:
+        raise ValueError(f"processes must be a positive integer, got {processes}")
+
+    # Load the price matrix once for every combination
+    loader = MomentumBacktest(symbols=symbols, start_date=start_date, end_date=end_date, price_df=price_df)
+    if not loader.download_data():
+        raise RuntimeError("Failed to download data for the parameter sweep")
+    prices = loader.price_df.sort_index().astype(np.float64)
+    start_date, end_date = loader.start_date, loader.end_date
+    symbols = list(prices.columns)
+    load_seconds = time.perf_counter() - start
+
+    processes = processes or os.cpu_count() or 1
+    processes = max(1, min(processes, MAX_SWEEP_PROCESSES, len(combinations)))
+    logger.info(f"Running {len(combinations)} backtest combinations on {processes} processes")
+
+    if processes == 1:
+        rows = [
+            _evaluate(prices, symbols, start_date, end_date, initial_investment, combination)
+            for combination in combinations
+        ]
+    else:
+        values = np.ascontiguousarray(prices.to_numpy())
+        shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+
+            # A few chunks per process keeps workers busy without per-task overhead
+            chunk_size = max(1, len(combinations) // (processes * 4))
+            chunks = [combinations[i:i + chunk_size] for i in range(0, len(combinations), chunk_size)]
+
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(shm.name, values.shape, prices.index.values, symbols,
+                          start_date, end_date, initial_investment)
+            ) as executor:
+                rows = [row for chunk_rows in executor.map(_run_chunk, chunks) for row in chunk_rows]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Parameter sweep of {len(combinations)} combinations completed in {elapsed:.2f}s")
+
+    return {
+        "parameters": {
+            "start_date": start_date,
+            "end_date": end_date,
+            "initial_investment": float(initial_investment),
+            "symbols": len(symbols),
+            "combinations": len(combinations),
+            "processes": processes
+        },
+        "columns": SWEEP_COLUMNS,
+        "rows": rows,
+        "timing": {
+            "load_seconds": round(load_seconds, 4),
+            "total_seconds": round(elapsed, 4)
+        }
+    }
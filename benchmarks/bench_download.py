@@ -0,0 +1,75 @@
+"""
+Benchmark of the batch download scheduler.
+
+Downloads a universe through BatchDownloader with a fake batch fetch that
+sleeps for a fixed latency (and fails a fraction of attempts), once as the
+sequential loop did before the scheduler (one batch at a time, 0.1 s pause
+between batches) and once with the default concurrency and rate limit. The
+throughput of both comes from BatchDownloader.last_stats. The scheduler
+cannot go faster than DOWNLOAD_RATE batches per second, so its gain over the
+loop grows with the batch latency:
+
+    python -m benchmarks.bench_download
+"""
+import time
+import random
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from download_scheduler import BatchDownloader
+from price_source import DOWNLOAD_BATCH_SIZE, DOWNLOAD_WORKERS, DOWNLOAD_RATE, SyntheticPriceSource
+
+UNIVERSE_SIZE = 100
+LATENCY_SECONDS = 1.0
+FAILURE_RATE = 0.05
+
+
+def fake_fetch(latency=LATENCY_SECONDS, failure_rate=FAILURE_RATE, seed=0):
+    """Batch fetch that takes `latency` seconds and fails a fraction of attempts"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    index = pd.bdate_range("2024-01-01", periods=250)
+
+    def fetch(batch):
+        time.sleep(latency)
+        with lock:
+            failed = rng.random() < failure_rate
+        if failed:
+            raise ConnectionError("connection reset")
+        return pd.DataFrame(np.ones((len(index), len(batch))), index=index, columns=batch)
+    return fetch
+
+
+def run(universe_size=UNIVERSE_SIZE, latency=LATENCY_SECONDS, failure_rate=FAILURE_RATE):
+    """
+    Download a universe sequentially and through the scheduler
+
+    Returns:
+        Dictionary with the last_stats of both downloads and the speedup
+    """
+    symbols = SyntheticPriceSource.universe(universe_size)
+    # The previous loop paused 0.1 s after every batch
+    sequential = BatchDownloader(
+        fake_fetch(latency + 0.1, failure_rate),
+        batch_size=DOWNLOAD_BATCH_SIZE, max_workers=1, rate=0, base_delay=0.1
+    )
+    scheduled = BatchDownloader(
+        fake_fetch(latency, failure_rate),
+        batch_size=DOWNLOAD_BATCH_SIZE, max_workers=DOWNLOAD_WORKERS, rate=DOWNLOAD_RATE, base_delay=0.1
+    )
+    sequential.download(symbols)
+    scheduled.download(symbols)
+    return {
+        "latency_seconds": latency,
+        "sequential": sequential.last_stats,
+        "scheduled": scheduled.last_stats,
+        "speedup": round(scheduled.last_stats["symbols_per_second"] / sequential.last_stats["symbols_per_second"], 2)
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    print(run())
@@ -0,0 +1,61 @@
+"""
+Benchmark of the momentum rankings path at increasing universe sizes.
+
+Runs offline against the synthetic price source:
+
+    python -m benchmarks.bench_rankings
+"""
+import time
+import logging
+import warnings
+
+import momentumnifty100
+from price_source import SyntheticPriceSource
+
+UNIVERSE_SIZES = [100, 500, 2000]
+REPEATS = 20
+
+
+def _best_of(func, repeats=REPEATS):
+    """Best wall time of repeated calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def run(sizes=UNIVERSE_SIZES, repeats=REPEATS):
+    """
+    Time the rankings path for each universe size
+
+    Returns:
+        List of dictionaries with the timings (milliseconds) per size
+    """
+    source = SyntheticPriceSource(seed=1)
+    results = []
+    for size in sizes:
+        symbols = SyntheticPriceSource.universe(size)
+        panel = source.fetch(symbols, period="1y")
+        returns_5d = momentumnifty100.calculate_period_returns(momentumnifty100.slice_duration(panel, "5d"), "5d")
+        returns_3mo = momentumnifty100.calculate_period_returns(momentumnifty100.slice_duration(panel, "3mo"), "3mo")
+
+        results.append({
+            "symbols": size,
+            "select_performers_ms": round(_best_of(lambda: momentumnifty100.select_performers(returns_5d), repeats), 4),
+            "compare_top_10_ms": round(_best_of(lambda: momentumnifty100.compare_top_10(returns_5d, returns_3mo), repeats), 4),
+            "nlargest_baseline_ms": round(_best_of(
+                lambda: (returns_5d.nlargest(10), returns_5d.nsmallest(10)), repeats), 4),
+            "get_momentum_data_ms": round(_best_of(
+                lambda: momentumnifty100.get_momentum_data(price_data=panel, symbol_list=symbols),
+                max(1, repeats // 4)), 4)
+        })
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    warnings.simplefilter("ignore", FutureWarning)
+    for row in run():
+        print(row)
@@ -0,0 +1,124 @@
+"""
+Benchmark of the holdings report of run_momentum_backtest.
+
+Compares the array-based report builder with the previous per-stock
+formatting loop at 50 holdings and 500 rebalances, offline against the
+synthetic price source:
+
+    python -m benchmarks.bench_report
+"""
+import time
+import logging
+import warnings
+
+import numpy as np
+
+from momentum_backtest import MomentumBacktest
+from price_source import SyntheticPriceSource
+
+HOLDINGS = 50
+REBALANCES = 500
+UNIVERSE_SIZE = 200
+REPEATS = 3
+
+
+def _best_of(func, repeats=REPEATS):
+    """Best wall time of repeated calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def _legacy_price(backtest, symbol, date):
+    """Price lookup of the previous report, one label lookup per call"""
+    try:
+        return backtest.price_df.loc[date, symbol]
+    except (KeyError, ValueError):
+        return np.nan
+
+
+def _legacy_portfolio_value(backtest, holdings, date, cash):
+    """Portfolio valuation of the previous report, one price lookup per stock"""
+    value = cash
+    for symbol, shares in holdings.items():
+        price = _legacy_price(backtest, symbol, date)
+        if not np.isnan(price):
+            value += shares * price
+    return value
+
+
+def legacy_report(backtest):
+    """Holdings report as formatted before the report builder (one portfolio valuation per stock)"""
+    formatted_holdings_history = []
+    for entry in backtest.holdings_history:
+        date = entry['date']
+        holdings = entry['holdings']
+        cash = entry['cash']
+
+        stock_details = []
+        for symbol, shares in holdings.items():
+            price = _legacy_price(backtest, symbol, date)
+            value = shares * price
+            stock_details.append({
+                'symbol': symbol,
+                'shares': float(shares),
+                'price': float(price),
+                'value': float(value),
+                'percentage': float(value / (_legacy_portfolio_value(backtest, holdings, date, cash)) * 100)
+            })
+
+        stock_details.sort(key=lambda x: x['value'], reverse=True)
+        formatted_holdings_history.append({'date': date, 'holdings': stock_details, 'cash': float(cash)})
+    return formatted_holdings_history
+
+
+def _same_report(left, right):
+    if len(left) != len(right):
+        return False
+    for a, b in zip(left, right):
+        if a['date'] != b['date'] or [h['symbol'] for h in a['holdings']] != [h['symbol'] for h in b['holdings']]:
+            return False
+        if not np.allclose([h['percentage'] for h in a['holdings']], [h['percentage'] for h in b['holdings']]):
+            return False
+    return True
+
+
+def run(holdings=HOLDINGS, rebalances=REBALANCES, repeats=REPEATS):
+    """
+    Build the holdings report of one backtest with both implementations
+
+    Returns:
+        Dictionary with the report size and timings (milliseconds)
+    """
+    source = SyntheticPriceSource(seed=1, start="2018-01-01", end="2024-12-31")
+    symbols = SyntheticPriceSource.universe(UNIVERSE_SIZE)
+    panel = source.history(symbols)
+
+    # Daily rebalances on consecutive trading days
+    dates = panel.index[panel.index >= "2020-01-01"]
+    backtest = MomentumBacktest(
+        symbols,
+        start_date=dates[0].strftime('%Y-%m-%d'),
+        end_date=dates[rebalances].strftime('%Y-%m-%d'),
+        rebalance_period_days=1,
+        top_n=holdings,
+        price_df=panel
+    )
+    backtest.run_backtest()
+
+    return {
+        "holdings": holdings,
+        "rebalances": len(backtest.holdings_history),
+        "matches_legacy": _same_report(backtest.holdings_report(), legacy_report(backtest)),
+        "report_builder_ms": round(_best_of(backtest.holdings_report, repeats), 2),
+        "legacy_ms": round(_best_of(lambda: legacy_report(backtest), 1), 2)
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    warnings.simplefilter("ignore", FutureWarning)
+    print(run())
@@ -0,0 +1,86 @@
+"""
+Benchmark of backtest response encoding: row format vs columnar format.
+
+Runs offline against the synthetic price source and reports payload bytes
+(raw, gzip and, when installed, brotli) and encoding time of both formats:
+
+    python -m benchmarks.bench_serialization
+"""
+import gzip
+import json
+import time
+import logging
+import warnings
+
+from flask import Flask
+
+import serialization
+from momentum_backtest import run_momentum_backtest
+from price_source import SyntheticPriceSource
+
+# (symbols, years of daily rebalances)
+SCENARIOS = [(25, 1), (100, 5), (100, 10)]
+REPEATS = 5
+
+
+def _best_of(func, repeats=REPEATS):
+    """Best wall time of repeated calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def _sizes(body):
+    sizes = {"raw_bytes": len(body), "gzip_bytes": len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))}
+    if serialization.brotli is not None:
+        sizes["brotli_bytes"] = len(serialization.brotli.compress(body, quality=serialization.BROTLI_QUALITY))
+    return sizes
+
+
+def run(scenarios=SCENARIOS, repeats=REPEATS):
+    """
+    Encode a daily-rebalanced backtest result in both formats
+
+    Returns:
+        List of dictionaries with payload sizes and encoding times per scenario
+    """
+    app = Flask(__name__)
+    source = SyntheticPriceSource(seed=1, start="2014-01-01", end="2024-12-31")
+    results = []
+    for size, years in scenarios:
+        symbols = SyntheticPriceSource.universe(size)
+        panel = source.history(symbols)
+        result = run_momentum_backtest(
+            symbols,
+            start_date=f"{2024 - years}-12-31",
+            end_date="2024-12-31",
+            rebalance_period_days=1,
+            price_df=panel
+        )
+
+        with app.app_context():
+            # Flask's default provider, as used by jsonify
+            rows_body = app.json.dumps(result).encode()
+            rows_ms = _best_of(lambda: app.json.dumps(result).encode(), repeats)
+        columnar_body = serialization.dumps(serialization.columnar_backtest(result))
+        columnar_ms = _best_of(lambda: serialization.dumps(serialization.columnar_backtest(result)), repeats)
+
+        results.append({
+            "symbols": size,
+            "years": years,
+            "rebalances": result["result"]["number_of_rebalances"],
+            "serializer": "orjson" if serialization.orjson is not None else "json",
+            "rows": dict(_sizes(rows_body), encode_ms=round(rows_ms, 2)),
+            "columnar": dict(_sizes(columnar_body), encode_ms=round(columnar_ms, 2))
+        })
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    warnings.simplefilter("ignore", FutureWarning)
+    for row in run():
+        print(json.dumps(row))
@@ -0,0 +1,84 @@
+"""
+Import-time budget of the web application.
+
+Imports `main` in fresh interpreters and fails (exit status 1) when the best
+cold import takes longer than the budget or when importing it loads one of
+the heavy analytics dependencies, which must only load on first use:
+
+    python -m benchmarks.import_budget
+    IMPORT_BUDGET_MS=250 python -m benchmarks.import_budget --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Best cold import time of `main` allowed, in milliseconds
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", 300))
+
+# Modules that must not be imported by `import main`
+LAZY_MODULES = ["numpy", "pandas", "yfinance", "sqlalchemy", "momentumnifty100", "momentum_backtest", "price_source", "intraday"]
+
+RUNS = 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "loaded": [name for name in %r if name in sys.modules]}))
+"""
+
+
+def measure(runs=RUNS, lazy_modules=LAZY_MODULES):
+    """
+    Import main in `runs` fresh interpreters
+
+    Returns:
+        Dictionary with the best and worst import time (milliseconds) and the
+        lazy modules that were loaded anyway
+    """
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE % (lazy_modules,)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        # Application logging may print before the probe's result line
+        sample = json.loads(output.strip().splitlines()[-1])
+        timings.append(sample["ms"])
+        loaded.update(sample["loaded"])
+    return {
+        "runs": runs,
+        "best_ms": round(min(timings), 2),
+        "worst_ms": round(max(timings), 2),
+        "eagerly_loaded": sorted(loaded)
+    }
+
+
+def check(result, budget_ms=IMPORT_BUDGET_MS):
+    """Return the list of budget violations of a measure() result"""
+    failures = []
+    if result["best_ms"] > budget_ms:
+        failures.append(f"import main took {result['best_ms']} ms, budget is {budget_ms} ms")
+    if result["eagerly_loaded"]:
+        failures.append(f"import main loaded {', '.join(result['eagerly_loaded'])}; these must load lazily (see engines.py)")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=RUNS, help="Fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS, help="Allowed best import time")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    failures = check(result, args.budget_ms)
+    print(json.dumps(dict(result, budget_ms=args.budget_ms, ok=not failures)))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
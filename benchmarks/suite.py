@@ -0,0 +1,306 @@
+"""
+Benchmark suite of the momentum and backtest engines.
+
+Runs offline against the synthetic price source and times, for every
+universe size and history length of the sweep:
+
+- momentumnifty100.get_momentum_data on a pre-loaded panel
+- safe_download through the price store (cold load, warm read, tail merge)
+- MomentumBacktest.run_backtest and the run_momentum_backtest report
+- the momentum analysis and backtest routes through the Flask test client
+
+Results are written as JSON (default: data/benchmarks/suite-<commit>.json) so
+runs of different commits can be compared:
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 25,100 --histories 3mo,1y --repeats 1
+    python -m benchmarks.suite --compare data/benchmarks/suite-<old>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import warnings
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import momentumnifty100
+import price_source
+import price_store
+import universes
+from momentum_backtest import MomentumBacktest, run_momentum_backtest
+from price_source import SyntheticPriceSource
+
+UNIVERSE_SIZES = [25, 100, 500, 2000]
+HISTORIES = ["3mo", "1y", "5y", "10y"]
+REPEATS = 3
+
+# Years of synthetic history generated, enough for the longest history plus
+# the backtest buffer
+GENERATED_YEARS = 11
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "benchmarks")
+
+
+class _RemoteSyntheticSource(SyntheticPriceSource):
+    """Synthetic prices routed through the price store like a remote source"""
+
+    name = "synthetic-remote"
+    remote = True
+
+
+def _best_of(func, repeats=REPEATS, setup=None):
+    """Best wall time of repeated calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _window(panel, history):
+    """Trailing rows of a panel covering a history length ("3mo", "10y")"""
+    start = pd.Timestamp(price_store.period_start(history, today=panel.index[-1]))
+    return panel.loc[panel.index >= start]
+
+
+def bench_momentum(panel, symbols, repeats):
+    """Rankings of every duration on a pre-loaded panel"""
+    return {
+        "get_momentum_data_ms": _best_of(
+            lambda: momentumnifty100.get_momentum_data(price_data=panel, symbol_list=symbols), repeats)
+    }
+
+
+def bench_safe_download(source, symbols, history, repeats):
+    """
+    safe_download served from a temporary price store
+
+    cold: empty store, every bar is fetched and written
+    warm: every symbol checked recently, the store is read as is
+    merge: the last bars are missing, only the tail is fetched and merged
+    """
+    root = tempfile.mkdtemp(prefix="bench-store-")
+    previous_source = price_source.get_price_source()
+    previous_store = price_store._stores.get("1d")
+    try:
+        price_source.set_price_source(source)
+
+        def empty_store():
+            shutil.rmtree(root, ignore_errors=True)
+            price_store._stores["1d"] = price_store.PriceStore(root=root)
+
+        def download():
+            return momentumnifty100.safe_download(symbols, period=history, interval="1d")
+
+        cold_ms = _best_of(download, repeats, setup=empty_store)
+        warm_ms = _best_of(download, repeats)
+
+        # Store that last checked the source a week ago, before the last bars
+        def stale_store():
+            empty_store()
+            store = price_store._stores["1d"]
+            start = price_store.period_start(history)
+            panel = source.fetch(symbols, start=start)
+            cutoff = panel.index[-5]
+            store.write(panel.loc[panel.index < cutoff], covered_from=start, checked_at=time.time() - 7 * 86400)
+
+        merge_ms = _best_of(download, repeats, setup=stale_store)
+        return {"safe_download_cold_ms": cold_ms, "safe_download_warm_ms": warm_ms, "safe_download_merge_ms": merge_ms}
+    finally:
+        price_source.set_price_source(previous_source)
+        if previous_store is not None:
+            price_store._stores["1d"] = previous_store
+        else:
+            price_store._stores.pop("1d", None)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_backtest(panel, symbols, history, repeats):
+    """Vectorized backtest and the report of run_momentum_backtest over the history"""
+    start_date = price_store.period_start(history, today=panel.index[-1])
+    end_date = panel.index[-1].strftime('%Y-%m-%d')
+
+    def backtest():
+        engine = MomentumBacktest(symbols, start_date=start_date, end_date=end_date, price_df=panel)
+        engine.run_backtest()
+        return engine
+
+    engine = backtest()
+    return {
+        "rebalances": len(engine.holdings_history),
+        "run_backtest_ms": _best_of(backtest, repeats),
+        "holdings_report_ms": _best_of(engine.holdings_report, repeats),
+        "run_momentum_backtest_ms": _best_of(
+            lambda: run_momentum_backtest(symbols, start_date, end_date, price_df=panel), repeats)
+    }
+
+
+def bench_routes(client, routes_module, universe, history, end_date, repeats):
+    """Momentum analysis and backtest routes, computed (caches cleared) and cached"""
+    start_date = price_store.period_start(history, today=end_date)
+    analysis_url = f"/api/momentum-analysis?universe={universe}"
+    backtest_url = f"/api/momentum-backtest?universe={universe}&start_date={start_date}&end_date={end_date}"
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+        return response
+
+    def clear():
+        routes_module.momentum_cache.clear()
+        routes_module.backtest_cache.clear()
+
+    return {
+        "route_momentum_analysis_ms": _best_of(lambda: get(analysis_url), repeats, setup=clear),
+        "route_momentum_analysis_cached_ms": _best_of(lambda: get(analysis_url), repeats),
+        "route_backtest_ms": _best_of(lambda: get(backtest_url), repeats, setup=clear),
+        "route_backtest_cached_ms": _best_of(lambda: get(backtest_url), repeats),
+        "route_backtest_bytes": len(get(backtest_url).get_data())
+    }
+
+
+def _load_routes(source):
+    """Import the Flask app with the synthetic source and a memory-only backtest cache"""
+    price_source.set_price_source(source)
+    import routes
+    from app import app
+    from backtest_cache import BacktestResultCache
+
+    logging.getLogger().setLevel(logging.WARNING)
+    routes.backtest_cache = BacktestResultCache(disk_bytes=0)
+    return routes, app.test_client()
+
+
+def run(sizes=UNIVERSE_SIZES, histories=HISTORIES, repeats=REPEATS, include_routes=True):
+    """
+    Run the suite
+
+    Args:
+        sizes: Universe sizes
+        histories: History lengths as periods ("3mo", "1y", "10y")
+        repeats: Repeats per measurement (the best time is reported)
+        include_routes: Also time the Flask routes
+
+    Returns:
+        Dictionary with run metadata and one result per size and history
+    """
+    today = pd.Timestamp(datetime.now().date())
+    generated_from = (today - pd.DateOffset(years=GENERATED_YEARS)).strftime('%Y-%m-%d')
+    source = SyntheticPriceSource(seed=1, start=generated_from)
+    remote_source = _RemoteSyntheticSource(seed=1, start=generated_from)
+
+    routes_module, client = _load_routes(source) if include_routes else (None, None)
+
+    results = []
+    for size in sizes:
+        symbols = SyntheticPriceSource.universe(size)
+        universe = f"bench{size}"
+        universes.register_universe(universe, symbols)
+        full_panel = source.history(symbols)
+        end_date = full_panel.index[-1].strftime('%Y-%m-%d')
+
+        for history in histories:
+            panel = _window(full_panel, history)
+            row = {"symbols": size, "history": history, "bars": len(panel)}
+            row.update(bench_momentum(panel, symbols, repeats))
+            row.update(bench_safe_download(remote_source, symbols, history, repeats))
+            row.update(bench_backtest(full_panel, symbols, history, repeats))
+            if include_routes:
+                row.update(bench_routes(client, routes_module, universe, history, end_date, repeats))
+
+            row = {key: round(value, 3) if isinstance(value, float) else value for key, value in row.items()}
+            print(json.dumps(row), file=sys.stderr)
+            results.append(row)
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "repeats": repeats,
+        "results": results
+    }
+
+
+def compare(baseline, current):
+    """
+    Ratio of current to baseline timings for the cases present in both runs
+
+    Returns:
+        List of dictionaries with symbols, history and one ratio per timing
+        (above 1 means slower than the baseline)
+    """
+    previous = {(row["symbols"], row["history"]): row for row in baseline["results"]}
+    ratios = []
+    for row in current["results"]:
+        base = previous.get((row["symbols"], row["history"]))
+        if base is None:
+            continue
+        entry = {"symbols": row["symbols"], "history": row["history"]}
+        for key, value in row.items():
+            if key.endswith("_ms") and base.get(key):
+                entry[key[:-3]] = round(value / base[key], 3)
+        ratios.append(entry)
+    return ratios
+
+
+def _parse_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(map(str, UNIVERSE_SIZES)), help="Comma separated universe sizes")
+    parser.add_argument("--histories", default=",".join(HISTORIES), help="Comma separated history lengths")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Repeats per measurement")
+    parser.add_argument("--no-routes", action="store_true", help="Skip the Flask route benchmarks")
+    parser.add_argument("--output", help="Result file (default: data/benchmarks/suite-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    warnings.simplefilter("ignore", FutureWarning)
+
+    report = run(
+        sizes=[int(size) for size in _parse_list(args.sizes)],
+        histories=_parse_list(args.histories),
+        repeats=args.repeats,
+        include_routes=not args.no_routes
+    )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"suite-{report['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for row in compare(baseline, report):
+            print(json.dumps(row))
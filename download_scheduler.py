@@ -0,0 +1,216 @@
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BATCH_SECONDS = metrics.histogram(
+    "price_download_batch_seconds",
+    "Duration of one batch download attempt",
+    ["outcome"]
+)
+BATCH_RETRIES = metrics.counter("price_download_retries", "Batch download attempts that were retried")
+BATCH_FAILURES = metrics.counter("price_download_failed_batches", "Batches skipped after the last retry")
+# Throughput of the scheduler: rate(price_download_symbols) / rate(price_download_seconds_sum)
+DOWNLOAD_SYMBOLS = metrics.counter("price_download_symbols", "Symbols requested through the download scheduler")
+DOWNLOAD_SECONDS = metrics.histogram("price_download_seconds", "Duration of a whole download (all batches)")
+
+
+class PermanentDownloadError(Exception):
+    """Raised by a batch fetch for failures that retrying cannot fix"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter
+
+    Tokens are added continuously at `rate` per second up to `capacity`.
+    acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the bucket
+
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            capacity: Maximum burst size (default: max(1, rate))
+            clock: Monotonic clock function, injectable for testing
+            sleep: Sleep function, injectable for testing
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available and consume them"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Tolerate rounding, or a refill that falls a hair short would
+                # ask for a wait too small to move the clock
+                if self._tokens >= tokens - 1e-9:
+                    self._tokens = max(0.0, self._tokens - tokens)
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=30.0):
+    """
+    Exponential backoff with jitter
+
+    Returns a delay drawn uniformly from the upper half of the exponential
+    window, so retries of concurrent batches do not line up.
+
+    Args:
+        attempt: Zero-based retry attempt
+        base_delay: Delay of the first retry in seconds
+        max_delay: Upper bound of the window in seconds
+    """
+    window = min(max_delay, base_delay * (2 ** attempt))
+    return window / 2 + random.uniform(0, window / 2)
+
+
+class BatchDownloader:
+    """
+    Download a symbol universe in concurrent, rate-limited batches
+
+    The universe is split into batches that are fetched on a bounded thread
+    pool. Every attempt first takes a token from a shared TokenBucket, failed
+    attempts are retried with exponential backoff and jitter, and the batch
+    results are merged once at the end.
+    """
+
+    def __init__(
+        self,
+        fetch_batch,
+        batch_size=5,
+        max_workers=4,
+        rate=2.0,
+        burst=None,
+        max_retries=3,
+        base_delay=1.0,
+        max_delay=30.0,
+        sleep=time.sleep,
+        clock=time.monotonic
+    ):
+        """
+        Initialize the downloader
+
+        Args:
+            fetch_batch: Callable fetch_batch(symbols) returning a DataFrame of
+                prices (dates x symbols); it should raise on failure, with
+                PermanentDownloadError if the batch is not worth retrying
+            batch_size: Symbols per batch
+            max_workers: Maximum concurrent batches
+            rate: Batch requests allowed per second
+            burst: Maximum burst of batch requests (default: max_workers)
+            max_retries: Attempts per batch
+            base_delay: First retry delay in seconds
+            max_delay: Maximum retry delay in seconds
+            sleep: Sleep function, injectable for testing
+            clock: Monotonic clock of the rate limiter, injectable for testing
+        """
+        self.fetch_batch = fetch_batch
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max(1, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.limiter = TokenBucket(rate, burst if burst is not None else self.max_workers, clock=clock, sleep=sleep)
+        self.last_stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _run_batch(self, batch_idx, batch, total_batches, stats):
+        for attempt in range(self.max_retries):
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                logger.debug(f"Downloading batch {batch_idx+1}/{total_batches}, attempt {attempt+1}")
+                frame = self.fetch_batch(batch)
+                BATCH_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+                return frame
+            except Exception as e:
+                BATCH_SECONDS.observe(time.perf_counter() - start, outcome="error")
+                logger.error(f"Error downloading batch {batch_idx+1} (attempt {attempt+1}/{self.max_retries}): {str(e)}")
+                if isinstance(e, PermanentDownloadError):
+                    break
+                if attempt < self.max_retries - 1:
+                    delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                    with self._stats_lock:
+                        stats["retries"] += 1
+                    BATCH_RETRIES.inc()
+                    logger.debug(f"Retrying in {delay:.2f} seconds...")
+                    self.sleep(delay)
+
+        logger.warning(f"Giving up on batch {batch_idx+1}, skipping")
+        with self._stats_lock:
+            stats["failed_batches"] += 1
+        BATCH_FAILURES.inc()
+        return None
+
+    def download(self, symbol_list):
+        """
+        Download prices for all symbols
+
+        Args:
+            symbol_list: List of symbols
+
+        Returns:
+            DataFrame indexed by date with one column per symbol, in the order
+            of symbol_list. Symbols without data are filled with NaN.
+        """
+        start = time.perf_counter()
+        batches = [symbol_list[i:i + self.batch_size] for i in range(0, len(symbol_list), self.batch_size)]
+        stats = {"retries": 0, "failed_batches": 0}
+        logger.info(f"Downloading data in {len(batches)} batches of size {self.batch_size} "
+                    f"with {min(self.max_workers, max(1, len(batches)))} workers")
+
+        if len(batches) <= 1:
+            frames = [self._run_batch(i, batch, len(batches), stats) for i, batch in enumerate(batches)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)),
+                                    thread_name_prefix="price-download") as executor:
+                futures = [executor.submit(self._run_batch, i, batch, len(batches), stats)
+                           for i, batch in enumerate(batches)]
+                frames = [future.result() for future in futures]
+
+        # Merge all batches in a single concat
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if frames:
+            all_data = pd.concat(frames, axis=1)
+            all_data = all_data.loc[:, ~all_data.columns.duplicated()]
+            all_data = all_data.reindex(columns=list(symbol_list))
+        else:
+            all_data = pd.DataFrame(np.nan, index=pd.DatetimeIndex([]), columns=list(symbol_list))
+
+        elapsed = time.perf_counter() - start
+        DOWNLOAD_SYMBOLS.inc(len(symbol_list))
+        DOWNLOAD_SECONDS.observe(elapsed)
+        self.last_stats = {
+            "symbols": len(symbol_list),
+            "batches": len(batches),
+            "failed_batches": stats["failed_batches"],
+            "retries": stats["retries"],
+            "seconds": round(elapsed, 4),
+            "symbols_per_second": round(len(symbol_list) / elapsed, 2) if elapsed > 0 else None
+        }
+        logger.info(f"Download completed, final data shape: {all_data.shape}, stats: {self.last_stats}")
+        return all_data
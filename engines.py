@@ -0,0 +1,64 @@
+import time
+import logging
+import importlib
+
+logger = logging.getLogger(__name__)
+
+# Analytics modules that pull in numpy, pandas and yfinance. The web layer
+# only reaches them through the lazy handles below, so importing the app (and
+# answering /api/health) does not load them.
+ENGINE_MODULES = [
+    "price_source",
+    "momentumnifty100",
+    "momentum_backtest",
+    "backtest_sweep",
+    "intraday"
+]
+
+
+class LazyModule:
+    """
+    Module handle that imports the module on first attribute access
+
+    The import goes through importlib, so concurrent first accesses are
+    serialized by the import system and every later access is a lookup in
+    sys.modules.
+    """
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name}>"
+
+
+price_source = LazyModule("price_source")
+momentumnifty100 = LazyModule("momentumnifty100")
+momentum_backtest = LazyModule("momentum_backtest")
+backtest_sweep = LazyModule("backtest_sweep")
+intraday = LazyModule("intraday")
+
+# SQL storage (SQLAlchemy); not warmed up, it is only loaded when configured
+storage = LazyModule("storage")
+
+
+def warm_up():
+    """
+    Import every analytics engine now
+
+    Called in the gunicorn master when the app is preloaded (the workers fork
+    with the engines already in memory) or on a background thread of a fresh
+    worker, so the first analysis request does not pay for the imports.
+
+    Returns:
+        Seconds spent importing
+    """
+    start = time.perf_counter()
+    for name in ENGINE_MODULES:
+        importlib.import_module(name)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Analytics engines loaded in {elapsed:.2f}s")
+    return elapsed
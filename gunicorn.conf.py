@@ -0,0 +1,36 @@
+# Gunicorn settings, picked up automatically by `gunicorn main:app`
+import os
+import threading
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+# GUNICORN_PRELOAD=1 imports the app and the analytics engines once in the
+# master; workers fork with numpy, pandas and the engines already loaded and
+# share those pages. Off by default so a cold (autoscaled) instance starts
+# answering /api/health before the engines are loaded.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+# Load the engines in the background of a fresh worker (ENGINE_WARM_UP=0 to
+# load them on the first request instead)
+warm_up_workers = os.environ.get("ENGINE_WARM_UP", "1") == "1"
+
+
+def when_ready(server):
+    """Warm the engines and publish the shared price matrix before the workers are forked."""
+    if preload_app:
+        import engines
+        server.log.info(f"Preloaded analytics engines in {engines.warm_up():.2f}s")
+    import price_store
+    if price_store.STORE_ENABLED:
+        # Workers then map the stored history instead of each publishing it
+        # from a request thread on their first refresh
+        price_store.get_store().publish_matrix()
+
+
+def post_worker_init(worker):
+    """Start loading the engines without delaying the worker's first response."""
+    if not preload_app and warm_up_workers:
+        import engines
+        threading.Thread(target=engines.warm_up, name="engine-warm-up", daemon=True).start()
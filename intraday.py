@@ -0,0 +1,323 @@
+import math
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import price_source
+from momentumnifty100 import select_performers
+
+logger = logging.getLogger(__name__)
+
+# Supported bar intervals and their length in minutes
+INTERVAL_MINUTES = {
+    "5m": 5,
+    "15m": 15,
+    "1h": 60
+}
+
+# Intraday windows in trading minutes; "1d" is one full NSE session
+# (09:15-15:30). An interval only offers the windows at least one bar long.
+INTRADAY_WINDOW_MINUTES = {
+    "15m": 15,
+    "30m": 30,
+    "1h": 60,
+    "2h": 120,
+    "1d": 375
+}
+
+# NSE session used by the synthetic bar stream
+SESSION_OPEN = "09:15"
+SESSION_MINUTES = 375
+
+# Calendar days fetched to fill an empty buffer
+LOOKBACK_DAYS = 7
+
+# Sessions replayed when the price source is synthetic
+SYNTHETIC_SESSIONS = 5
+
+
+class IntradayUnavailableError(Exception):
+    """Raised when the configured price source has no intraday bars"""
+
+
+def window_bars(interval):
+    """
+    Bars covered by each intraday window at an interval
+
+    Args:
+        interval: One of the keys of INTERVAL_MINUTES
+
+    Returns:
+        Dictionary mapping window label to its length in bars
+    """
+    if interval not in INTERVAL_MINUTES:
+        raise ValueError(f"Unsupported intraday interval: {interval} (use one of {', '.join(INTERVAL_MINUTES)})")
+    minutes = INTERVAL_MINUTES[interval]
+    return {
+        window: math.ceil(window_minutes / minutes)
+        for window, window_minutes in INTRADAY_WINDOW_MINUTES.items()
+        if window_minutes >= minutes
+    }
+
+
+class IntradayMomentum:
+    """
+    Rolling intraday returns over a ring buffer of recent bars
+
+    The closes of the last `capacity` bars are kept in a preallocated
+    (capacity x symbols) array, forward filled so a symbol without a bar
+    keeps its last close. Ingesting a bar writes one row and updates the
+    return of every window with a single gather and divide over all
+    symbols; nothing is reallocated or rebuilt.
+    """
+
+    def __init__(self, symbols, interval="5m"):
+        """
+        Initialize the buffer
+
+        Args:
+            symbols: List of symbols (columns of every ingested bar)
+            interval: Bar interval, one of the keys of INTERVAL_MINUTES
+        """
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.windows = window_bars(interval)
+        self._window_lengths = np.array(list(self.windows.values()), dtype=np.intp)
+        self.capacity = int(self._window_lengths.max()) + 1
+
+        self._prices = np.full((self.capacity, len(self.symbols)), np.nan)
+        self._returns = np.zeros((len(self.windows), len(self.symbols)))
+        # Time of the latest bar in minutes since the epoch
+        self._last_minute = None
+        self._head = -1
+        self.bars = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_time(self):
+        """Time of the latest bar, or None before the first one"""
+        return pd.Timestamp(self._last_minute, unit="m") if self.bars else None
+
+    def ingest(self, timestamp, closes):
+        """
+        Add one bar for every symbol and update the rolling returns
+
+        A bar with the time of the latest one replaces it (a revision of the
+        bar still forming); older bars are ignored.
+
+        Args:
+            timestamp: Bar time (anything numpy converts to datetime64)
+            closes: Float array of closes aligned with symbols, NaN where a
+                symbol has no bar
+
+        Returns:
+            True if the bar was ingested
+        """
+        minute = int(np.datetime64(timestamp, "m").astype(np.int64))
+        with self._lock:
+            if self.bars and minute <= self._last_minute:
+                if minute < self._last_minute:
+                    return False
+                # Revision of the latest bar: rewrite it on top of the bar before
+                row = self._head
+                previous = self._prices[(row - 1) % self.capacity] if self.bars > 1 else None
+            else:
+                row = (self._head + 1) % self.capacity
+                previous = self._prices[self._head] if self.bars else None
+                self._head = row
+                self.bars += 1
+                self._last_minute = minute
+
+            prices = self._prices[row]
+            if previous is None:
+                prices[:] = closes
+            else:
+                prices[:] = previous
+                np.copyto(prices, closes, where=~np.isnan(closes))
+
+            # Every window reaches back at most to the oldest buffered bar
+            lengths = self._window_lengths if self.bars >= self.capacity else np.minimum(self._window_lengths, self.bars - 1)
+            np.divide(prices, self._prices[(row - lengths) % self.capacity], out=self._returns)
+            self._returns -= 1.0
+            return True
+
+    def ingest_frame(self, bars):
+        """
+        Ingest a panel of bars (indexed by time, one column per symbol)
+
+        Bars up to the latest ingested one are skipped, so the panel of a
+        repeated fetch can be passed as is.
+
+        Returns:
+            Number of bars ingested
+        """
+        frame = bars.reindex(columns=self.symbols)
+        last = self.last_time
+        if last is not None:
+            frame = frame.loc[frame.index >= last]
+        values = frame.to_numpy(dtype=np.float64)
+        ingested = 0
+        for timestamp, closes in zip(frame.index.values, values):
+            ingested += self.ingest(timestamp, closes)
+        return ingested
+
+    def returns(self, window):
+        """Series of the current return of every symbol over a window"""
+        with self._lock:
+            return pd.Series(self._returns[list(self.windows).index(window)].copy(), index=self.symbols)
+
+    def snapshot(self):
+        """
+        Top and bottom performers of every intraday window
+
+        Returns:
+            Dictionary in the get_momentum_data response format with one
+            entry per window, plus the interval, the time of the latest bar
+            and the number of bars buffered
+        """
+        with self._lock:
+            returns = self._returns.copy()
+            buffered = min(self.bars, self.capacity)
+            last_time = self.last_time
+
+        results = {
+            "interval": self.interval,
+            "as_of": last_time.isoformat() if last_time is not None else None,
+            "bars": buffered,
+            "windows": list(self.windows)
+        }
+        for i, window in enumerate(self.windows):
+            if buffered <= 1:
+                results[window] = {"top_performers": {"No Data": 0}, "bottom_performers": {"No Data": 0}}
+                continue
+            top_performers, bottom_performers = select_performers(pd.Series(returns[i], index=self.symbols))
+            results[window] = {
+                "top_performers": top_performers,
+                "bottom_performers": bottom_performers
+            }
+        return results
+
+
+def synthetic_bars(symbols, interval="5m", sessions=1, start=None, seed=42, volatility=0.25):
+    """
+    Seeded intraday bar stream for offline replay
+
+    Bars follow geometric Brownian motion over consecutive NSE sessions,
+    starting from the closes of the synthetic daily source for the same seed.
+
+    Args:
+        symbols: List of symbols
+        interval: One of the keys of INTERVAL_MINUTES
+        sessions: Number of trading sessions
+        start: First session date (default: `sessions` business days before today)
+        seed: Random seed
+        volatility: Annual volatility of every symbol
+
+    Returns:
+        DataFrame of closes indexed by bar time, one column per symbol
+    """
+    minutes = INTERVAL_MINUTES[interval]
+    if start is None:
+        start = pd.Timestamp(datetime.now().date()) - pd.offsets.BDay(sessions)
+    days = pd.bdate_range(start, periods=sessions)
+    offsets = pd.to_timedelta(np.arange(0, SESSION_MINUTES, minutes), unit="m")
+    times = pd.DatetimeIndex([day + pd.Timedelta(SESSION_OPEN + ":00") + offset for day in days for offset in offsets])
+
+    opens = price_source.SyntheticPriceSource(seed=seed).history(symbols).iloc[-1].to_numpy()
+    rng = np.random.default_rng(seed)
+    # One session has 75 five-minute steps; scale the annual volatility to a bar
+    step_volatility = volatility * np.sqrt(minutes / (SESSION_MINUTES * 252))
+    log_returns = step_volatility * rng.standard_normal((len(times), len(symbols)))
+    log_returns[0] = 0.0
+    return pd.DataFrame(opens * np.exp(np.cumsum(log_returns, axis=0)), index=times, columns=list(symbols))
+
+
+def replay(engine, bars, callback=None):
+    """
+    Feed a recorded or synthetic bar panel to an engine one bar at a time
+
+    Args:
+        engine: IntradayMomentum
+        bars: DataFrame of closes indexed by bar time
+        callback: Optional function called with the engine after every bar
+
+    Returns:
+        The engine
+    """
+    frame = bars.reindex(columns=engine.symbols)
+    for timestamp, closes in zip(frame.index.values, frame.to_numpy(dtype=np.float64)):
+        if engine.ingest(timestamp, closes) and callback is not None:
+            callback(engine)
+    return engine
+
+
+def check_source(source=None):
+    """
+    Make sure a price source can feed the intraday engine
+
+    Sources flagged `intraday` are fetched directly and the synthetic source
+    is replaced by synthetic_bars; daily-only sources are rejected.
+
+    Raises:
+        IntradayUnavailableError: If the source only has daily bars
+    """
+    source = source or price_source.get_price_source()
+    if not source.intraday and not isinstance(source, price_source.SyntheticPriceSource):
+        raise IntradayUnavailableError(f"The {source.name} price source has no intraday bars")
+    return source
+
+
+def fetch_bars(symbol_list, interval, start):
+    """
+    Intraday bars of the symbols from a date on
+
+    Args:
+        symbol_list: Symbols to fetch
+        interval: One of the keys of INTERVAL_MINUTES
+        start: First date (datetime.date)
+
+    Returns:
+        DataFrame of closes indexed by bar time, one column per symbol
+    """
+    source = check_source()
+    if isinstance(source, price_source.SyntheticPriceSource):
+        # Same stream for the whole day, so repeated fetches line up
+        bars = synthetic_bars(symbol_list, interval, sessions=SYNTHETIC_SESSIONS, seed=source.seed)
+        return bars.loc[bars.index >= pd.Timestamp(start)]
+    return source.fetch(list(symbol_list), start=start.strftime("%Y-%m-%d"), interval=interval)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_intraday_momentum(symbol_list, interval="5m"):
+    """
+    Intraday momentum of a symbol list, brought up to date from the price source
+
+    The ring buffer of each symbol list and interval lives for the process;
+    every call fetches the bars since the latest ingested one and ingests
+    only those.
+
+    Args:
+        symbol_list: Symbols to rank
+        interval: One of the keys of INTERVAL_MINUTES
+
+    Returns:
+        Dictionary from IntradayMomentum.snapshot
+    """
+    key = (tuple(symbol_list), interval)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = IntradayMomentum(symbol_list, interval)
+
+    last = engine.last_time
+    start = last.date() if last is not None else datetime.now().date() - timedelta(days=LOOKBACK_DAYS)
+    bars = fetch_bars(symbol_list, interval, start)
+    ingested = engine.ingest_frame(bars)
+    logger.info(f"Ingested {ingested} {interval} bars for {len(symbol_list)} symbols (latest: {engine.last_time})")
+    return engine.snapshot()
@@ -1,13 +1,34 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import logging
 
+import metrics
+import price_source
+import price_store
+from momentum_index import CumulativeReturnIndex, forward_fill
+
 logger = logging.getLogger(__name__)
 
+# Calendar days of prices loaded before the start date for the first momentum
+BUFFER_DAYS = 30
+
+# Trading days per year used to annualize daily risk metrics
+TRADING_DAYS_PER_YEAR = 252
+
+STAGE_SECONDS = metrics.histogram(
+    "backtest_stage_seconds",
+    "Duration of the stages of a backtest (download, ranking, simulation, formatting)",
+    ["stage"]
+)
+
+def buffer_start_date(start_date):
+    """First date of the price data a backtest starting on start_date reads"""
+    return (datetime.strptime(start_date, '%Y-%m-%d') - timedelta(days=BUFFER_DAYS)).strftime('%Y-%m-%d')
+
 class MomentumBacktest:
-    def __init__(self, symbols, start_date=None, end_date=None, initial_investment=500000.0, rebalance_period_days=14):
+    def __init__(self, symbols, start_date=None, end_date=None, initial_investment=500000.0, rebalance_period_days=14,
+                 lookback_days=20, top_n=10, price_df=None):
         """
         Initialize the backtest with parameters
         
@@ -17,8 +38,15 @@ class MomentumBacktest:
             end_date: Ending date for backtest (default: today)
             initial_investment: Starting capital in Rs
             rebalance_period_days: Number of days between rebalancing
+            lookback_days: Number of days to look back for momentum calculation
+            top_n: Number of top momentum stocks to hold
+            price_df: Optional pre-loaded price panel (dates x symbols); when
+                given no data is downloaded
         """
         self.symbols = symbols
+        self.lookback_days = lookback_days
+        self.top_n = top_n
+        self.preloaded_prices = price_df
         
         # Set default dates if not provided
         if end_date is None:
@@ -41,54 +69,48 @@ class MomentumBacktest:
         self.portfolio_values = []
         self.holdings_history = []
         self.rebalance_dates = []
+        self.turnover_history = []
+        
+        # (row, held columns, shares, cash) after every executed rebalance
+        self._segments = []
+        self._curve = None
+        
+        # Cumulative return index over price_df, built on first use
+        self.momentum_index = None
+        self._indexed_prices = None
         
         logger.info(f"Initializing backtest from {self.start_date} to {self.end_date}")
     
     def download_data(self):
-        """Download historical data for all symbols"""
-        logger.info(f"Downloading data for {len(self.symbols)} symbols")
+        """Load historical data for all symbols from the configured price source"""
+        logger.info(f"Loading data for {len(self.symbols)} symbols")
         
         try:
             # Use a buffer period before start_date to calculate initial momentum
-            buffer_start = (datetime.strptime(self.start_date, '%Y-%m-%d') - timedelta(days=30)).strftime('%Y-%m-%d')
+            buffer_start = buffer_start_date(self.start_date)
             
-            # Download data with buffer
-            self.stock_data = yf.download(
-                self.symbols,
-                start=buffer_start,
-                end=self.end_date,
-                group_by='ticker',
-                interval='1d',
-                progress=False,
-                threads=False,
-                timeout=30
-            )
+            if self.preloaded_prices is not None:
+                # Positional slice of the requested window (a view, no copy)
+                index = self.preloaded_prices.index
+                lo = index.searchsorted(pd.Timestamp(buffer_start), side='left')
+                hi = index.searchsorted(pd.Timestamp(self.end_date), side='left')
+                self.price_df = self.preloaded_prices.iloc[lo:hi]
+                logger.debug(f"Using pre-loaded data, shape: {self.price_df.shape}")
+                return True
             
-            # Restructure the data for easier access
-            self.prices = {}
+            source = price_source.get_price_source()
             
-            # Handle different return structures based on number of symbols
-            if len(self.symbols) == 1:
-                symbol = self.symbols[0]
-                if 'Adj Close' in self.stock_data.columns:
-                    self.prices[symbol] = self.stock_data['Adj Close']
-                else:
-                    self.prices[symbol] = self.stock_data['Close']
+            if source.remote and price_store.STORE_ENABLED:
+                # Only bars missing from the local store are downloaded
+                self.price_df = price_store.get_store().load(
+                    self.symbols,
+                    start=buffer_start,
+                    end=self.end_date,
+                    fetch=lambda symbols, start, end: source.fetch(symbols, start=start, end=end)
+                )
             else:
-                for symbol in self.symbols:
-                    try:
-                        self.prices[symbol] = self.stock_data[(symbol, 'Adj Close')]
-                    except KeyError:
-                        try:
-                            self.prices[symbol] = self.stock_data[(symbol, 'Close')]
-                        except KeyError:
-                            logger.warning(f"No price data for {symbol}, filling with NaN")
-                            # Create a series of NaNs with the same index
-                            sample_symbol = next(iter(self.prices))
-                            self.prices[symbol] = pd.Series(np.nan, index=self.prices[sample_symbol].index)
+                self.price_df = source.fetch(self.symbols, start=buffer_start, end=self.end_date)
             
-            # Convert to DataFrame
-            self.price_df = pd.DataFrame(self.prices)
             logger.info(f"Downloaded data shape: {self.price_df.shape}")
             return True
             
@@ -96,37 +118,36 @@ class MomentumBacktest:
             logger.error(f"Error downloading data: {str(e)}")
             return False
     
-    def calculate_momentum(self, current_date, lookback_days=20):
+    def calculate_momentum(self, current_date, lookback_days=None):
         """
         Calculate momentum for all stocks as of a specific date
         
         Args:
             current_date: The date to calculate momentum for
             lookback_days: Number of days to look back for momentum calculation
+                (default: self.lookback_days)
         
         Returns:
             Series of momentum values sorted from highest to lowest
         """
+        lookback_days = lookback_days if lookback_days is not None else self.lookback_days
         try:
-            # Get data up to current date
-            mask = self.price_df.index <= current_date
-            data_subset = self.price_df.loc[mask].copy()
+            index = self._get_momentum_index()
             
-            if len(data_subset) <= 1:
+            # Row of the last market date up to current date
+            position = index.position(current_date)
+            if position < 1:
                 logger.warning(f"Not enough data points for {current_date}")
                 return pd.Series()
-                
-            # Calculate returns over the lookback period
-            latest_prices = data_subset.iloc[-1]
             
-            # Find the price lookback_days ago (or closest available)
-            if len(data_subset) >= lookback_days:
-                past_prices = data_subset.iloc[-lookback_days]
-            else:
-                past_prices = data_subset.iloc[0]
+            # Find the row lookback_days ago (or the first available)
+            past_position = position + 1 - lookback_days if position + 1 >= lookback_days else 0
             
-            # Calculate percentage change
-            momentum = (latest_prices - past_prices) / past_prices
+            # Percentage change, NaN where either price is missing
+            momentum = pd.Series(
+                index.returns_between(position, past_position, require_valid=True),
+                index=index.columns
+            )
             
             # Sort by momentum (highest first)
             momentum = momentum.sort_values(ascending=False)
@@ -140,101 +161,239 @@ class MomentumBacktest:
             logger.error(f"Error calculating momentum for {current_date}: {str(e)}")
             return pd.Series()
     
-    def run_backtest(self):
-        """Run the backtest simulation"""
+    def _get_momentum_index(self):
+        """Return the cumulative return index of price_df, rebuilding it if the prices changed"""
+        if self.momentum_index is None or self._indexed_prices is not self.price_df:
+            self.momentum_index = CumulativeReturnIndex(self.price_df)
+            self._indexed_prices = self.price_df
+        return self.momentum_index
+    
+    def _rebalance_positions(self):
+        """
+        Find the row of price_df used for every rebalance
+        
+        Rebalances are scheduled every rebalance_period_days calendar days from
+        start_date and executed on the first market date on or after each
+        scheduled date. The schedule stops at the first date past the data.
+        
+        Returns:
+            Array of row positions into price_df (may contain repeats)
+        """
+        start = np.datetime64(self.start_date, 'D')
+        end = np.datetime64(self.end_date, 'D')
+        calendar = np.arange(start, end + 1, self.rebalance_period_days).astype('datetime64[ns]')
+        
+        market_dates = self.price_df.index.values
+        positions = np.searchsorted(market_dates, calendar, side='left')
+        
+        # Stop at the first scheduled date with no market date on or after it
+        past_end = np.flatnonzero(positions >= len(market_dates))
+        if len(past_end):
+            positions = positions[:past_end[0]]
+        return positions
+    
+    def _momentum_matrix(self, positions, lookback_days=None):
+        """
+        Calculate momentum for every rebalance at once
+        
+        Row i matches calculate_momentum(price_df.index[positions[i]]): the
+        return from lookback_days rows back (or the first row) to the
+        rebalance row. Rebalances on the first row have no momentum.
+        
+        Args:
+            positions: Row positions of the rebalances
+            lookback_days: Number of days to look back for momentum calculation
+                (default: self.lookback_days)
+        
+        Returns:
+            Array of shape (rebalances, symbols) with NaN where unavailable
+        """
+        lookback_days = lookback_days if lookback_days is not None else self.lookback_days
+        past_positions = np.where(positions + 1 >= lookback_days, positions + 1 - lookback_days, 0)
+        
+        # One subtraction per symbol on the cumulative return index
+        momentum = self._get_momentum_index().returns_between(positions, past_positions, require_valid=True)
+        
+        # A single data point is not enough to calculate momentum
+        momentum[positions == 0] = np.nan
+        return momentum
+    
+    def run_backtest(self, progress=None):
+        """
+        Run the backtest simulation
+        
+        Args:
+            progress: Optional callable receiving (completed_rebalances,
+                total_rebalances) before every rebalance and once at the end.
+                An exception raised by it aborts the backtest.
+        
+        Returns:
+            Result dictionary, or False if no data could be loaded
+        """
         logger.info("Starting backtest simulation")
         
+        if not self.prepare():
+            return False
+        
+        with STAGE_SECONDS.time(stage="simulation"):
+            for _ in self.iter_rebalances(progress=progress):
+                pass
+            
+            result = self.build_result()
+        logger.info(f"Backtest completed: {result}")
+        return result
+    
+    def prepare(self):
+        """
+        Load the price data and rank the stocks for every rebalance
+        
+        Returns:
+            True if the simulation can run, False if no data could be loaded
+        """
         # Download the historical data
-        if not self.download_data():
+        with STAGE_SECONDS.time(stage="download"):
+            downloaded = self.download_data()
+        if not downloaded:
             logger.error("Failed to download data, cannot continue backtest")
             return False
         
-        # Initialize portfolio
-        portfolio_value = self.initial_investment
-        cash = portfolio_value  # Start with all cash
-        holdings = {}  # No initial holdings
+        if not self.price_df.index.is_monotonic_increasing:
+            self.price_df = self.price_df.sort_index()
+        
+        # Dense price matrix used by the vectorized engine
+        self._price_matrix = self.price_df.to_numpy(dtype=np.float64)
+        
+        # Momentum ranking for every rebalance in one pass
+        with STAGE_SECONDS.time(stage="ranking"):
+            self._positions = self._rebalance_positions()
+            momentum = self._momentum_matrix(self._positions)
+            self._valid_counts = (~np.isnan(momentum)).sum(axis=1)
+            rank_keys = np.where(np.isnan(momentum), np.inf, -momentum)
+            self._top_n = min(self.top_n, momentum.shape[1])
+            self._rankings = np.argsort(rank_keys, axis=1, kind='stable')[:, :self._top_n]
+        return True
+    
+    @property
+    def total_rebalances(self):
+        """Number of rebalance dates of the prepared backtest"""
+        return len(self._positions)
+    
+    def iter_rebalances(self, progress=None):
+        """
+        Run the simulation one rebalance at a time
         
-        # Generate rebalance dates
-        current_date = datetime.strptime(self.start_date, '%Y-%m-%d')
-        end_date = datetime.strptime(self.end_date, '%Y-%m-%d')
+        Must be called after prepare(). Results are recorded as the iterator
+        advances, so build_result() and get_performance_summary() describe the
+        rebalances consumed so far.
+        
+        Args:
+            progress: Optional progress callback, see run_backtest
         
-        # Ensure we only use market dates that exist in our data
+        Yields:
+            Dictionary per executed rebalance with the date, holdings (shares
+            per symbol), prices of the held symbols, cash and portfolio value
+        """
+        positions = self._positions
         market_dates = self.price_df.index
+        columns = np.array(self.price_df.columns)
+        top_n = self._top_n
+        
+        # Initialize portfolio
+        portfolio_value = self.initial_investment
+        cash = portfolio_value  # Start with all cash
+        held = np.array([], dtype=np.intp)  # Column positions of holdings
+        shares = np.array([], dtype=np.float64)
         
         # Track results
         self.portfolio_values = []
         self.holdings_history = []
         self.rebalance_dates = []
-        
-        # Run simulation
-        while current_date <= end_date:
-            current_date_str = current_date.strftime('%Y-%m-%d')
-            
-            # Find the next closest market date
-            next_market_date = self._find_closest_market_date(current_date_str, market_dates)
+        self.turnover_history = []
+        self._segments = []
+        self._curve = None
+        
+        # Run simulation; each step only touches the handful of held columns
+        for i, position in enumerate(positions):
+            if progress is not None:
+                progress(i, len(positions))
             
-            if next_market_date is None:
-                # No more market dates
-                break
+            next_market_date = market_dates[position]
+            row = self._price_matrix[position]
             
-            logger.info(f"Rebalancing on {next_market_date}")
+            logger.debug(f"Rebalancing on {next_market_date}")
             self.rebalance_dates.append(next_market_date)
             
-            # Get top momentum stocks
-            momentum = self.calculate_momentum(next_market_date)
-            
-            if len(momentum) == 0:
+            if self._valid_counts[i] == 0:
                 logger.warning(f"No momentum data for {next_market_date}, skipping")
-                current_date += timedelta(days=self.rebalance_period_days)
                 continue
             
-            # Take top 10 or fewer if not enough stocks
-            top_stocks = momentum.head(min(10, len(momentum)))
+            # Take top N or fewer if not enough stocks
+            top = self._rankings[i, :min(top_n, self._valid_counts[i])]
             
-            # Calculate current portfolio value before rebalancing
-            current_value = self._calculate_portfolio_value(holdings, next_market_date, cash)
-            logger.info(f"Portfolio value before rebalancing: Rs {current_value:.2f}")
+            # Calculate current portfolio value before rebalancing (missing prices are skipped)
+            old_values = np.nan_to_num(shares * row[held])
+            old_held = held
+            old_cash = cash
+            current_value = cash + old_values.sum()
+            logger.debug(f"Portfolio value before rebalancing: Rs {current_value:.2f}")
             
-            # Sell all current holdings
+            # Sell all current holdings and allocate equally to top momentum stocks
             cash = current_value
-            holdings = {}
+            amount_per_stock = cash / len(top)
             
-            # Allocate equally to top momentum stocks
-            amount_per_stock = cash / len(top_stocks)
+            prices = row[top]
+            buyable = ~np.isnan(prices) & (prices > 0)
+            held = top[buyable]
+            shares = amount_per_stock / prices[buyable]
+            cash -= np.sum(shares * prices[buyable])
             
-            # Buy new portfolio
-            for symbol in top_stocks.index:
-                price = self._get_price(symbol, next_market_date)
-                if not np.isnan(price) and price > 0:
-                    shares = amount_per_stock / price
-                    holdings[symbol] = shares
-                    cash -= shares * price
-                    logger.debug(f"Bought {shares:.2f} shares of {symbol} at Rs {price:.2f}")
+            # One-way turnover: half of the absolute change in position and
+            # cash values (1 for a full rotation, 0 when nothing is traded)
+            turnover = None
+            if current_value > 0:
+                trades = np.zeros(len(columns))
+                np.add.at(trades, old_held, -old_values)
+                np.add.at(trades, held, shares * prices[buyable])
+                traded = np.abs(trades).sum() + abs(cash - old_cash)
+                turnover = traded / 2 / current_value
+                self.turnover_history.append(turnover)
             
             # Record holdings after rebalancing
+            self._segments.append((position, held, shares, cash))
+            held_symbols = columns[held].tolist()
+            holdings = dict(zip(held_symbols, shares))
             self.holdings_history.append({
                 'date': next_market_date,
-                'holdings': holdings.copy(),
+                'holdings': holdings,
                 'cash': cash
             })
             
             # Record portfolio value after rebalancing
-            portfolio_value = self._calculate_portfolio_value(holdings, next_market_date, cash)
+            portfolio_value = cash + np.nansum(shares * row[held])
             self.portfolio_values.append({
                 'date': next_market_date,
                 'value': portfolio_value
             })
             
-            logger.info(f"Portfolio value after rebalancing: Rs {portfolio_value:.2f}")
+            logger.debug(f"Portfolio value after rebalancing: Rs {portfolio_value:.2f}")
             
-            # Move to next rebalance date
-            current_date += timedelta(days=self.rebalance_period_days)
+            yield {
+                'date': next_market_date,
+                'holdings': holdings,
+                'prices': dict(zip(held_symbols, prices[buyable].tolist())),
+                'cash': float(cash),
+                'value': float(portfolio_value),
+                'turnover': None if turnover is None else float(turnover)
+            }
         
+        if progress is not None:
+            progress(len(positions), len(positions))
+    
+    def build_result(self):
+        """Result dictionary of the rebalances simulated so far"""
         # Calculate final portfolio value using the most recent market date
         # and the final holdings
-        final_market_date = None
         if self.portfolio_values:
-            final_market_date = self.portfolio_values[-1]['date']
             final_value = self.portfolio_values[-1]['value']
         else:
             final_value = self.initial_investment
@@ -252,57 +411,163 @@ class MomentumBacktest:
         else:
             annualized_return = 0
         
-        result = {
+        return {
             'initial_investment': float(self.initial_investment),
             'final_value': float(final_value),
             'total_return_rs': float(final_value - self.initial_investment),
             'total_return_pct': float(total_return_pct),
             'annualized_return_pct': float(annualized_return),
             'days_held': days_held,
-            'number_of_rebalances': len(self.rebalance_dates)
+            'number_of_rebalances': len(self.rebalance_dates),
+            'turnover_pct': float(np.mean(self.turnover_history) * 100) if self.turnover_history else 0.0,
+            'risk_metrics': self.risk_metrics()
         }
-        
-        logger.info(f"Backtest completed: {result}")
-        return result
     
-    def _find_closest_market_date(self, date_str, market_dates):
-        """Find the closest market date on or after the given date"""
-        date_obj = pd.Timestamp(date_str)
+    def equity_curve(self):
+        """
+        Daily mark-to-market portfolio value
+        
+        Between two rebalances the holdings are fixed, so the value of every
+        day in the segment is cash plus the segment's price block times the
+        share vector. Missing prices carry the last known price forward. The
+        cost is O(days x holdings) with one matrix product per rebalance.
+        
+        Returns:
+            Series of portfolio values indexed by market date, from the first
+            executed rebalance to the last date of the data (empty if nothing
+            was simulated)
+        """
+        if not self._segments:
+            return pd.Series(dtype=np.float64)
+        
+        # Reuse the curve until another rebalance is simulated
+        if self._curve is not None and self._curve[0] == len(self._segments):
+            return self._curve[1]
         
-        # Find dates on or after the given date
-        future_dates = market_dates[market_dates >= date_obj]
+        first = self._segments[0][0]
+        last = len(self._price_matrix)
+        values = np.empty(last - first, dtype=np.float64)
+        ends = [segment[0] for segment in self._segments[1:]] + [last]
         
-        if len(future_dates) == 0:
-            return None
+        for (position, held, shares, cash), end in zip(self._segments, ends):
+            block = forward_fill(self._price_matrix[position:end][:, held])
+            values[position - first:end - first] = cash + np.nan_to_num(block) @ shares
         
-        return future_dates[0]
+        curve = pd.Series(values, index=self.price_df.index[first:last])
+        self._curve = (len(self._segments), curve)
+        return curve
     
-    def _get_price(self, symbol, date):
-        """Get the price of a symbol on a specific date"""
-        try:
-            return self.price_df.loc[date, symbol]
-        except (KeyError, ValueError):
-            logger.warning(f"Price not found for {symbol} on {date}")
-            return np.nan
+    def risk_metrics(self, curve=None, risk_free_rate=0.0):
+        """
+        Risk and return statistics of the daily equity curve
+        
+        Args:
+            curve: Optional equity curve (default: equity_curve())
+            risk_free_rate: Annual risk-free rate used by Sharpe and Sortino
+        
+        Returns:
+            Dictionary with annualized return, volatility, Sharpe, Sortino,
+            max drawdown (peak to trough, with its dates), Calmar and turnover.
+            Statistics that are undefined for the curve are None.
+        """
+        curve = self.equity_curve() if curve is None else curve
+        values = curve.to_numpy(dtype=np.float64)
+        days = len(values)
+        
+        metrics = {
+            'trading_days': days,
+            'annualized_return_pct': None,
+            'volatility_pct': None,
+            'sharpe_ratio': None,
+            'sortino_ratio': None,
+            'max_drawdown_pct': None,
+            'max_drawdown_peak': None,
+            'max_drawdown_trough': None,
+            'calmar_ratio': None,
+            'turnover_pct': float(np.mean(self.turnover_history) * 100) if self.turnover_history else 0.0,
+            'annual_turnover_pct': None
+        }
+        if days < 2 or values[0] <= 0:
+            return metrics
+        
+        years = (days - 1) / TRADING_DAYS_PER_YEAR
+        returns = values[1:] / values[:-1] - 1
+        excess = returns - risk_free_rate / TRADING_DAYS_PER_YEAR
+        
+        # Drawdown from the running peak
+        peaks = np.maximum.accumulate(values)
+        drawdowns = 1 - values / peaks
+        trough = int(np.argmax(drawdowns))
+        peak = int(np.argmax(values[:trough + 1]))
+        max_drawdown = float(drawdowns[trough])
+        
+        annualized = (values[-1] / values[0]) ** (1 / years) - 1 if values[-1] > 0 else -1.0
+        volatility = float(np.std(returns, ddof=1)) if len(returns) > 1 else 0.0
+        downside = float(np.sqrt(np.mean(np.minimum(excess, 0) ** 2)))
+        
+        metrics.update({
+            'annualized_return_pct': float(annualized * 100),
+            'volatility_pct': float(volatility * np.sqrt(TRADING_DAYS_PER_YEAR) * 100),
+            'sharpe_ratio': float(np.mean(excess) / volatility * np.sqrt(TRADING_DAYS_PER_YEAR)) if volatility > 0 else None,
+            'sortino_ratio': float(np.mean(excess) / downside * np.sqrt(TRADING_DAYS_PER_YEAR)) if downside > 0 else None,
+            'max_drawdown_pct': max_drawdown * 100,
+            'max_drawdown_peak': curve.index[peak].strftime('%Y-%m-%d'),
+            'max_drawdown_trough': curve.index[trough].strftime('%Y-%m-%d'),
+            'calmar_ratio': float(annualized / max_drawdown) if max_drawdown > 0 else None,
+            'annual_turnover_pct': float(np.sum(self.turnover_history) / years * 100)
+        })
+        return metrics
     
-    def _calculate_portfolio_value(self, holdings, date, cash):
-        """Calculate the total portfolio value on a specific date"""
-        value = cash
+    def holdings_report(self):
+        """
+        Holdings history with share count, price, value and weight per stock
         
-        for symbol, shares in holdings.items():
-            price = self._get_price(symbol, date)
-            if not np.isnan(price):
-                value += shares * price
+        The prices of every rebalance are gathered from the price matrix in
+        one indexed read and each portfolio total is computed once.
         
-        return value
+        Returns:
+            List with one dictionary per executed rebalance (date, holdings
+            sorted by value, cash)
+        """
+        if not self._segments:
+            return []
+        
+        positions = np.array([segment[0] for segment in self._segments])
+        counts = np.array([len(segment[1]) for segment in self._segments])
+        held = np.concatenate([segment[1] for segment in self._segments]).astype(np.intp)
+        shares = np.concatenate([segment[2] for segment in self._segments]).astype(np.float64)
+        cash = np.array([segment[3] for segment in self._segments], dtype=np.float64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        
+        prices = self._price_matrix[np.repeat(positions, counts), held]
+        symbols = np.array(self.price_df.columns)[held]
+        breakdown = _holdings_breakdown(symbols, shares, prices, cash, offsets)
+        
+        return [
+            {'date': entry['date'], 'holdings': holdings, 'cash': float(entry['cash'])}
+            for entry, holdings in zip(self.holdings_history, breakdown)
+        ]
+    
+    def max_drawdown(self):
+        """
+        Largest peak-to-trough fall of the daily equity curve
+        
+        Returns:
+            Max drawdown as a fraction of the peak value, or NaN with fewer
+            than two days
+        """
+        values = self.equity_curve().to_numpy(dtype=np.float64)
+        if len(values) < 2:
+            return np.nan
+        
+        return float(np.max(1 - values / np.maximum.accumulate(values)))
     
     def get_performance_summary(self):
         """Generate a summary of the backtest performance"""
         if not self.portfolio_values:
             return "Backtest has not been run yet."
         
-        # Extract values and dates
-        dates = [entry['date'] for entry in self.portfolio_values]
+        # Extract values
         values = [entry['value'] for entry in self.portfolio_values]
         
         # Ensure we have values to work with
@@ -317,23 +582,18 @@ class MomentumBacktest:
                 'Number of Rebalances': 0
             }
         
-        df = pd.DataFrame({
-            'Date': dates,
-            'Portfolio Value': values
-        })
-        
-        # Calculate daily returns
-        df['Daily Return'] = df['Portfolio Value'].pct_change()
-        
         # Calculate metrics - use the last available value
         final_value = values[-1]
         total_return = (final_value - self.initial_investment) / self.initial_investment
         
-        # Find max drawdown
-        df['Cumulative Return'] = (1 + df['Daily Return']).cumprod() - 1
-        df['Running Max'] = df['Cumulative Return'].cummax()
-        df['Drawdown'] = df['Running Max'] - df['Cumulative Return']
-        max_drawdown = df['Drawdown'].max()
+        # Risk statistics of the daily equity curve
+        metrics = self.risk_metrics()
+        
+        def ratio(value):
+            return f"{value:.2f}" if value is not None else "N/A"
+        
+        def percentage(value):
+            return f"{value:.2f}%" if value is not None else "N/A"
         
         # Summary stats
         summary = {
@@ -341,7 +601,12 @@ class MomentumBacktest:
             'Final Value': f"Rs {final_value:,.2f}",
             'Absolute Return': f"Rs {final_value - self.initial_investment:,.2f}",
             'Return (%)': f"{total_return * 100:.2f}%",
-            'Max Drawdown (%)': f"{max_drawdown * 100:.2f}%",
+            'Max Drawdown (%)': percentage(metrics['max_drawdown_pct']),
+            'Volatility (%)': percentage(metrics['volatility_pct']),
+            'Sharpe Ratio': ratio(metrics['sharpe_ratio']),
+            'Sortino Ratio': ratio(metrics['sortino_ratio']),
+            'Calmar Ratio': ratio(metrics['calmar_ratio']),
+            'Average Turnover (%)': percentage(metrics['turnover_pct']),
             'Rebalancing Frequency': f"Every {self.rebalance_period_days} days",
             'Number of Rebalances': len(self.rebalance_dates)
         }
@@ -353,7 +618,11 @@ def run_momentum_backtest(
     start_date=None, 
     end_date=None, 
     initial_investment=500000.0, 
-    rebalance_period_days=14
+    rebalance_period_days=14,
+    lookback_days=20,
+    top_n=10,
+    price_df=None,
+    progress=None
 ):
     """
     Run a momentum backtest with the given parameters
@@ -364,6 +633,11 @@ def run_momentum_backtest(
         end_date: End date (YYYY-MM-DD)
         initial_investment: Initial investment amount in Rs
         rebalance_period_days: Number of days between rebalances
+        lookback_days: Number of days to look back for momentum calculation
+        top_n: Number of top momentum stocks to hold
+        price_df: Optional pre-loaded price panel (dates x symbols)
+        progress: Optional per-rebalance progress callback, see
+            MomentumBacktest.run_backtest
     
     Returns:
         Dictionary with backtest results
@@ -377,47 +651,160 @@ def run_momentum_backtest(
         start_date=start_date,
         end_date=end_date,
         initial_investment=initial_investment,
-        rebalance_period_days=rebalance_period_days
+        rebalance_period_days=rebalance_period_days,
+        lookback_days=lookback_days,
+        top_n=top_n,
+        price_df=price_df
     )
     
-    result = backtest.run_backtest()
-    summary = backtest.get_performance_summary()
-    
-    # Format the holdings history with readable details
-    formatted_holdings_history = []
-    for entry in backtest.holdings_history:
-        date = entry['date']
-        holdings = entry['holdings']
-        cash = entry['cash']
-        
-        # Format detailed holdings with share count and value
-        stock_details = []
-        for symbol, shares in holdings.items():
-            price = backtest._get_price(symbol, date)
-            value = shares * price
-            stock_details.append({
-                'symbol': symbol,
-                'shares': float(shares),
-                'price': float(price),
-                'value': float(value),
-                'percentage': float(value / (backtest._calculate_portfolio_value(holdings, date, cash)) * 100)
-            })
-        
-        # Sort by value (highest first)
-        stock_details.sort(key=lambda x: x['value'], reverse=True)
-        
-        formatted_holdings_history.append({
-            'date': date,
-            'holdings': stock_details,
-            'cash': float(cash)
-        })
+    result = backtest.run_backtest(progress=progress)
+    
+    with STAGE_SECONDS.time(stage="formatting"):
+        summary = backtest.get_performance_summary()
+        
+        # Holdings history with readable details, built from the price matrix
+        formatted_holdings_history = backtest.holdings_report()
+        
+        curve = backtest.equity_curve()
+        
+        return {
+            'result': result,
+            'summary': summary,
+            'portfolio_values': backtest.portfolio_values,
+            'equity_curve': [
+                {'date': date, 'value': value}
+                for date, value in zip(curve.index, curve.to_numpy().tolist())
+            ],
+            'rebalance_dates': backtest.rebalance_dates,
+            'holdings_history': formatted_holdings_history
+        }
+
+def _holdings_breakdown(symbols, shares, prices, cash, offsets):
+    """
+    Per-stock value and portfolio weight for a batch of rebalances
+    
+    The holdings of rebalance i are the slice offsets[i]:offsets[i + 1] of the
+    flat arrays. Values, portfolio totals, weights and the per-rebalance sort
+    order are computed with array operations over the whole batch.
+    
+    Args:
+        symbols: Array of symbols of every holding
+        shares: Array of share counts
+        prices: Array of prices
+        cash: Array with the cash of every rebalance
+        offsets: Array of len(cash) + 1 slice boundaries
+    
+    Returns:
+        One list of holding dictionaries per rebalance, sorted by value
+        (highest first)
+    """
+    counts = np.diff(offsets)
+    rebalance_ids = np.repeat(np.arange(len(counts)), counts)
+    values = shares * prices
+    
+    # Missing prices are left out of the portfolio total
+    totals = np.asarray(cash, dtype=np.float64) + np.bincount(
+        rebalance_ids, weights=np.nan_to_num(values), minlength=len(counts)
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentages = values / totals[rebalance_ids] * 100
+    
+    # Group by rebalance, highest value first within a rebalance (stable for ties)
+    order = np.lexsort((-values, rebalance_ids))
+    columns = zip(
+        np.asarray(symbols)[order].tolist(),
+        shares[order].tolist(),
+        prices[order].tolist(),
+        values[order].tolist(),
+        percentages[order].tolist()
+    )
+    rows = [
+        {'symbol': symbol, 'shares': share_count, 'price': price, 'value': value, 'percentage': percentage}
+        for symbol, share_count, price, value, percentage in columns
+    ]
+    return [rows[offsets[i]:offsets[i + 1]] for i in range(len(counts))]
+
+def holding_details(holdings, prices, cash):
+    """
+    Describe holdings with share count, price, value and portfolio weight
+    
+    Args:
+        holdings: Dictionary of symbol to shares
+        prices: Dictionary of symbol to price
+        cash: Cash held next to the stocks
+    
+    Returns:
+        List of holding dictionaries sorted by value (highest first)
+    """
+    symbols = list(holdings)
+    return _holdings_breakdown(
+        symbols,
+        np.array([holdings[symbol] for symbol in symbols], dtype=np.float64),
+        np.array([prices[symbol] for symbol in symbols], dtype=np.float64),
+        [cash],
+        [0, len(symbols)]
+    )[0]
+
+def stream_momentum_backtest(
+    symbols,
+    start_date=None,
+    end_date=None,
+    initial_investment=500000.0,
+    rebalance_period_days=14,
+    lookback_days=20,
+    top_n=10,
+    price_df=None
+):
+    """
+    Run a momentum backtest, yielding every rebalance as soon as it is computed
+    
+    Takes the same arguments as run_momentum_backtest.
+    
+    Yields:
+        (event, data) tuples: one "start" event with the number of rebalances,
+        one "rebalance" event per executed rebalance and a final "summary"
+        event with the result and performance summary. If no data could be
+        loaded a single "error" event is yielded instead.
+    """
+    backtest = MomentumBacktest(
+        symbols=symbols,
+        start_date=start_date,
+        end_date=end_date,
+        initial_investment=initial_investment,
+        rebalance_period_days=rebalance_period_days,
+        lookback_days=lookback_days,
+        top_n=top_n,
+        price_df=price_df
+    )
+    
+    if not backtest.prepare():
+        yield "error", {"error": "Failed to download data, cannot run backtest", "result": None}
+        return
+    
+    total = backtest.total_rebalances
+    yield "start", {
+        'start_date': backtest.start_date,
+        'end_date': backtest.end_date,
+        'initial_investment': float(backtest.initial_investment),
+        'symbols': len(symbols),
+        'total_rebalances': total
+    }
+    
+    for number, record in enumerate(backtest.iter_rebalances(), start=1):
+        yield "rebalance", {
+            'index': number - 1,
+            'date': record['date'],
+            'holdings': holding_details(record['holdings'], record['prices'], record['cash']),
+            'cash': record['cash'],
+            'value': record['value'],
+            'completed': len(backtest.rebalance_dates),
+            'total_rebalances': total
+        }
     
-    return {
-        'result': result,
-        'summary': summary,
-        'portfolio_values': backtest.portfolio_values,
-        'rebalance_dates': backtest.rebalance_dates,
-        'holdings_history': formatted_holdings_history
+    yield "summary", {
+        'result': backtest.build_result(),
+        'summary': backtest.get_performance_summary(),
+        'rebalance_dates': backtest.rebalance_dates
     }
 
 if __name__ == "__main__":
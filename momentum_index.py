@@ -0,0 +1,263 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+def forward_fill(values, previous=None):
+    """
+    Forward fill NaN entries down the rows of a 2-D array
+
+    Args:
+        values: Array of shape (rows, columns)
+        previous: Optional row used to fill leading NaN entries
+
+    Returns:
+        Filled array of the same shape
+    """
+    if len(values) == 0:
+        return values
+    mask = np.isnan(values)
+    if previous is not None:
+        values = np.vstack([previous, values])
+        mask = np.vstack([np.zeros(len(previous), dtype=bool), mask])
+    rows = np.where(~mask, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = values[rows, np.arange(values.shape[1])]
+    return filled[1:] if previous is not None else filled
+
+
+class CumulativeReturnIndex:
+    """
+    Prefix index of cumulative log returns over a price panel
+
+    Row t of the index holds the cumulative log return of every symbol up to
+    date t (the log of the forward-filled price), so the return between any
+    two rows is a single subtraction per symbol:
+
+        return(t0 -> t1) = exp(L[t1] - L[t0]) - 1
+
+    Rows can be appended as new bars arrive without rebuilding the index.
+    extend() appends in place and is meant for an index with a single owner;
+    an index shared between threads is never modified, extended() returns a
+    new index with the bars appended instead.
+    """
+
+    def __init__(self, price_df):
+        """
+        Build the index
+
+        Args:
+            price_df: DataFrame of prices indexed by date, one column per symbol
+        """
+        if not price_df.index.is_monotonic_increasing:
+            price_df = price_df.sort_index()
+
+        self.columns = pd.Index(price_df.columns)
+        self._lock = threading.Lock()
+
+        prices = price_df.to_numpy(dtype=np.float64)
+        self._size = len(prices)
+        capacity = max(16, self._size)
+        self._dates = np.empty(capacity, dtype='datetime64[ns]')
+        self._log = np.empty((capacity, len(self.columns)), dtype=np.float64)
+        self._valid = np.empty((capacity, len(self.columns)), dtype=bool)
+
+        self._dates[:self._size] = price_df.index.values
+        self._valid[:self._size] = ~np.isnan(prices)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._log[:self._size] = forward_fill(np.log(prices), None)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def dates(self):
+        """Dates covered by the index"""
+        return pd.DatetimeIndex(self._dates[:self._size])
+
+    @property
+    def log_prices(self):
+        """Cumulative log index as an array of shape (dates, symbols)"""
+        return self._log[:self._size]
+
+    def extend(self, new_prices):
+        """
+        Append bars dated after the last row of the index
+
+        Args:
+            new_prices: DataFrame of prices with the same columns; rows on or
+                before the last indexed date are ignored
+
+        Returns:
+            Number of rows appended
+        """
+        new_prices = new_prices.reindex(columns=self.columns).sort_index()
+        with self._lock:
+            if self._size:
+                new_prices = new_prices.loc[new_prices.index > self._dates[self._size - 1]]
+            count = len(new_prices)
+            if count == 0:
+                return 0
+
+            needed = self._size + count
+            if needed > len(self._dates):
+                # Grow geometrically so repeated appends stay amortized O(1) per row
+                capacity = max(needed, 2 * len(self._dates))
+                self._dates = np.resize(self._dates, capacity)
+                self._log = np.resize(self._log, (capacity, len(self.columns)))
+                self._valid = np.resize(self._valid, (capacity, len(self.columns)))
+
+            prices = new_prices.to_numpy(dtype=np.float64)
+            previous = self._log[self._size - 1] if self._size else None
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_prices = forward_fill(np.log(prices), previous)
+
+            self._dates[self._size:needed] = new_prices.index.values
+            self._valid[self._size:needed] = ~np.isnan(prices)
+            self._log[self._size:needed] = log_prices
+            self._size = needed
+        return count
+
+    def extended(self, new_prices):
+        """
+        Return a copy of the index with bars appended, leaving this one unchanged
+
+        Threads still reading this index are not affected. The copy reuses
+        the cumulative log prices, so only the new bars are computed.
+
+        Args:
+            new_prices: DataFrame of prices with the same columns; rows on or
+                before the last indexed date are ignored
+
+        Returns:
+            New CumulativeReturnIndex
+        """
+        index = CumulativeReturnIndex.__new__(CumulativeReturnIndex)
+        index.columns = self.columns
+        index._lock = threading.Lock()
+        with self._lock:
+            index._size = self._size
+            index._dates = self._dates.copy()
+            index._log = self._log.copy()
+            index._valid = self._valid.copy()
+        index.extend(new_prices)
+        return index
+
+    def position(self, asof):
+        """Row of the last date on or before asof (-1 if before the index)"""
+        return int(np.searchsorted(self._dates[:self._size], np.datetime64(pd.Timestamp(asof)), side='right')) - 1
+
+    def returns_between(self, end_positions, start_positions, require_valid=False):
+        """
+        Returns from start rows to end rows for every symbol
+
+        Args:
+            end_positions: Array (or scalar) of end rows
+            start_positions: Array (or scalar) of start rows, same shape
+            require_valid: If True the result is NaN wherever the raw price
+                on either row is missing, instead of using the last known price
+
+        Returns:
+            Array of shape (len(end_positions), symbols), or (symbols,) for scalars
+        """
+        log = self._log[:self._size]
+        with np.errstate(invalid='ignore', over='ignore'):
+            returns = np.expm1(log[end_positions] - log[start_positions])
+        if require_valid:
+            valid = self._valid[:self._size]
+            returns = np.where(valid[end_positions] & valid[start_positions], returns, np.nan)
+        return returns
+
+    def trailing_returns(self, rows):
+        """
+        Total return of every symbol over the last `rows` rows
+
+        Args:
+            rows: Number of trailing rows in the window (at least 1)
+
+        Returns:
+            Series of returns indexed by symbol
+        """
+        end = self._size - 1
+        start = max(0, self._size - rows)
+        return pd.Series(self.returns_between(end, start), index=self.columns)
+
+    def momentum(self, asof, lookback):
+        """
+        Momentum of every symbol as of a date
+
+        Args:
+            asof: As-of date
+            lookback: Number of rows in the lookback window
+
+        Returns:
+            Series of returns indexed by symbol
+        """
+        end = self.position(asof)
+        if end < 0:
+            return pd.Series(np.nan, index=self.columns)
+        start = max(0, end - lookback + 1)
+        return pd.Series(self.returns_between(end, start), index=self.columns)
+
+    def momentum_matrix(self, asof_dates, lookback):
+        """
+        Momentum for many as-of dates at once
+
+        Args:
+            asof_dates: Sequence of as-of dates
+            lookback: Number of rows in the lookback window
+
+        Returns:
+            DataFrame of shape (as-of dates, symbols); rows for dates before
+            the index are NaN
+        """
+        asof_dates = pd.DatetimeIndex(asof_dates)
+        ends = np.searchsorted(self._dates[:self._size], asof_dates.values, side='right') - 1
+        starts = np.maximum(0, ends - lookback + 1)
+        returns = self.returns_between(np.maximum(ends, 0), starts)
+        returns[ends < 0] = np.nan
+        return pd.DataFrame(returns, index=asof_dates, columns=self.columns)
+
+
+def index_for_panel(price_df, previous=None):
+    """
+    Return an index covering a price panel, reusing a previous index if possible
+
+    The previous index is extended with the panel's newer bars when it has the
+    same symbols, reaches back at least as far as the panel and its last row
+    still matches the panel (prices were not re-adjusted in between).
+    Otherwise a new index is built. The previous index is never modified, so
+    it can still be read by other threads.
+
+    Args:
+        price_df: DataFrame of prices indexed by date, one column per symbol
+        previous: Optional index built from an earlier panel
+
+    Returns:
+        CumulativeReturnIndex whose last row is the panel's last row
+    """
+    if previous is None or len(previous) == 0 or len(price_df) == 0:
+        return CumulativeReturnIndex(price_df)
+    if not previous.columns.equals(pd.Index(price_df.columns)):
+        return CumulativeReturnIndex(price_df)
+
+    # A shorter earlier panel cannot serve the longer windows of this one
+    if previous.dates[0] > price_df.index[0]:
+        return CumulativeReturnIndex(price_df)
+
+    last = len(previous) - 1
+    last_date = previous.dates[last]
+    if last_date not in price_df.index:
+        return CumulativeReturnIndex(price_df)
+
+    # The overlapping bar must be unchanged, otherwise history was re-adjusted
+    raw = price_df.loc[last_date].to_numpy(dtype=np.float64)
+    known = np.where(previous._valid[last], np.exp(previous.log_prices[last]), np.nan)
+    if not np.allclose(raw, known, rtol=1e-9, equal_nan=True):
+        return CumulativeReturnIndex(price_df)
+
+    newer = price_df.loc[price_df.index > last_date]
+    if len(newer) == 0:
+        return previous
+    return previous.extended(newer)
@@ -1,306 +1,399 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import time
 import logging
-import sys
-import traceback
+import threading
+
+import metrics
+import price_source
+import price_store
+import universes
+from momentum_index import CumulativeReturnIndex, index_for_panel
 
 logger = logging.getLogger(__name__)
 
-# Define a smaller subset of symbols to reduce API load
-symbols = [
-    "RELIANCE.NS", "TCS.NS", "HDFCBANK.NS", "ICICIBANK.NS", "HINDUNILVR.NS",
-    "INFY.NS", "KOTAKBANK.NS", "SBIN.NS", "BHARTIARTL.NS", "ITC.NS",
-    "AXISBANK.NS", "LT.NS", "MARUTI.NS", "ASIANPAINT.NS", "HCLTECH.NS",
-    "SUNPHARMA.NS", "BAJFINANCE.NS", "TATASTEEL.NS", "POWERGRID.NS", "TITAN.NS",
-    "NTPC.NS", "JSWSTEEL.NS", "ADANIPORTS.NS", "ONGC.NS", "TATAMOTORS.NS"
-]
+# Default universe: a smaller subset of the Nifty 100 to reduce API load
+symbols = universes.get_universe(universes.DEFAULT_UNIVERSE)
+
+DOWNLOAD_SECONDS = metrics.histogram(
+    "safe_download_seconds",
+    "Duration of safe_download by data path (price store or direct source fetch)",
+    ["path"]
+)
+STAGE_SECONDS = metrics.histogram(
+    "momentum_stage_seconds",
+    "Duration of the stages of get_momentum_data",
+    ["stage"]
+)
+DURATION_SECONDS = metrics.histogram(
+    "momentum_duration_seconds",
+    "Duration of the return and ranking computation of one momentum duration",
+    ["duration"]
+)
 
 def safe_download(symbol_list, period, interval, max_retries=3, sleep_time=2):
     """
     Safely download data with error handling and retries
+    
+    Prices come from the configured PriceSource. Daily bars from remote
+    sources are served from the local price store; only the bars missing from
+    the store are downloaded and merged into it.
     """
-    # Reduce the batch size to avoid overwhelming the API
-    batch_size = 5
-    all_data = pd.DataFrame()
+    source = price_source.get_price_source()
+    options = {"max_retries": max_retries, "retry_delay": sleep_time}
     
-    # Create batches of symbols
-    symbol_batches = [symbol_list[i:i + batch_size] for i in range(0, len(symbol_list), batch_size)]
-    logger.info(f"Downloading data in {len(symbol_batches)} batches of size {batch_size}")
+    start = price_store.period_start(period)
+    if source.remote and price_store.STORE_ENABLED and interval == "1d" and start is not None:
+        def fetch(fetch_symbols, fetch_start, fetch_end):
+            return source.fetch(fetch_symbols, start=fetch_start, end=fetch_end, interval=interval, **options)
+        
+        with DOWNLOAD_SECONDS.time(path="store"):
+            all_data = price_store.get_store(interval).load(symbol_list, start=start, fetch=fetch)
+        rows = price_store.period_rows(period)
+        if rows is not None:
+            all_data = all_data.tail(rows)
+        logger.info(f"Loaded {period} data from price store, shape: {all_data.shape}")
+        return all_data
+    
+    with DOWNLOAD_SECONDS.time(path="source"):
+        return source.fetch(symbol_list, period=period, interval=interval, **options)
+
+# Number of trading days covered by each duration. A single panel covering the
+# longest window is downloaded and every duration is sliced from it.
+DURATION_TRADING_DAYS = {
+    "5d": 5,
+    "10d": 10,
+    "1mo": 21,
+    "3mo": 63,
+    "6mo": 126,
+    "1y": 252
+}
+
+DURATIONS = list(DURATION_TRADING_DAYS.keys())
+
+# The comparison block ranks the 5d against the 3mo returns
+COMPARISON = "comparison"
+COMPARISON_DURATIONS = ("5d", "3mo")
+
+# Sections that can be requested on their own
+SECTIONS = [COMPARISON] + DURATIONS
+
+# Period used for the single panel download
+PANEL_PERIOD = "1y"
+
+# Cumulative return index of the last panel per symbol list, extended as new bars arrive
+_panel_indexes = {}
+_panel_indexes_lock = threading.Lock()
+
+def slice_duration(price_data, duration):
+    """
+    Return the trailing rows of a price panel covering the given duration
+    
+    Args:
+        price_data: DataFrame of prices indexed by date, one column per symbol
+        duration: One of the keys of DURATION_TRADING_DAYS
+    
+    Returns:
+        DataFrame with the last N trading days of the panel
+    """
+    return price_data.tail(DURATION_TRADING_DAYS[duration])
+
+def calculate_period_returns(data, duration):
+    """
+    Calculate the total return of every symbol over a price window
+    
+    Args:
+        data: DataFrame of prices for the window
+        duration: Duration label, used for logging only
+    
+    Returns:
+        Series of total returns indexed by symbol
+    """
+    # Check if we have enough data for calculation
+    if data.shape[0] <= 1:
+        # Not enough data points for percentage change calculation
+        logger.warning(f"Not enough data points for {duration} calculation, using direct comparison")
+        if data.shape[0] == 0:
+            # No data at all
+            return pd.Series(0, index=data.columns)
+        # Just one data point, calculate vs. first value
+        first_values = data.iloc[0]
+        return pd.Series(0, index=first_values.index)
     
-    for batch_idx, batch in enumerate(symbol_batches):
-        logger.info(f"Processing batch {batch_idx+1}/{len(symbol_batches)}: {batch}")
+    # Normal case - total return from the cumulative return index
+    return CumulativeReturnIndex(data).trailing_returns(data.shape[0])
+
+def panel_index(price_data):
+    """
+    Return the cumulative return index of a price panel
+    
+    The index of the previous panel for the same symbols is extended with the
+    new bars instead of being rebuilt. Extending returns a new index that
+    replaces the cached one, so request threads still reading the previous
+    index are not affected.
+    
+    Args:
+        price_data: DataFrame of prices indexed by date, one column per symbol
+    
+    Returns:
+        CumulativeReturnIndex ending at the panel's last row
+    """
+    key = tuple(price_data.columns)
+    with _panel_indexes_lock:
+        previous = _panel_indexes.get(key)
+    index = index_for_panel(price_data, previous)
+    with _panel_indexes_lock:
+        # Keep the index cached by a concurrent request if it got there first
+        if _panel_indexes.get(key) is previous:
+            _panel_indexes[key] = index
+    return index
+
+def duration_returns(index, duration, available_rows):
+    """
+    Total return of every symbol over a duration, read from a return index
+    
+    Args:
+        index: CumulativeReturnIndex ending at the last bar
+        duration: One of the keys of DURATION_TRADING_DAYS
+        available_rows: Rows in the downloaded panel; the window never reaches
+            further back than the panel
+    
+    Returns:
+        Series of total returns indexed by symbol
+    """
+    rows = min(DURATION_TRADING_DAYS[duration], available_rows)
+    if rows <= 1:
+        logger.warning(f"Not enough data points for {duration} calculation, using direct comparison")
+        return pd.Series(0, index=index.columns)
+    return index.trailing_returns(rows)
+
+def top_k_indices(values, k, largest=True):
+    """
+    Positions of the k largest (or smallest) values using partial selection
+    
+    NaN values are ignored. The result is ordered from most to least extreme
+    and ties keep the earlier position, matching Series.nlargest/nsmallest
+    with keep='first', without sorting the whole array.
+    
+    Args:
+        values: 1-D float array
+        k: Number of positions to return
+        largest: Select the largest values if True, else the smallest
+    
+    Returns:
+        Integer array of at most k positions into values
+    """
+    keys = -values if largest else values
+    valid = np.flatnonzero(~np.isnan(keys))
+    k = min(k, len(valid))
+    if k == 0:
+        return np.array([], dtype=np.intp)
+    
+    keys = keys[valid]
+    if k < len(keys):
+        # Everything strictly better than the k-th key, then ties in position order
+        kth = np.partition(keys, k - 1)[k - 1]
+        better = np.flatnonzero(keys < kth)
+        ties = np.flatnonzero(keys == kth)[:k - len(better)]
+        chosen = np.concatenate([better, ties])
+    else:
+        chosen = np.arange(len(keys))
+    
+    order = np.lexsort((chosen, keys[chosen]))
+    return valid[chosen[order]]
+
+def compare_top_10(change2_5d, change2_3mo):
+    """
+    Compare the 5-day and 3-month top 10 momentum sets
+    
+    Args:
+        change2_5d: Series of 5-day total returns
+        change2_3mo: Series of 3-month total returns
+    
+    Returns:
+        Dictionary in the "comparison" response format
+    """
+    names_5d = change2_5d.index
+    names_3mo = change2_3mo.index
+    values_5d = change2_5d.to_numpy(dtype=np.float64)
+    values_3mo = change2_3mo.to_numpy(dtype=np.float64)
+    
+    # Get top performers (handling empty or small datasets)
+    top_10_5d = set(names_5d[top_k_indices(values_5d, 10)])
+    top_10_3mo = set(names_3mo[top_k_indices(values_3mo, 10)])
+    
+    # Remove any stocks that may be inconsistent across different timeframes
+    # by ensuring no stock appears in top performers for one period and bottom performers for another
+    if len(change2_5d) > 0 and len(change2_3mo) > 0:
+        bottom_10_5d = set(names_5d[top_k_indices(values_5d, 10, largest=False)])
+        bottom_10_3mo = set(names_3mo[top_k_indices(values_3mo, 10, largest=False)])
         
-        for attempt in range(max_retries):
-            try:
-                logger.debug(f"Downloading batch {batch_idx+1}, period={period}, attempt {attempt+1}")
-                
-                # Download data for this batch
-                batch_data = yf.download(
-                    batch, 
-                    period=period, 
-                    interval=interval,
-                    progress=False,
-                    group_by='ticker',
-                    threads=False,  # Disable threading to avoid connection issues
-                    timeout=30
-                )
-                
-                # Handle different data structures based on batch size
-                if len(batch) == 1:
-                    # For single symbol, the structure is different
-                    symbol = batch[0]
-                    if "Adj Close" in batch_data.columns:
-                        single_data = pd.DataFrame({symbol: batch_data["Adj Close"]})
-                    else:
-                        # If Adj Close not available, try Close
-                        single_data = pd.DataFrame({symbol: batch_data["Close"] if "Close" in batch_data.columns else []})
-                    
-                    # Merge with existing data
-                    if all_data.empty:
-                        all_data = single_data
-                    else:
-                        all_data = pd.concat([all_data, single_data], axis=1)
-                else:
-                    # For multiple symbols, extract required data
-                    try:
-                        batch_price_data = batch_data.xs("Adj Close", axis=1, level=1, drop_level=True)
-                    except Exception as e:
-                        logger.warning(f"Could not extract Adj Close, trying Close: {str(e)}")
-                        try:
-                            batch_price_data = batch_data.xs("Close", axis=1, level=1, drop_level=True)
-                        except Exception:
-                            logger.error("Could not extract Close prices either, creating empty DataFrame")
-                            batch_price_data = pd.DataFrame(columns=batch)
-                    
-                    # Merge with existing data
-                    if all_data.empty:
-                        all_data = batch_price_data
-                    else:
-                        all_data = pd.concat([all_data, batch_price_data], axis=1)
-                
-                # Successfully processed this batch
-                break
-                
-            except Exception as e:
-                logger.error(f"Error downloading batch {batch_idx+1} (attempt {attempt+1}/{max_retries}): {str(e)}")
-                if attempt < max_retries - 1:
-                    logger.debug(f"Retrying in {sleep_time} seconds...")
-                    time.sleep(sleep_time)
-                else:
-                    logger.warning(f"Max retries reached for batch {batch_idx+1}, skipping")
+        # Find potential inconsistencies - stocks in top of one period but bottom of another
+        inconsistent_5d = top_10_5d.intersection(bottom_10_3mo)
+        inconsistent_3mo = top_10_3mo.intersection(bottom_10_5d)
+        
+        # Remove inconsistent stocks based on which period they have a more extreme value
+        for stock in inconsistent_5d:
+            if abs(change2_5d[stock]) < abs(change2_3mo[stock]):
+                top_10_5d.remove(stock)
         
-        # Very small delay between batches to avoid rate limiting
-        time.sleep(0.1)
+        for stock in inconsistent_3mo:
+            if abs(change2_3mo[stock]) < abs(change2_5d[stock]):
+                top_10_3mo.remove(stock)
+    
+    # Compare the sets after removing inconsistencies
+    return {
+        "dropped_from_top_10": list(top_10_5d - top_10_3mo),
+        "entered_top_10": list(top_10_3mo - top_10_5d),
+        "full_5d_top_10": list(top_10_5d),
+        "full_3mo_top_10": list(top_10_3mo)
+    }
+
+def select_performers(change2):
+    """
+    Select the top and bottom 10 performers from a series of returns
+    
+    A stock that would appear in both lists (fewer than 20 stocks) is kept
+    only in the top performers, and the bottom list is topped up from the
+    stocks in neither list.
+    
+    Args:
+        change2: Series of total returns indexed by symbol
+    
+    Returns:
+        Tuple of (top_performers, bottom_performers) dictionaries with
+        percentage values, ordered from most to least extreme
+    """
+    # Get top and bottom performers (handling empty datasets)
+    if change2.empty or len(change2) == 0:
+        return {"No Data": 0}, {"No Data": 0}
     
-    logger.info(f"Download completed, final data shape: {all_data.shape}")
+    values = change2.to_numpy(dtype=np.float64)
+    names = change2.index
     
-    # Fill any missing tickers with empty columns
-    for symbol in symbol_list:
-        if symbol not in all_data.columns:
-            all_data[symbol] = np.nan
+    # Limit to exactly 10 stocks (or fewer if not enough data)
+    max_performers = min(10, len(change2))
+    top = top_k_indices(values, max_performers)
+    bottom = top_k_indices(values, max_performers, largest=False)
+    bottom = bottom[~np.isin(bottom, top)]
     
-    return all_data
+    # Ensure we still have exactly 10 bottom performers after removing overlaps
+    # (if enough stocks are available)
+    if len(values) > max_performers and len(bottom) < max_performers:
+        remaining = np.setdiff1d(np.arange(len(values)), np.concatenate([top, bottom]))
+        additional = remaining[top_k_indices(values[remaining], max_performers - len(bottom), largest=False)]
+        bottom = np.concatenate([bottom, additional])
+        bottom = bottom[np.lexsort((bottom, values[bottom]))]
+    
+    # Convert to dictionaries for JSON serialization with percentage values
+    return (
+        {names[i]: round(float(values[i]) * 100, 2) for i in top},
+        {names[i]: round(float(values[i]) * 100, 2) for i in bottom}
+    )
+
+def panel_period(sections):
+    """
+    Shortest download period covering the requested sections
+    
+    Args:
+        sections: Durations and/or COMPARISON
+    
+    Returns:
+        Period string for safe_download
+    """
+    durations = set()
+    for section in sections:
+        durations.update(COMPARISON_DURATIONS if section == COMPARISON else (section,))
+    days = max(DURATION_TRADING_DAYS[duration] for duration in durations)
+    if days >= max(DURATION_TRADING_DAYS.values()):
+        return PANEL_PERIOD
+    # Day periods are trimmed to exactly that many trailing bars
+    return f"{days}d"
+
+def data_version(symbol_list=None, durations=None):
+    """
+    Version of the price data an analysis of the sections would read
+    
+    Args:
+        symbol_list: Symbols to rank (default: the default universe)
+        durations: Optional list of sections (default: all of them)
+    
+    Returns:
+        Version string from price_source.data_version, or None if the data
+        is not versioned
+    """
+    period = panel_period(durations or SECTIONS)
+    return price_source.data_version(symbol_list or symbols, price_store.period_start(period))
 
-def get_momentum_data():
+def get_momentum_data(price_data=None, symbol_list=None, durations=None):
     """
     Calculate momentum data for different time periods
+    
+    A single price panel covering the longest requested duration is
+    downloaded and the return for every duration is read from its cumulative
+    return index.
+    
+    The returns equal those of a separate download per duration only for
+    panels without NaN bars. The index forward fills a missing bar, while the
+    per-download computation (pct_change().dropna()) dropped every date on
+    which any symbol was missing.
+    
+    Args:
+        price_data: Optional pre-loaded price panel (dates x symbols). When
+            omitted the panel is downloaded with safe_download.
+        symbol_list: Symbols to rank (default: the default universe)
+        durations: Optional list of sections to compute, durations and/or
+            COMPARISON (default: every duration and the comparison)
+    
+    Returns:
+        Dictionary with the comparison block and one entry per duration
     """
     results = {}
     
+    if durations is None:
+        sections = [COMPARISON] + DURATIONS
+    else:
+        unknown = [section for section in durations if section not in SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown momentum durations: {', '.join(unknown)}")
+        sections = list(durations)
+    
     # Define time periods
-    durations = ["5d", "10d", "1mo", "3mo", "6mo", "1y"]
+    durations = [section for section in sections if section != COMPARISON]
     
     try:
-        # Create sample data for the comparison section
-        data_5d = safe_download(symbols, period="5d", interval="1d")
-        if data_5d.empty:
-            # Handle empty data
-            raise ValueError("Unable to download 5-day data")
-            
-        # Calculate momentum (percentage change)
-        # Check if we have enough data for calculation
-        if data_5d.shape[0] <= 1:
-            # Not enough data points for percentage change calculation
-            logger.warning("Not enough data points for 5d calculation, using direct comparison")
-            if data_5d.shape[0] == 0:
-                # No data at all
-                change2_5d = pd.Series(0, index=symbols)
-            else:
-                # Just one data point, calculate vs. first value
-                first_values = data_5d.iloc[0]
-                change2_5d = pd.Series(0, index=first_values.index)
-        else:
-            # Normal case - calculate percentage change
-            change_5d = data_5d.pct_change().dropna()
-            # Calculate total return over period
-            change2_5d = (change_5d + 1).prod() - 1
-            
-        # Same for 3-month data
-        data_3mo = safe_download(symbols, period="3mo", interval="1d")
-        if data_3mo.empty:
+        # Download one panel covering the longest window
+        period = panel_period(sections)
+        if price_data is None:
+            with STAGE_SECONDS.time(stage="download"):
+                price_data = safe_download(symbol_list or symbols, period=period, interval="1d")
+        if price_data.empty:
             # Handle empty data
-            raise ValueError("Unable to download 3-month data")
-            
-        # Calculate momentum (percentage change)
-        # Check if we have enough data for calculation
-        if data_3mo.shape[0] <= 1:
-            # Not enough data points for percentage change calculation
-            logger.warning("Not enough data points for 3mo calculation, using direct comparison")
-            if data_3mo.shape[0] == 0:
-                # No data at all
-                change2_3mo = pd.Series(0, index=symbols)
-            else:
-                # Just one data point, calculate vs. first value
-                first_values = data_3mo.iloc[0]
-                change2_3mo = pd.Series(0, index=first_values.index)
-        else:
-            # Normal case - calculate percentage change
-            change_3mo = data_3mo.pct_change().dropna()
-            # Calculate total return over period
-            change2_3mo = (change_3mo + 1).prod() - 1
-            
-        # Get top performers (handling empty or small datasets)
-        if len(change2_5d) == 0:
-            top_10_5d_series = pd.Series()
-            top_10_5d = set()
-        else:
-            top_10_5d_series = change2_5d.nlargest(min(10, len(change2_5d)))
-            top_10_5d = set(top_10_5d_series.index)
-            
-        if len(change2_3mo) == 0:
-            top_10_3mo_series = pd.Series()
-            top_10_3mo = set()
-        else:
-            top_10_3mo_series = change2_3mo.nlargest(min(10, len(change2_3mo)))
-            top_10_3mo = set(top_10_3mo_series.index)
-            
-        # Find stocks that would appear in both datasets
-        common_stocks = top_10_5d.intersection(top_10_3mo)
-        
-        # Remove any stocks that may be inconsistent across different timeframes
-        # by ensuring no stock appears in top performers for one period and bottom performers for another
-        if len(change2_5d) > 0 and len(change2_3mo) > 0:
-            bottom_10_5d = set(change2_5d.nsmallest(min(10, len(change2_5d))).index)
-            bottom_10_3mo = set(change2_3mo.nsmallest(min(10, len(change2_3mo))).index)
-            
-            # Find potential inconsistencies - stocks in top of one period but bottom of another
-            inconsistent_5d = top_10_5d.intersection(bottom_10_3mo)
-            inconsistent_3mo = top_10_3mo.intersection(bottom_10_5d)
-            
-            # Remove inconsistent stocks based on which period they have a more extreme value
-            for stock in inconsistent_5d:
-                if abs(change2_5d[stock]) < abs(change2_3mo[stock]):
-                    top_10_5d.remove(stock)
-            
-            for stock in inconsistent_3mo:
-                if abs(change2_3mo[stock]) < abs(change2_5d[stock]):
-                    top_10_3mo.remove(stock)
+            raise ValueError(f"Unable to download {period} data")
         
-        # Compare the sets after removing inconsistencies
-        dropped_off = list(top_10_5d - top_10_3mo)
-        new_entries = list(top_10_3mo - top_10_5d)
+        # Every duration is a single subtraction on the cumulative return index
+        with STAGE_SECONDS.time(stage="index"):
+            index = panel_index(price_data)
+        available_rows = price_data.shape[0]
         
-        results["comparison"] = {
-            "dropped_from_top_10": dropped_off,
-            "entered_top_10": new_entries,
-            "full_5d_top_10": list(top_10_5d),
-            "full_3mo_top_10": list(top_10_3mo)
-        }
+        # Comparison between short and medium term momentum
+        if COMPARISON in sections:
+            with STAGE_SECONDS.time(stage="comparison"):
+                change2_5d = duration_returns(index, "5d", available_rows)
+                change2_3mo = duration_returns(index, "3mo", available_rows)
+                
+                results["comparison"] = compare_top_10(change2_5d, change2_3mo)
         
         # Process all duration data
         for duration in durations:
             logger.info(f"Processing {duration} data")
             try:
-                data = safe_download(symbols, period=duration, interval="1d")
-                if data.empty:
-                    # Skip this duration if no data
-                    logger.warning(f"No data available for {duration}")
-                    results[duration] = {
-                        "top_performers": {"Info": 0},
-                        "bottom_performers": {"Info": 0}
-                    }
-                    continue
-                    
-                # Calculate momentum (percentage change)
-                # Check if we have enough data for calculation
-                if data.shape[0] <= 1:
-                    # Not enough data points for percentage change calculation
-                    logger.warning(f"Not enough data points for {duration} calculation, using direct comparison")
-                    if data.shape[0] == 0:
-                        # No data at all
-                        change2 = pd.Series(0, index=symbols)
-                    else:
-                        # Just one data point, calculate vs. first value
-                        first_values = data.iloc[0]
-                        change2 = pd.Series(0, index=first_values.index)
-                else:
-                    # Normal case - calculate percentage change
-                    change = data.pct_change().dropna()
-                    # Calculate total return over period
-                    change2 = (change + 1).prod() - 1
-                
-                # Get top and bottom performers (handling empty datasets)
-                if change2.empty or len(change2) == 0:
-                    top_performers = {"No Data": 0}
-                    bottom_performers = {"No Data": 0}
-                else:
-                    # Limit to exactly 10 stocks (or fewer if not enough data)
-                    max_performers = min(10, len(change2))  # Ensure we don't exceed array size
-                    top_performers_series = change2.nlargest(max_performers)
-                    bottom_performers_series = change2.nsmallest(max_performers)
-                    
-                    # Check for and eliminate duplicates between top and bottom performers
-                    # Convert to sets for efficient lookup
-                    top_symbols = set(top_performers_series.index)
-                    bottom_symbols = set(bottom_performers_series.index)
-                    
-                    # Find overlap (stocks appearing in both lists)
-                    overlap = top_symbols.intersection(bottom_symbols)
-                    
-                    # Remove overlapping stocks based on which list they are more extreme in
-                    for stock in overlap:
-                        # Check absolute value to determine which list the stock is more extreme in
-                        top_value = abs(top_performers_series[stock])
-                        bottom_value = abs(bottom_performers_series[stock])
-                        
-                        # Keep in the list where it's more extreme (higher absolute value)
-                        if top_value >= bottom_value:
-                            # Remove from bottom performers if it's more extreme in top
-                            bottom_performers_series = bottom_performers_series.drop(stock)
-                        else:
-                            # Remove from top performers if it's more extreme in bottom
-                            top_performers_series = top_performers_series.drop(stock)
-                    
-                    # Ensure we still have exactly 10 top and bottom performers after removing overlaps
-                    # (if enough stocks are available)
-                    if len(change2) > max_performers and len(top_performers_series) < max_performers:
-                        remaining_stocks = change2.drop(top_performers_series.index).drop(bottom_performers_series.index)
-                        if not remaining_stocks.empty:
-                            additional_needed = max_performers - len(top_performers_series)
-                            additional_top = remaining_stocks.nlargest(additional_needed)
-                            top_performers_series = pd.concat([top_performers_series, additional_top])
-                            
-                    if len(change2) > max_performers and len(bottom_performers_series) < max_performers:
-                        remaining_stocks = change2.drop(top_performers_series.index).drop(bottom_performers_series.index)
-                        if not remaining_stocks.empty:
-                            additional_needed = max_performers - len(bottom_performers_series) 
-                            additional_bottom = remaining_stocks.nsmallest(additional_needed)
-                            bottom_performers_series = pd.concat([bottom_performers_series, additional_bottom])
-                    
-                    # Sort by performance value to ensure correct order
-                    top_performers_series = top_performers_series.sort_values(ascending=False)
-                    bottom_performers_series = bottom_performers_series.sort_values(ascending=True)
-                    
-                    top_performers = top_performers_series
-                    bottom_performers = bottom_performers_series
+                with DURATION_SECONDS.time(duration=duration):
+                    change2 = duration_returns(index, duration, available_rows)
+                    top_performers, bottom_performers = select_performers(change2)
                 
-                # Convert pandas Series to dictionary for JSON serialization with percentage values
-                # Use OrderedDict to maintain the sorted order
                 results[duration] = {
-                    "top_performers": {stock: round(float(value) * 100, 2) for stock, value in top_performers.items()},
-                    "bottom_performers": {stock: round(float(value) * 100, 2) for stock, value in bottom_performers.items()}
+                    "top_performers": top_performers,
+                    "bottom_performers": bottom_performers
                 }
                 
             except Exception as e:
@@ -317,15 +410,14 @@ def get_momentum_data():
         logger.error(error_message)
         
         # Create a basic structure with error messages
-        results = {
-            "error": error_message,
-            "comparison": {
+        results = {"error": error_message}
+        if COMPARISON in sections:
+            results["comparison"] = {
                 "dropped_from_top_10": [],
                 "entered_top_10": [],
                 "full_5d_top_10": [],
                 "full_3mo_top_10": []
             }
-        }
         
         # Add empty data for each duration
         for duration in durations:
@@ -0,0 +1,221 @@
+import os
+import json
+import uuid
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Snapshots kept on disk; older ones are removed once a newer one is published
+# (workers that still map them keep their pages until they move on)
+KEEP_SNAPSHOTS = 2
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+# Prices are kept at the precision of the symbol files, so a panel read from
+# the matrix equals the one read from the store under the same data version.
+# Snapshots of another dtype (published by an older release) are ignored.
+DTYPE = "float64"
+
+
+def to_day_numbers(dates):
+    """Convert datetime64[D] values into int32 days since 1970-01-01"""
+    return (np.asarray(dates, dtype="datetime64[D]") - _EPOCH).astype(np.int32)
+
+
+def from_day_numbers(days):
+    """Convert int32 days since 1970-01-01 into a DatetimeIndex"""
+    return pd.DatetimeIndex((np.asarray(days, dtype=np.int64) + _EPOCH).astype("datetime64[ns]"), name="Date")
+
+
+class PriceMatrixSnapshot:
+    """
+    One published price matrix, memory-mapped read-only
+
+    values is a float64 (dates x symbols) matrix with NaN where a symbol has
+    no bar, days the int32 day numbers of its rows. The arrays are backed by
+    the page cache, so every process mapping the same snapshot shares them.
+    """
+
+    def __init__(self, directory, pointer):
+        self.token = pointer["token"]
+        self.version = pointer["version"]
+        self.symbols = pointer["symbols"]
+        self.values = np.load(os.path.join(directory, f"values-{self.token}.npy"), mmap_mode="r")
+        self.days = np.load(os.path.join(directory, f"days-{self.token}.npy"), mmap_mode="r")
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def frame(self, symbols, start=None, end=None):
+        """
+        Price panel of the symbols in a window
+
+        Matches PriceStore.read: rows are the dates on which at least one of
+        the symbols has a bar, symbols without bars are NaN columns. When all
+        symbols are requested in stored order the result is a view of the
+        mapped pages.
+
+        Args:
+            symbols: List of symbols (columns of the result)
+            start: Optional first date (inclusive)
+            end: Optional last date (exclusive)
+
+        Returns:
+            DataFrame of float64 prices indexed by date
+        """
+        lo = np.searchsorted(self.days, to_day_numbers(pd.Timestamp(start).date()), side="left") if start else 0
+        hi = np.searchsorted(self.days, to_day_numbers(pd.Timestamp(end).date()), side="left") if end else len(self.days)
+
+        positions = [self._columns.get(symbol, -1) for symbol in symbols]
+        if positions == list(range(len(self.symbols))):
+            block = self.values[lo:hi]
+        else:
+            block = np.full((hi - lo, len(symbols)), np.nan, dtype=self.values.dtype)
+            present = [i for i, position in enumerate(positions) if position >= 0]
+            if present:
+                block[:, present] = self.values[lo:hi, [positions[i] for i in present]]
+
+        days = self.days[lo:hi]
+        has_bar = ~np.isnan(block).all(axis=1) if block.shape[1] else np.zeros(len(days), dtype=bool)
+        if not has_bar.all():
+            block = block[has_bar]
+            days = days[has_bar]
+
+        return pd.DataFrame(block, index=from_day_numbers(days), columns=list(symbols), copy=False)
+
+
+class SharedPriceMatrix:
+    """
+    Price history published as a single memory-mapped matrix
+
+    A publisher writes the float64 values and int32 date index of a new
+    snapshot to fresh files and then atomically replaces a small JSON
+    pointer (current.json) naming the snapshot and the data version it
+    holds. Readers follow the pointer and map the snapshot read-only, so
+    every worker of a pre-forked server shares one copy of the history
+    instead of building its own.
+    """
+
+    def __init__(self, directory):
+        """
+        Initialize the matrix
+
+        Args:
+            directory: Directory of the snapshots and the pointer
+        """
+        self.directory = directory
+        self._snapshot = None
+        self._pointer_stat = None
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _pointer_path(self):
+        return os.path.join(self.directory, "current.json")
+
+    def current(self):
+        """
+        Return the latest published snapshot
+
+        The pointer is stat'ed on every call and re-read only when it changed.
+
+        Returns:
+            PriceMatrixSnapshot, or None if nothing was published yet
+        """
+        try:
+            stat = os.stat(self._pointer_path())
+        except OSError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            if key == self._pointer_stat:
+                return self._snapshot
+            try:
+                with open(self._pointer_path(), "r") as f:
+                    pointer = json.load(f)
+                if pointer.get("dtype") != DTYPE:
+                    logger.info(f"Ignoring shared price matrix of dtype {pointer.get('dtype', 'float32')}")
+                    return None
+                snapshot = PriceMatrixSnapshot(self.directory, pointer)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not map shared price matrix: {str(e)}")
+                return None
+            self._snapshot = snapshot
+            self._pointer_stat = key
+            logger.info(f"Mapped shared price matrix version {snapshot.version}: "
+                        f"{len(snapshot.days)} dates x {len(snapshot.symbols)} symbols")
+            return snapshot
+
+    @property
+    def version(self):
+        """Data version of the latest published snapshot of DTYPE, or None"""
+        try:
+            with open(self._pointer_path(), "r") as f:
+                pointer = json.load(f)
+            return pointer.get("version") if pointer.get("dtype") == DTYPE else None
+        except (OSError, ValueError):
+            return None
+
+    def publish(self, columns, version):
+        """
+        Write a new snapshot and make it the current one
+
+        Args:
+            columns: Dictionary mapping each symbol to its (dates, values)
+                arrays, dates as datetime64[D] in ascending order
+            version: Data version the snapshot holds
+
+        Returns:
+            Token of the new snapshot
+        """
+        symbols = list(columns)
+        non_empty = [dates for dates, _ in columns.values() if len(dates)]
+        all_dates = np.unique(np.concatenate(non_empty)) if non_empty else np.array([], dtype="datetime64[D]")
+
+        values = np.full((len(all_dates), len(symbols)), np.nan, dtype=DTYPE)
+        for col, symbol in enumerate(symbols):
+            dates, column = columns[symbol]
+            if len(dates):
+                values[np.searchsorted(all_dates, dates), col] = column
+
+        token = uuid.uuid4().hex
+        self._save(f"values-{token}.npy", values)
+        self._save(f"days-{token}.npy", to_day_numbers(all_dates))
+
+        tmp_path = f"{self._pointer_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"token": token, "version": version, "dtype": DTYPE, "symbols": symbols}, f)
+        os.replace(tmp_path, self._pointer_path())
+
+        logger.info(f"Published shared price matrix version {version}: {values.shape[0]} dates x {values.shape[1]} symbols")
+        self._remove_old_snapshots(token)
+        return token
+
+    def _save(self, name, array):
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def _remove_old_snapshots(self, current_token):
+        """Delete all but the KEEP_SNAPSHOTS newest snapshots"""
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if name.startswith("values-") and name.endswith(".npy"):
+                token = name[len("values-"):-len(".npy")]
+                try:
+                    snapshots.append((os.path.getmtime(os.path.join(self.directory, name)), token))
+                except OSError:
+                    continue
+        snapshots.sort(reverse=True)
+        for _, token in snapshots[KEEP_SNAPSHOTS:]:
+            if token == current_token:
+                continue
+            for prefix in ("values", "days"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{prefix}-{token}.npy"))
+                except OSError:
+                    pass
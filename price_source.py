@@ -0,0 +1,450 @@
+import os
+import zlib
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance import exceptions as yf_exceptions
+
+import price_store
+from download_scheduler import BatchDownloader, PermanentDownloadError
+
+logger = logging.getLogger(__name__)
+
+# Download scheduler settings for the Yahoo source
+DOWNLOAD_BATCH_SIZE = int(os.environ.get("DOWNLOAD_BATCH_SIZE", 5))
+DOWNLOAD_WORKERS = int(os.environ.get("DOWNLOAD_WORKERS", 4))
+DOWNLOAD_RATE = float(os.environ.get("DOWNLOAD_RATE", 2.0))  # batch requests per second
+
+
+class PriceSource:
+    """
+    Base class for price sources
+
+    A source returns a panel of closing prices indexed by date with one column
+    per requested symbol (NaN where a symbol has no bar). The window is given
+    either as start/end dates (end exclusive, like yfinance) or as a yfinance
+    style period.
+    """
+
+    name = "base"
+
+    # Remote sources are cached in the local price store, local ones are not
+    remote = False
+
+    # Whether fetch serves intervals shorter than a day
+    intraday = False
+
+    @property
+    def version(self):
+        """
+        Identifier of the data a local source serves
+
+        Changes whenever the source would return different prices. Remote
+        sources return None; their data is versioned by the price store.
+        """
+        return None
+
+    def fetch(self, symbols, start=None, end=None, period=None, interval="1d", **options):
+        """
+        Return a price panel for the symbols
+
+        Args:
+            symbols: List of symbols
+            start: First date (YYYY-MM-DD, inclusive)
+            end: Last date (YYYY-MM-DD, exclusive) or None for today
+            period: Period such as "5d" or "1y", used when start is None
+            interval: Bar interval
+            **options: Source specific options
+
+        Returns:
+            DataFrame indexed by date with one column per symbol
+        """
+        raise NotImplementedError
+
+    def _window(self, panel, symbols, start=None, end=None, period=None):
+        """Slice a full panel down to the requested symbols and window"""
+        if start is None and period is not None:
+            start = price_store.period_start(period)
+        if start is not None:
+            panel = panel.loc[panel.index >= pd.Timestamp(start)]
+        if end is not None:
+            panel = panel.loc[panel.index < pd.Timestamp(end)]
+        rows = price_store.period_rows(period) if period is not None else None
+        if rows is not None:
+            panel = panel.tail(rows)
+        return panel.reindex(columns=list(symbols))
+
+
+class YahooPriceSource(PriceSource):
+    """Prices downloaded from Yahoo Finance in concurrent, rate-limited batches"""
+
+    name = "yahoo"
+    remote = True
+    intraday = True
+
+    def __init__(self, batch_size=DOWNLOAD_BATCH_SIZE, max_workers=DOWNLOAD_WORKERS, rate=DOWNLOAD_RATE):
+        """
+        Initialize the source
+
+        Args:
+            batch_size: Symbols per download batch
+            max_workers: Maximum concurrent batches
+            rate: Batch requests allowed per second
+        """
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.rate = rate
+
+    def fetch(self, symbols, start=None, end=None, period=None, interval="1d", max_retries=3, retry_delay=2, **options):
+        """
+        Download prices from Yahoo Finance
+
+        Args:
+            max_retries: Attempts per batch
+            retry_delay: Delay of the first retry in seconds, doubled (with
+                jitter) on every following attempt
+
+        See PriceSource.fetch for the other arguments.
+        """
+        if start is not None:
+            window = {"start": start, "end": end}
+        else:
+            window = {"period": period}
+
+        downloader = BatchDownloader(
+            lambda batch: self._fetch_batch(batch, interval, **window),
+            batch_size=self.batch_size,
+            max_workers=self.max_workers,
+            rate=self.rate,
+            max_retries=max_retries,
+            base_delay=retry_delay
+        )
+        return downloader.download(list(symbols))
+
+    @staticmethod
+    def _fetch_batch(batch, interval, **window):
+        """
+        Download one batch of symbols
+
+        Each symbol is fetched through its own yf.Ticker because yf.download
+        keeps module level state and is not safe to call from several threads.
+        A symbol without data (delisted or renamed) is a miss for that symbol
+        only; transport and rate-limit errors raise so the batch is retried,
+        and an invalid window fails the batch without retries.
+        """
+        prices = {}
+        for symbol in batch:
+            try:
+                history = yf.Ticker(symbol).history(
+                    interval=interval,
+                    timeout=30,
+                    raise_errors=True,
+                    **window
+                )
+            except yf_exceptions.YFTickerMissingError as e:
+                logger.warning(f"No price data for {symbol}: {str(e)}")
+                continue
+            except yf_exceptions.YFInvalidPeriodError as e:
+                raise PermanentDownloadError(str(e)) from e
+            if history.empty:
+                logger.warning(f"No price data returned for {symbol}")
+                continue
+
+            # Prefer adjusted prices when available
+            column = "Adj Close" if "Adj Close" in history.columns else "Close"
+            series = history[column]
+            if series.index.tz is not None:
+                series.index = series.index.tz_localize(None)
+            prices[symbol] = series
+
+        return pd.DataFrame(prices)
+
+
+class FixturePriceSource(PriceSource):
+    """
+    Prices read from a CSV or Parquet fixture file (or an in-memory DataFrame)
+
+    Two layouts are accepted: wide (a date column followed by one column per
+    symbol) and long (date, symbol and close columns).
+    """
+
+    name = "fixture"
+
+    def __init__(self, path=None, frame=None):
+        """
+        Initialize the source
+
+        Args:
+            path: Path to a .csv or .parquet file
+            frame: Price panel to serve instead of a file
+        """
+        if frame is None:
+            frame = self._read(path)
+        self.path = path
+        self.panel = frame.sort_index()
+
+    @staticmethod
+    def _read(path):
+        if path is None:
+            raise ValueError("FixturePriceSource needs a path or a frame")
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+
+        columns = {column.lower(): column for column in frame.columns}
+        if {"date", "symbol", "close"} <= set(columns):
+            # Long layout
+            frame = frame.pivot(index=columns["date"], columns=columns["symbol"], values=columns["close"])
+        else:
+            # Wide layout, first column holds the dates
+            frame = frame.set_index(frame.columns[0])
+
+        frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index), name="Date")
+        frame.columns.name = None
+        return frame.astype(np.float64)
+
+    @property
+    def version(self):
+        if self.path is not None and os.path.exists(self.path):
+            return f"fixture:{self.path}:{os.path.getmtime(self.path)}"
+        return f"fixture:{id(self.panel)}:{self.panel.shape}"
+
+    @property
+    def symbols(self):
+        """Symbols available in the fixture"""
+        return list(self.panel.columns)
+
+    def fetch(self, symbols, start=None, end=None, period=None, interval="1d", **options):
+        return self._window(self.panel, symbols, start, end, period)
+
+
+class DatabasePriceSource(PriceSource):
+    """
+    Daily closes read from the SQL storage (see storage.py)
+
+    Each fetch is a single range query on the daily_bars table, so the data
+    is served locally without the price store.
+    """
+
+    name = "database"
+
+    def __init__(self, url=None):
+        """
+        Initialize the source
+
+        Args:
+            url: Optional SQLAlchemy database URL (default: DATABASE_URL)
+        """
+        # SQLAlchemy is only needed by this source
+        import storage
+        self.storage = storage.Storage(url) if url else storage.get_storage()
+
+    @property
+    def version(self):
+        return f"database:{self.storage.version}"
+
+    def fetch(self, symbols, start=None, end=None, period=None, interval="1d", **options):
+        if interval != "1d":
+            raise ValueError(f"DatabasePriceSource only stores daily bars, not {interval}")
+        if start is None and period is not None:
+            start = price_store.period_start(period)
+        return self._window(self.storage.read_bars(symbols, start, end), symbols, start, end, period)
+
+
+class SyntheticPriceSource(PriceSource):
+    """
+    Seeded synthetic market following geometric Brownian motion
+
+    Every symbol gets its own drift (spread around `drift`), volatility
+    (spread around `volatility`) and starting price. Overnight gaps add
+    occasional price jumps and a fraction of bars is replaced with NaN to mimic
+    missing data. A symbol's series only depends on the seed and the symbol
+    name, so any subset of a universe is consistent with the whole.
+    """
+
+    name = "synthetic"
+
+    def __init__(
+        self,
+        seed=42,
+        start="2015-01-01",
+        end=None,
+        drift=0.10,
+        volatility=0.25,
+        dispersion=0.5,
+        gap_probability=0.01,
+        gap_size=0.05,
+        nan_probability=0.0
+    ):
+        """
+        Initialize the generator
+
+        Args:
+            seed: Base random seed
+            start: First business day of the generated history
+            end: Last business day (default: today)
+            drift: Mean annual drift
+            volatility: Mean annual volatility
+            dispersion: Relative spread of drift and volatility across symbols
+            gap_probability: Daily probability of an overnight price jump
+            gap_size: Standard deviation of the log size of a jump
+            nan_probability: Daily probability of a missing bar
+        """
+        self.seed = seed
+        self.dates = pd.bdate_range(start, end or datetime.now().date(), name="Date")
+        self.drift = drift
+        self.volatility = volatility
+        self.dispersion = dispersion
+        self.gap_probability = gap_probability
+        self.gap_size = gap_size
+        self.nan_probability = nan_probability
+        self._series = {}
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        parameters = (self.seed, self.drift, self.volatility, self.dispersion,
+                      self.gap_probability, self.gap_size, self.nan_probability)
+        return f"synthetic:{parameters}:{self.dates[0].date()}:{self.dates[-1].date()}"
+
+    @staticmethod
+    def universe(size, prefix="SYN"):
+        """Return `size` synthetic symbol names"""
+        width = max(4, len(str(size)))
+        return [f"{prefix}{i:0{width}d}.NS" for i in range(1, size + 1)]
+
+    def _generate(self, symbol):
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        days = len(self.dates)
+        dt = 1 / 252
+
+        drift = self.drift * (1 + self.dispersion * rng.standard_normal())
+        volatility = abs(self.volatility * (1 + self.dispersion * rng.standard_normal() / 2))
+        start_price = rng.uniform(50, 5000)
+
+        log_returns = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * rng.standard_normal(days)
+        gaps = rng.random(days) < self.gap_probability
+        log_returns[gaps] += self.gap_size * rng.standard_normal(gaps.sum())
+        log_returns[0] = 0.0
+
+        prices = start_price * np.exp(np.cumsum(log_returns))
+        if self.nan_probability > 0:
+            prices[rng.random(days) < self.nan_probability] = np.nan
+        return prices
+
+    def history(self, symbols):
+        """Return the full generated history of the symbols"""
+        columns = []
+        for symbol in symbols:
+            with self._lock:
+                series = self._series.get(symbol)
+            if series is None:
+                series = self._generate(symbol)
+                with self._lock:
+                    self._series[symbol] = series
+            columns.append(series)
+
+        matrix = np.column_stack(columns) if columns else np.empty((len(self.dates), 0))
+        return pd.DataFrame(matrix, index=self.dates, columns=list(symbols))
+
+    def fetch(self, symbols, start=None, end=None, period=None, interval="1d", **options):
+        if interval != "1d":
+            raise ValueError(f"SyntheticPriceSource only generates daily bars, not {interval}")
+        return self._window(self.history(symbols), symbols, start, end, period)
+
+
+def data_version(symbols, start=None, end=None):
+    """
+    Identify the price data the engines would read for a window
+
+    For remote sources the price store is refreshed first, so the version
+    reflects any bars that arrived since the last check.
+
+    Args:
+        symbols: List of symbols
+        start: First date (YYYY-MM-DD, inclusive)
+        end: Optional last date (YYYY-MM-DD, exclusive)
+
+    Returns:
+        Version string, or None if the data is not versioned (remote source
+        with the price store disabled)
+    """
+    source = get_price_source()
+    if not source.remote:
+        return source.version
+    if not price_store.STORE_ENABLED:
+        return None
+
+    store = price_store.get_store()
+    version = store.refresh(
+        symbols,
+        start,
+        end,
+        fetch=lambda fetch_symbols, fetch_start, fetch_end: source.fetch(fetch_symbols, start=fetch_start, end=fetch_end)
+    )
+    return f"{source.name}:{store.interval}:{version}"
+
+
+def stored_version():
+    """
+    Version of the price data as it is stored now, without refreshing it
+
+    Only reads local state (the price store manifest for remote sources), so
+    it can be checked on the request path before anything is downloaded.
+
+    Returns:
+        Version string in the format of data_version, or None if the data is
+        not versioned
+    """
+    source = get_price_source()
+    if not source.remote:
+        return source.version
+    if not price_store.STORE_ENABLED:
+        return None
+    store = price_store.get_store()
+    return f"{source.name}:{store.interval}:{store.version}"
+
+
+def source_from_config(spec):
+    """
+    Build a price source from a configuration string
+
+    Accepted values: "yahoo", "synthetic", "synthetic:<seed>",
+    "fixture:<path>", "database" and "database:<url>".
+    """
+    name, _, argument = (spec or "yahoo").partition(":")
+    if name == "yahoo":
+        return YahooPriceSource()
+    if name == "synthetic":
+        return SyntheticPriceSource(seed=int(argument) if argument else 42)
+    if name == "fixture":
+        return FixturePriceSource(path=argument)
+    if name == "database":
+        return DatabasePriceSource(url=argument or None)
+    raise ValueError(f"Unknown price source: {spec}")
+
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_price_source():
+    """Return the configured price source (PRICE_SOURCE, default: yahoo)"""
+    global _source
+    with _source_lock:
+        if _source is None:
+            _source = source_from_config(os.environ.get("PRICE_SOURCE", "yahoo"))
+            logger.info(f"Using {_source.name} price source")
+        return _source
+
+
+def set_price_source(source):
+    """Replace the price source used by the analytics engines"""
+    global _source
+    with _source_lock:
+        _source = source
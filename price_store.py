@@ -0,0 +1,495 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from price_matrix import SharedPriceMatrix
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Location of the on-disk store (one sub-directory per bar interval)
+STORE_DIR = os.environ.get(
+    "PRICE_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "price_store")
+)
+
+# Seconds after which a symbol is checked again for new bars
+MAX_AGE_SECONDS = int(os.environ.get("PRICE_STORE_MAX_AGE", 3600))
+
+# Set PRICE_STORE_ENABLED=0 to always download directly from the source
+STORE_ENABLED = os.environ.get("PRICE_STORE_ENABLED", "1") != "0"
+
+# Set PRICE_MATRIX_ENABLED=0 to read every symbol file instead of the shared
+# memory-mapped matrix
+MATRIX_ENABLED = os.environ.get("PRICE_MATRIX_ENABLED", "1") != "0"
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def period_start(period, today=None):
+    """
+    Convert a yfinance style period ("5d", "3mo", "1y") into a start date
+
+    Day periods count trading days, so the returned start date leaves enough
+    calendar slack to cover weekends and holidays; callers trim the result with
+    period_rows().
+
+    Args:
+        period: Period string
+        today: Reference date (default: today)
+
+    Returns:
+        Start date as YYYY-MM-DD, or None if the period is not supported
+    """
+    match = _PERIOD_PATTERN.match(period or "")
+    if not match:
+        return None
+
+    count, unit = int(match.group(1)), match.group(2)
+    today = pd.Timestamp(today or datetime.now().date()).normalize()
+
+    if unit == "d":
+        start = today - timedelta(days=count * 2 + 7)
+    elif unit == "wk":
+        start = today - timedelta(weeks=count)
+    elif unit == "mo":
+        start = today - pd.DateOffset(months=count)
+    else:
+        start = today - pd.DateOffset(years=count)
+
+    return start.strftime('%Y-%m-%d')
+
+
+def period_rows(period):
+    """Return the number of trailing rows a day period covers, or None"""
+    match = _PERIOD_PATTERN.match(period or "")
+    if match and match.group(2) == "d":
+        return int(match.group(1))
+    return None
+
+
+def _to_days(index):
+    """Convert a DatetimeIndex (naive or tz-aware) into datetime64[D] values"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values.astype('datetime64[D]')
+
+
+class PriceStore:
+    """
+    Columnar on-disk price store keyed by symbol and date
+
+    Every symbol is stored as two NumPy files, one with the bar dates
+    (datetime64[D]) and one with the prices (float64), which are read back
+    memory-mapped. A small JSON manifest records, per symbol, the earliest
+    date the store covers (moved back only by downloads that returned bars)
+    and when, and from which date, the source was last checked, so warm reads
+    never touch the network.
+    """
+
+    def __init__(self, root=STORE_DIR, interval="1d", max_age_seconds=MAX_AGE_SECONDS, shared_matrix=MATRIX_ENABLED):
+        """
+        Initialize the store
+
+        Args:
+            root: Root directory of the store
+            interval: Bar interval, used as the sub-directory name
+            max_age_seconds: Seconds after which a symbol is refreshed
+            shared_matrix: Publish and read the shared price matrix (see
+                price_matrix.SharedPriceMatrix)
+        """
+        self.root = os.path.join(root, interval)
+        self.interval = interval
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.RLock()
+        self._publisher = None
+        os.makedirs(self.root, exist_ok=True)
+        self.matrix = SharedPriceMatrix(os.path.join(self.root, "matrix")) if shared_matrix else None
+
+    # ------------------------------------------------------------------
+    # File layout
+    # ------------------------------------------------------------------
+
+    def _symbol_paths(self, symbol):
+        """Return the (dates, values) file paths of a symbol"""
+        safe_name = symbol.replace(os.sep, "_")
+        return (
+            os.path.join(self.root, f"{safe_name}.dates.npy"),
+            os.path.join(self.root, f"{safe_name}.values.npy")
+        )
+
+    def _manifest_path(self):
+        return os.path.join(self.root, "manifest.json")
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"version": 0, "symbols": {}}
+
+    def _write_manifest(self, manifest):
+        tmp_path = f"{self._manifest_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _file_lock(self):
+        """Open an exclusive cross-process lock on the store directory"""
+        lock_file = open(os.path.join(self.root, ".lock"), "a")
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    @staticmethod
+    def _save_array(path, array):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self):
+        """Counter incremented every time new bars are written"""
+        return self._read_manifest().get("version", 0)
+
+    def read_symbol(self, symbol):
+        """
+        Read the stored bars of a symbol
+
+        Returns:
+            Tuple of (dates, values) arrays, empty if the symbol is not stored
+        """
+        dates_path, values_path = self._symbol_paths(symbol)
+        try:
+            dates = np.load(dates_path, mmap_mode='r')
+            values = np.load(values_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return np.array([], dtype='datetime64[D]'), np.array([], dtype=np.float64)
+        return dates, values
+
+    def read(self, symbols, start=None, end=None):
+        """
+        Read a price panel from the store
+
+        Args:
+            symbols: List of symbols (columns of the result)
+            start: Optional first date (inclusive)
+            end: Optional last date (exclusive, like yfinance)
+
+        Returns:
+            DataFrame of float64 prices indexed by date with one column per
+            symbol, from the shared matrix when it holds the store's current
+            version and from the symbol files otherwise.
+        """
+        if self.matrix is not None:
+            snapshot = self.matrix.current()
+            if snapshot is not None and snapshot.version == self.version:
+                return snapshot.frame(symbols, start=start, end=end)
+
+        start_day = np.datetime64(pd.Timestamp(start).date(), 'D') if start else None
+        end_day = np.datetime64(pd.Timestamp(end).date(), 'D') if end else None
+
+        columns = []
+        for symbol in symbols:
+            dates, values = self.read_symbol(symbol)
+            lo = np.searchsorted(dates, start_day, side='left') if start_day is not None else 0
+            hi = np.searchsorted(dates, end_day, side='left') if end_day is not None else len(dates)
+            columns.append((dates[lo:hi], values[lo:hi]))
+
+        non_empty = [dates for dates, _ in columns if len(dates)]
+        all_dates = np.unique(np.concatenate(non_empty)) if non_empty else np.array([], dtype='datetime64[D]')
+
+        matrix = np.full((len(all_dates), len(symbols)), np.nan)
+        for col, (dates, values) in enumerate(columns):
+            if len(dates):
+                matrix[np.searchsorted(all_dates, dates), col] = values
+
+        index = pd.DatetimeIndex(all_dates.astype('datetime64[ns]'), name="Date")
+        return pd.DataFrame(matrix, index=index, columns=list(symbols))
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def write(self, price_data, covered_from=None, checked_at=None, symbols=None):
+        """
+        Merge a downloaded price panel into the store
+
+        Bars in price_data replace stored bars with the same date, so the last
+        (possibly incomplete) bar is corrected by the next refresh.
+
+        Args:
+            price_data: DataFrame indexed by date with one column per symbol
+            covered_from: Optional start date the download was requested from
+            checked_at: Epoch seconds of the download (default: now)
+            symbols: Optional list of the symbols that were requested. Those
+                without any bar in price_data (delisted, failed batch) are
+                only recorded as checked from covered_from, so they are not
+                downloaded again until they are due for a refresh; their
+                covered range is left as it is.
+
+        Returns:
+            List of symbols that received at least one bar
+        """
+        checked_at = checked_at or time.time()
+        updated = []
+
+        if price_data is None:
+            price_data = pd.DataFrame()
+        if price_data.empty and not symbols:
+            return updated
+
+        new_dates_all = _to_days(price_data.index)
+
+        with self._lock:
+            lock_file = self._file_lock()
+            try:
+                manifest = self._read_manifest()
+                changed = False
+
+                for symbol in price_data.columns:
+                    column = price_data[symbol].to_numpy(dtype=np.float64)
+                    valid = ~np.isnan(column)
+                    if not valid.any():
+                        continue
+
+                    new_dates = new_dates_all[valid]
+                    new_values = column[valid]
+                    old_dates, old_values = self.read_symbol(symbol)
+
+                    keep = ~np.isin(old_dates, new_dates)
+                    dates = np.concatenate([np.asarray(old_dates)[keep], new_dates])
+                    values = np.concatenate([np.asarray(old_values)[keep], new_values])
+                    order = np.argsort(dates, kind='stable')
+                    dates, values = dates[order], values[order]
+
+                    if len(dates) != len(old_dates) or not np.array_equal(values, old_values):
+                        dates_path, values_path = self._symbol_paths(symbol)
+                        self._save_array(dates_path, dates)
+                        self._save_array(values_path, values)
+                        changed = True
+
+                    meta = manifest["symbols"].setdefault(symbol, {})
+                    meta["last_checked"] = checked_at
+                    if covered_from is not None:
+                        previous = meta.get("covered_from")
+                        meta["covered_from"] = min(previous, covered_from) if previous else covered_from
+                    elif "covered_from" not in meta:
+                        meta["covered_from"] = str(dates[0])
+                    updated.append(symbol)
+
+                for symbol in symbols or []:
+                    if symbol in updated:
+                        continue
+                    meta = manifest["symbols"].setdefault(symbol, {})
+                    meta["last_checked"] = checked_at
+                    if covered_from is not None:
+                        previous = meta.get("checked_from")
+                        meta["checked_from"] = min(previous, covered_from) if previous else covered_from
+
+                if changed:
+                    manifest["version"] = manifest.get("version", 0) + 1
+                self._write_manifest(manifest)
+            finally:
+                lock_file.close()
+
+        return updated
+
+    # ------------------------------------------------------------------
+    # Incremental refresh
+    # ------------------------------------------------------------------
+
+    def plan_refresh(self, symbols, start, end=None, now=None):
+        """
+        Work out which symbols need a download and from which date
+
+        Args:
+            symbols: Symbols that will be read
+            start: First date that will be read (YYYY-MM-DD)
+            end: Optional exclusive end date of the read
+            now: Epoch seconds used as the current time (default: now)
+
+        Returns:
+            Dictionary mapping a fetch start date to the symbols to fetch from it
+        """
+        now = now or time.time()
+        start_str = pd.Timestamp(start).strftime('%Y-%m-%d')
+        end_str = pd.Timestamp(end).strftime('%Y-%m-%d') if end else None
+        manifest = self._read_manifest()
+        plan = {}
+
+        for symbol in symbols:
+            meta = manifest["symbols"].get(symbol, {})
+            last_checked = meta.get("last_checked", 0)
+            fresh = now - last_checked <= self.max_age_seconds
+
+            if meta.get("covered_from", "9999-12-31") > start_str:
+                # History does not reach back far enough, fetch the whole
+                # range unless a fetch of it came back empty or failed recently
+                if not fresh or meta.get("checked_from", "9999-12-31") > start_str:
+                    plan.setdefault(start_str, []).append(symbol)
+                continue
+
+            if fresh:
+                continue
+
+            # Reads that end before the last check cannot contain new bars
+            checked_day = datetime.fromtimestamp(last_checked).strftime('%Y-%m-%d')
+            if end_str is not None and end_str <= checked_day:
+                continue
+
+            # Re-fetch from the last stored bar so an incomplete bar is corrected
+            dates, _ = self.read_symbol(symbol)
+            fetch_from = str(dates[-1]) if len(dates) else meta.get("covered_from", start_str)
+            plan.setdefault(fetch_from, []).append(symbol)
+
+        return plan
+
+    def refresh(self, symbols, start, end, fetch):
+        """
+        Download the bars of a window that are missing from the store
+
+        Args:
+            symbols: List of symbols
+            start: First date (YYYY-MM-DD, inclusive)
+            end: Optional last date (YYYY-MM-DD, exclusive)
+            fetch: Callable fetch(symbols, start, end) returning a price panel
+                for the missing bars
+
+        A new version is published as the shared matrix on a background
+        thread (see publish_matrix_in_background); until then read() uses the
+        symbol files.
+
+        Returns:
+            Store version after the refresh
+        """
+        plan = self.plan_refresh(symbols, start, end)
+        for fetch_start, fetch_symbols in plan.items():
+            logger.info(f"Price store refresh: {len(fetch_symbols)} symbols from {fetch_start}")
+            checked_at = time.time()
+            try:
+                fetched = fetch(fetch_symbols, fetch_start, None)
+            except Exception as e:
+                logger.error(f"Error refreshing price store from {fetch_start}: {str(e)}")
+                fetched = None
+            # Symbols that came back empty are checked again after max_age_seconds
+            self.write(fetched, covered_from=fetch_start, checked_at=checked_at, symbols=fetch_symbols)
+
+        version = self.version
+        if self.matrix is not None and self.matrix.version != version:
+            self.publish_matrix_in_background()
+        return version
+
+    def publish_matrix_in_background(self):
+        """
+        Publish the shared price matrix on a background thread
+
+        Rebuilding the matrix reads every symbol file, so it is kept off the
+        request threads. At most one publisher runs per store; it publishes
+        again if the store changed while it was writing.
+
+        Returns:
+            The publisher thread, or None if one is already running
+        """
+        if self.matrix is None:
+            return None
+        with self._lock:
+            if self._publisher is not None:
+                return None
+            self._publisher = threading.Thread(
+                target=self._publish_until_current, name=f"price-matrix-{self.interval}", daemon=True
+            )
+            self._publisher.start()
+            return self._publisher
+
+    def _publish_until_current(self):
+        try:
+            while True:
+                published = self.publish_matrix()
+                # Writes hold the lock, so none can slip in between this
+                # check and clearing the publisher
+                with self._lock:
+                    if published == self.version:
+                        self._publisher = None
+                        return
+        except Exception as e:
+            logger.error(f"Error publishing shared price matrix: {str(e)}")
+            with self._lock:
+                self._publisher = None
+
+    def publish_matrix(self):
+        """
+        Publish the whole store as a new shared price matrix
+
+        Runs under the store's cross-process lock; a process that finds the
+        matrix already at the current version (published by another worker)
+        does nothing.
+
+        Returns:
+            Version of the published matrix, or None if it is disabled
+        """
+        if self.matrix is None:
+            return None
+        with self._lock:
+            lock_file = self._file_lock()
+            try:
+                manifest = self._read_manifest()
+                version = manifest.get("version", 0)
+                if self.matrix.version == version:
+                    return version
+                columns = {}
+                for symbol in sorted(manifest["symbols"]):
+                    dates, values = self.read_symbol(symbol)
+                    columns[symbol] = (np.asarray(dates), np.asarray(values))
+                self.matrix.publish(columns, version)
+                return version
+            finally:
+                lock_file.close()
+
+    def load(self, symbols, start, end=None, fetch=None):
+        """
+        Read a price panel, downloading only the bars missing from the store
+
+        Args:
+            symbols: List of symbols
+            start: First date (YYYY-MM-DD, inclusive)
+            end: Optional last date (YYYY-MM-DD, exclusive)
+            fetch: Callable fetch(symbols, start, end) returning a price panel
+                for the missing bars. When omitted the store is read as is.
+
+        Returns:
+            DataFrame indexed by date with one column per symbol
+        """
+        if fetch is not None:
+            self.refresh(symbols, start, end, fetch)
+
+        return self.read(symbols, start=start, end=end)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(interval="1d"):
+    """Return the shared PriceStore instance for an interval"""
+    with _stores_lock:
+        if interval not in _stores:
+            _stores[interval] = PriceStore(interval=interval)
+        return _stores[interval]
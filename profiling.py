@@ -0,0 +1,185 @@
+import os
+import io
+import re
+import json
+import time
+import uuid
+import pstats
+import logging
+import cProfile
+import threading
+from functools import wraps
+
+from flask import request, make_response
+
+logger = logging.getLogger(__name__)
+
+# Profiling must be switched on explicitly; when off, the decorated views are
+# returned unchanged and requests pay nothing
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+
+# Optional shared secret; when set, profiled requests must send it in X-Profile-Token
+PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+
+# Location and size of the ring of saved profiles
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "profiles")
+)
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+
+# Functions listed in the X-Profile-Top header and in a saved summary
+HEADER_FUNCTIONS = 5
+SUMMARY_FUNCTIONS = 30
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# cProfile cannot always run two profilers at once (Python 3.12+); profiled
+# requests arriving while another one runs are served unprofiled
+_profiler_lock = threading.Lock()
+
+
+def profile_requested():
+    """True if the current request asks to be profiled (X-Profile header or profile query flag)"""
+    flag = request.headers.get("X-Profile") or request.args.get("profile")
+    if flag not in ("1", "true", "yes"):
+        return False
+    if PROFILING_TOKEN and request.headers.get("X-Profile-Token") != PROFILING_TOKEN:
+        logger.warning(f"Ignoring profile request for {request.path} without a valid token")
+        return False
+    return True
+
+
+def top_functions(profile, limit):
+    """
+    Functions with the highest cumulative time of a profile
+
+    Returns:
+        List of dictionaries with the function, call count, total and
+        cumulative time (milliseconds)
+    """
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3)
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _save(profile_id, profile, summary):
+    """Write the raw profile and its summary, then trim the ring to PROFILE_KEEP"""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json"), "w") as f:
+            json.dump(summary, f)
+    except Exception as e:
+        logger.error(f"Could not save profile {profile_id}: {str(e)}")
+        return
+
+    for old in list_profiles()[PROFILE_KEEP:]:
+        for extension in ("prof", "json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f"{old['id']}.{extension}"))
+            except OSError:
+                pass
+
+
+def list_profiles():
+    """Summaries of the saved profiles, newest first (without the function lists)"""
+    summaries = []
+    try:
+        names = os.listdir(PROFILE_DIR)
+    except OSError:
+        return summaries
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                summary = json.load(f)
+        except Exception:
+            continue
+        summary.pop("functions", None)
+        summaries.append(summary)
+    summaries.sort(key=lambda summary: summary.get("created_at", 0), reverse=True)
+    return summaries
+
+
+def load_profile(profile_id):
+    """Saved summary of a profile, or None if it is unknown or was rotated out"""
+    if not _PROFILE_ID.match(profile_id or ""):
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, f"{profile_id}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def profile_path(profile_id):
+    """Path of the raw pstats file of a profile, or None"""
+    if not _PROFILE_ID.match(profile_id or ""):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.prof")
+    return path if os.path.isfile(path) else None
+
+
+def profiled(view):
+    """
+    Decorator running a view under cProfile when the request asks for it
+
+    Profiled responses carry X-Profile-Id and X-Profile-Top (the functions
+    with the highest cumulative time); the full profile is saved to the
+    on-disk ring and served by the profile endpoints. When PROFILING_ENABLED
+    is off the view is returned as is.
+    """
+    if not PROFILING_ENABLED:
+        return view
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profile_requested():
+            return view(*args, **kwargs)
+        if not _profiler_lock.acquire(blocking=False):
+            response = make_response(view(*args, **kwargs))
+            response.headers["X-Profile"] = "busy"
+            return response
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profile.enable()
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                profile.disable()
+        finally:
+            _profiler_lock.release()
+        elapsed = time.perf_counter() - start
+
+        profile_id = uuid.uuid4().hex
+        functions = top_functions(profile, SUMMARY_FUNCTIONS)
+        _save(profile_id, profile, {
+            "id": profile_id,
+            "created_at": time.time(),
+            "endpoint": request.endpoint,
+            "url": request.full_path,
+            "status": response.status_code,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "functions": functions
+        })
+        logger.info(f"Profiled {request.full_path} in {elapsed:.3f}s as {profile_id}")
+
+        response.headers["X-Profile-Id"] = profile_id
+        response.headers["X-Profile-Top"] = "; ".join(
+            f"{row['function']}={row['cumulative_ms']}ms" for row in functions[:HEADER_FUNCTIONS]
+        )
+        return response
+
+    return wrapper
@@ -0,0 +1,193 @@
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+# Exchange time zone used to decide which trading session a request belongs to
+MARKET_TIMEZONE = "Asia/Kolkata"
+
+
+def trading_session(now=None):
+    """
+    Return the trading session a point in time belongs to
+
+    Weekends map to the preceding Friday. Exchange holidays are not tracked,
+    they simply produce a session whose data matches the previous one.
+
+    Args:
+        now: Optional timezone-aware datetime (default: current time)
+
+    Returns:
+        Session date as YYYY-MM-DD
+    """
+    zone = ZoneInfo(MARKET_TIMEZONE)
+    now = now if now is not None else datetime.now(zone)
+    if now.tzinfo is not None:
+        now = now.astimezone(zone)
+    day = now.date()
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day.strftime('%Y-%m-%d')
+
+
+def is_error_result(result):
+    """Return True if a computed result must not be cached"""
+    return not isinstance(result, dict) or "error" in result
+
+
+class StaleWhileRevalidateCache:
+    """
+    Result cache with a TTL that keeps serving stale data while refreshing
+
+    Fresh entries are returned directly. Once an entry is older than the TTL
+    it is still returned, and a single background thread recomputes it.
+    Results flagged as errors are never stored, so a failed refresh leaves the
+    last good copy in place.
+    """
+
+    def __init__(self, ttl_seconds, name="cache", is_error=is_error_result):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: Age after which an entry is refreshed in the background
+            name: Name used in log messages
+            is_error: Callable returning True for results that must not be cached
+        """
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.is_error = is_error
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def _cache_info(self, key, entry, stale):
+        age = time.time() - entry["computed_at"]
+        return {
+            "key": key,
+            "cached": True,
+            "stale": stale,
+            "computed_at": datetime.fromtimestamp(entry["computed_at"]).isoformat(),
+            "age_seconds": round(age, 3)
+        }
+
+    def _store(self, key, value, group=None):
+        entry = {"value": value, "computed_at": time.time(), "group": group}
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def _refresh(self, key, compute, group=None):
+        outcome = "refresh_failures"
+        try:
+            value = compute()
+            if self.is_error(value):
+                logger.warning(f"{self.name}: background refresh of {key} returned an error, keeping stale data")
+            else:
+                self._store(key, value, group)
+                outcome = "refreshes"
+                logger.info(f"{self.name}: refreshed {key}")
+        except Exception as e:
+            logger.error(f"{self.name}: background refresh of {key} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                self._stats[outcome] += 1
+
+    def _start_refresh(self, key, compute, group=None):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        thread = threading.Thread(
+            target=self._refresh,
+            args=(key, compute, group),
+            name=f"{self.name}-refresh",
+            daemon=True
+        )
+        thread.start()
+
+    def latest(self, group=None):
+        """Return (key, entry) of the most recently computed entry in a group, or (None, None)"""
+        with self._lock:
+            keys = [k for k, entry in self._entries.items() if entry["group"] == group]
+            if not keys:
+                return None, None
+            key = max(keys, key=lambda k: self._entries[k]["computed_at"])
+            return key, self._entries[key]
+
+    def get(self, key, compute, group=None):
+        """
+        Return the cached value for key, computing it if needed
+
+        Args:
+            key: Cache key
+            compute: Callable with no arguments producing the value
+            group: Optional group of related keys (e.g. the same query for
+                different sessions). A new key replaces older keys of its
+                group, and an error falls back to the group's last good value.
+
+        Returns:
+            Tuple of (value, cache_info). cache_info describes whether the
+            value came from the cache and how old it is.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+
+        if entry is not None:
+            stale = time.time() - entry["computed_at"] > self.ttl_seconds
+            with self._lock:
+                self._stats["stale_hits" if stale else "hits"] += 1
+            if stale:
+                self._start_refresh(key, compute, group)
+            return entry["value"], self._cache_info(key, entry, stale)
+
+        # Cache miss: compute synchronously
+        start = time.time()
+        value = compute()
+        if not self.is_error(value):
+            self._store(key, value, group)
+            with self._lock:
+                # Older entries of the same group (earlier sessions) are no longer needed
+                for old_key in [k for k, entry in self._entries.items() if k != key and entry["group"] == group]:
+                    del self._entries[old_key]
+            return value, {
+                "key": key,
+                "cached": False,
+                "stale": False,
+                "computed_at": datetime.fromtimestamp(start).isoformat(),
+                "age_seconds": 0.0
+            }
+
+        # Never replace good data with an error: fall back to the last good copy
+        previous_key, previous = self.latest(group)
+        if previous is not None:
+            logger.warning(f"{self.name}: computing {key} failed, serving data from {previous_key}")
+            return previous["value"], self._cache_info(previous_key, previous, True)
+
+        return value, {
+            "key": key,
+            "cached": False,
+            "stale": False,
+            "computed_at": datetime.fromtimestamp(start).isoformat(),
+            "age_seconds": 0.0
+        }
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit, miss and background refresh counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+        return stats
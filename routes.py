@@ -1,14 +1,238 @@
+import os
 import json
+import hashlib
 import logging
+import threading
 import traceback
 from datetime import datetime, timedelta
-from flask import request, jsonify, render_template
+import time
+from flask import request, jsonify, render_template, Response, stream_with_context, g, send_file
 from app import app
-import momentumnifty100
-from momentum_backtest import run_momentum_backtest
+# numpy, pandas and yfinance load on first use of an engine, not at startup
+from engines import momentumnifty100, momentum_backtest as backtest_engine, backtest_sweep, price_source, storage, intraday
+from result_cache import StaleWhileRevalidateCache, trading_session
+from coalesce import SingleFlight
+from backtest_jobs import BacktestJobManager, QueueFullError, SUCCEEDED
+from backtest_cache import BacktestResultCache, result_key
+from serialization import columnar_backtest, json_response, compress_response, etag_matches
+import universes
+import metrics
+import profiling
+from profiling import profiled
 
 logger = logging.getLogger(__name__)
 
+# Momentum analysis results, keyed by trading session
+momentum_cache = StaleWhileRevalidateCache(
+    ttl_seconds=int(os.environ.get("MOMENTUM_CACHE_TTL", 900)),
+    name="momentum-analysis"
+)
+
+# Concurrent identical computations share a single execution
+momentum_flight = SingleFlight(name="momentum-analysis")
+backtest_flight = SingleFlight(name="momentum-backtest")
+intraday_flight = SingleFlight(name="momentum-intraday")
+refresh_flight = SingleFlight(name="price-refresh")
+
+# Backtest results by parameters, universe and price data version
+backtest_cache = BacktestResultCache()
+
+# Record every computed backtest and its holdings in the SQL storage (on by
+# default when DATABASE_URL is set)
+RECORD_BACKTEST_RUNS = os.environ.get("RECORD_BACKTEST_RUNS", "1" if os.environ.get("DATABASE_URL") else "0") == "1"
+
+# Analysis responses carry an ETag and may be stored, but must be revalidated
+# before reuse; the answer is a 304 until the price data changes
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+def backtest_data_version(parameters):
+    """Version of the price data a backtest with these parameters reads, or None"""
+    return price_source.data_version(
+        parameters['symbols'],
+        backtest_engine.buffer_start_date(parameters['start_date']),
+        parameters['end_date']
+    )
+
+def refresh_backtest_data(parameters):
+    """
+    Bring the prices a backtest reads up to date on a background thread
+    
+    Used after a 304, which is answered from the stored data version. Only
+    remote sources are refreshed; concurrent refreshes of a window share one
+    download.
+    """
+    if not price_source.get_price_source().remote:
+        return
+    key = (tuple(parameters['symbols']), parameters['start_date'], parameters['end_date'])
+    
+    def refresh():
+        try:
+            refresh_flight.do(key, backtest_data_version, parameters)
+        except Exception as e:
+            logger.error(f"Background price refresh failed: {str(e)}")
+    
+    threading.Thread(target=refresh, name="price-refresh", daemon=True).start()
+
+def run_cached_backtest(universe=universes.DEFAULT_UNIVERSE, progress=None, version=None, **parameters):
+    """
+    Run a backtest through the result cache
+    
+    The price data is brought up to date first, so a result cached before new
+    bars arrived is never served. Misses are computed once for all concurrent
+    identical requests. Runs with a progress callback (backtest jobs, which
+    can be cancelled from it) run on their own: a cancellation raised in a
+    shared run would fail every caller waiting on it.
+    
+    Args:
+        universe: Universe name the symbols belong to
+        progress: Optional per-rebalance progress callback
+        version: Price data version when the caller already looked it up
+        **parameters: Keyword arguments for run_momentum_backtest
+    
+    Returns:
+        Backtest result dictionary
+    """
+    flight_key = (tuple(parameters['symbols']), parameters['start_date'], parameters['end_date'],
+                  parameters['initial_investment'], parameters['rebalance_period_days'])
+    
+    def compute():
+        if progress is not None:
+            return backtest_engine.run_momentum_backtest(progress=progress, **parameters)
+        return backtest_flight.do(flight_key, backtest_engine.run_momentum_backtest, **parameters)
+    
+    if version is None:
+        version = backtest_data_version(parameters)
+    if version is None:
+        # Unversioned data cannot be cached safely
+        return compute()
+    
+    key = result_key(parameters, universe, version)
+    
+    def compute_and_record():
+        result = compute()
+        if RECORD_BACKTEST_RUNS:
+            record_backtest_run(key, universe, parameters, version, result)
+        return result
+    
+    result, hit = backtest_cache.get_or_compute(key, compute_and_record)
+    logger.debug(f"Backtest cache {'hit' if hit else 'miss'} for {universe} {parameters['start_date']}..{parameters['end_date']}")
+    return result
+
+RECORD_FAILURES = metrics.counter("backtest_run_record_failures", "Computed backtests that could not be recorded in the SQL storage")
+
+def record_backtest_run(key, universe, parameters, version, result):
+    """
+    Save a computed backtest in the SQL storage
+    
+    A failure does not fail the request that computed the backtest; it is
+    logged with its stack trace and counted in backtest_run_record_failures.
+    """
+    if not result.get('result'):
+        return
+    try:
+        storage.get_storage().save_run(key, universe, parameters, version, result)
+    except Exception as e:
+        RECORD_FAILURES.inc()
+        logger.error(f"Could not record backtest run {key}: {str(e)}\n{traceback.format_exc()}")
+
+# Backtests submitted through the job API run here, off the request threads
+backtest_jobs = BacktestJobManager(runner=run_cached_backtest)
+
+def compute_momentum_analysis(universe=universes.DEFAULT_UNIVERSE, durations=None):
+    """
+    Run get_momentum_data for a universe, sharing the run with concurrent callers
+    
+    The price store is brought up to date first; the version of the price
+    data the results were computed from is added under "data_version". Runs
+    on the request thread only on a cold cache, otherwise in the cache's
+    background revalidation.
+    """
+    key = (universe, tuple(durations or momentumnifty100.SECTIONS))
+    return momentum_flight.do(key, _momentum_analysis, universe, durations)
+
+def _momentum_analysis(universe, durations):
+    version = momentum_data_version(universe, durations)
+    results = dict(momentumnifty100.get_momentum_data(symbol_list=universes.get_universe(universe), durations=durations))
+    results["data_version"] = version
+    return results
+
+def compute_momentum_section(universe, section):
+    """
+    Compute one section of the momentum analysis (a duration or the comparison)
+    
+    Taken from today's full analysis when it is already cached, otherwise
+    computed on its own from the shortest panel covering it.
+    """
+    key, entry = momentum_cache.latest(group=universe)
+    if key == (universe, trading_session()) and section in entry["value"]:
+        return {section: entry["value"][section], "data_version": entry["value"].get("data_version")}
+    return compute_momentum_analysis(universe, [section])
+
+def momentum_sections(universe, sections):
+    """
+    Momentum analysis sections, each cached per trading session on its own
+    
+    Args:
+        universe: Universe name
+        sections: Durations and/or "comparison"
+    
+    Returns:
+        Tuple of (results, cache_info by section, price data version by section)
+    """
+    results = {}
+    cache_info = {}
+    versions = {}
+    session = trading_session()
+    for section in sections:
+        value, info = momentum_cache.get(
+            (universe, session, section),
+            lambda section=section: compute_momentum_section(universe, section),
+            group=(universe, section)
+        )
+        if "error" in value:
+            results["error"] = value["error"]
+        results[section] = value.get(section)
+        cache_info[section] = info
+        versions[section] = value.get("data_version")
+    return results, cache_info, versions
+
+def momentum_data_version(universe, sections=None):
+    """Price data version of a momentum analysis, or None if it is unknown"""
+    try:
+        return momentumnifty100.data_version(universes.get_universe(universe), sections)
+    except Exception as e:
+        logger.warning(f"Could not determine price data version for {universe}: {str(e)}")
+        return None
+
+def _etag(*parts):
+    """Strong entity tag identifying a response by the values it is computed from"""
+    return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()[:32]
+
+def _not_modified(etag):
+    """
+    304 response if the client already holds the representation tagged etag
+    
+    Checked before anything is computed or serialized.
+    
+    Returns:
+        Response, or None if the full response has to be sent
+    """
+    if etag is None or not etag_matches(request.if_none_match, etag):
+        return None
+    response = Response(status=304)
+    return _with_validators(response, etag)
+
+def _with_validators(response, etag):
+    """Attach the ETag and revalidation Cache-Control header to a response"""
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+    return response
+
+def _requested_universe():
+    """Name of the universe selected by the 'universe' query parameter"""
+    return request.args.get('universe') or universes.DEFAULT_UNIVERSE
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -61,12 +285,31 @@ def process_data():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/momentum-analysis')
+@profiled
 def momentum_analysis():
     """
     Run the Nifty 100 momentum analysis and return the results.
+    
+    Query parameters:
+    - universe: Optional universe name (default: nifty25)
+    - durations: Optional comma separated sections to compute (durations
+      and/or "comparison", default: all)
+    
+    Responses carry an ETag derived from the price data version; a request
+    whose If-None-Match still matches is answered 304 without recomputing.
     """
+    universe = _requested_universe()
+    try:
+        universes.get_universe(universe)
+    except universes.UnknownUniverseError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if request.args.get('durations'):
+        sections = [section.strip() for section in request.args['durations'].split(',') if section.strip()]
+        return _momentum_sections_response(universe, sections)
+    
     try:
-        logger.info("Starting momentum analysis")
+        logger.info(f"Starting momentum analysis for universe {universe}")
         # Create a fallback structure
         fallback_results = {
             "error": "Unable to complete analysis",
@@ -86,17 +329,38 @@ def momentum_analysis():
             }
         
         try:
-            # Set a longer timeout for this request as it may take time to fetch data
-            results = momentumnifty100.get_momentum_data()
-            logger.debug("Momentum analysis completed successfully")
+            # Served from the per-session cache; stale data (and the price
+            # store behind it) is refreshed in the background
+            session = trading_session()
+            results, cache_info = momentum_cache.get(
+                (universe, session),
+                lambda: compute_momentum_analysis(universe),
+                group=universe
+            )
+            logger.debug(f"Momentum analysis completed successfully (cache: {cache_info})")
+            
+            # The tag identifies the cached entry, so a 304 needs no serialization
+            etag = None
+            if results.get("data_version") and "error" not in results:
+                etag = _etag("momentum-analysis", universe, session, results["data_version"])
+            not_modified = _not_modified(etag)
+            if not_modified is not None:
+                return not_modified
+            
+            # Copy so the cached dict is never modified
+            results = dict(results)
+            results["universe"] = universe
+            results["cache"] = cache_info
             
             # Check if there's an error in the results
             if "error" in results:
                 logger.warning(f"Momentum analysis returned with error: {results['error']}")
                 # Still return 200 status since we have partial data
                 return jsonify(results)
-                
-            return jsonify(results)
+            
+            response = jsonify(results)
+            response.headers["Age"] = str(int(cache_info["age_seconds"]))
+            return _with_validators(response, etag)
         except Exception as e:
             error_message = str(e)
             stack_trace = traceback.format_exc()
@@ -119,6 +383,99 @@ def momentum_analysis():
             "1y": {"top_performers": {"Error": 0}, "bottom_performers": {"Error": 0}}
         })
 
+@app.route('/api/momentum-analysis/<duration>')
+@profiled
+def momentum_analysis_duration(duration):
+    """
+    Momentum analysis of a single duration (or the 5d vs 3mo comparison).
+    
+    Query parameters:
+    - universe: Optional universe name (default: nifty25)
+    """
+    universe = _requested_universe()
+    try:
+        universes.get_universe(universe)
+    except universes.UnknownUniverseError as e:
+        return jsonify({"error": str(e)}), 400
+    return _momentum_sections_response(universe, [duration])
+
+def _momentum_sections_response(universe, sections):
+    """Response with the requested sections of the momentum analysis"""
+    unknown = [section for section in sections if section not in momentumnifty100.SECTIONS]
+    if unknown:
+        return jsonify({
+            "error": f"Unknown durations: {', '.join(unknown)}",
+            "durations": momentumnifty100.SECTIONS
+        }), 400
+    
+    try:
+        results, cache_info, versions = momentum_sections(universe, sections)
+        if "error" in results:
+            logger.warning(f"Momentum analysis of {sections} returned with error: {results['error']}")
+            results["universe"] = universe
+            results["cache"] = cache_info
+            return jsonify(results)
+        
+        etag = None
+        if all(versions.values()):
+            etag = _etag("momentum-analysis", universe, trading_session(), sections, [versions[section] for section in sections])
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        
+        results["universe"] = universe
+        results["cache"] = cache_info
+        return _with_validators(jsonify(results), etag)
+    except Exception as e:
+        error_message = str(e)
+        stack_trace = traceback.format_exc()
+        logger.error(f"Error in momentum analysis of {sections}: {error_message}\n{stack_trace}")
+        results = {"error": f"Error processing data: {error_message}", "universe": universe}
+        for section in sections:
+            if section == momentumnifty100.COMPARISON:
+                results[section] = {"dropped_from_top_10": [], "entered_top_10": [], "full_5d_top_10": [], "full_3mo_top_10": []}
+            else:
+                results[section] = {"top_performers": {"Error": 0}, "bottom_performers": {"Error": 0}}
+        return jsonify(results)
+
+@app.route('/api/momentum-intraday')
+@profiled
+def momentum_intraday():
+    """
+    Intraday momentum: top and bottom performers over rolling intraday windows.
+    
+    The bars since the previous request are fetched and ingested into the
+    per-universe ring buffer, so repeated requests only move it forward.
+    
+    Query parameters:
+    - interval: Bar interval, 5m, 15m or 1h (default: 5m)
+    - universe: Optional universe name (default: nifty25)
+    
+    Answered with 501 when the configured price source only has daily bars.
+    """
+    universe = _requested_universe()
+    interval = request.args.get('interval', '5m')
+    try:
+        symbols = universes.get_universe(universe)
+        intraday.window_bars(interval)
+    except ValueError as e:  # includes UnknownUniverseError
+        return jsonify({"error": str(e)}), 400
+    try:
+        intraday.check_source()
+    except intraday.IntradayUnavailableError as e:
+        return jsonify({"error": str(e), "universe": universe, "interval": interval}), 501
+    
+    try:
+        results = intraday_flight.do((universe, interval), intraday.get_intraday_momentum, symbols, interval)
+        results = dict(results)
+        results["universe"] = universe
+        return jsonify(results)
+    except Exception as e:
+        error_message = str(e)
+        stack_trace = traceback.format_exc()
+        logger.error(f"Error in intraday momentum for {universe} ({interval}): {error_message}\n{stack_trace}")
+        return jsonify({"error": f"Error processing intraday data: {error_message}", "universe": universe, "interval": interval})
+
 @app.route('/api/test-data')
 def test_data():
     """Test endpoint that always returns valid data"""
@@ -293,11 +650,21 @@ def test_data():
 @app.route('/api/momentum-durations')
 def momentum_durations():
     """Get available durations for momentum analysis."""
+    universe = _requested_universe()
+    try:
+        symbol_count = len(universes.get_universe(universe))
+    except universes.UnknownUniverseError as e:
+        return jsonify({"error": str(e)}), 400
+    
     return jsonify({
-        "durations": ["5d", "10d", "1mo", "3mo", "6mo", "1y"]
+        "durations": momentumnifty100.DURATIONS,
+        "universe": universe,
+        "symbols": symbol_count,
+        "universes": universes.available_universes()
     })
 
 @app.route('/api/momentum-backtest', methods=['GET'])
+@profiled
 def momentum_backtest():
     """
     Run a momentum backtest simulation with the specified parameters.
@@ -307,56 +674,47 @@ def momentum_backtest():
     - end_date: Optional end date in YYYY-MM-DD format (default: today)
     - initial_investment: Initial investment amount in Rs (default: 500000)
     - rebalance_period_days: Number of days between rebalances (default: 14)
+    - universe: Optional universe name (default: nifty25)
+    - format: Optional "columnar" for parallel arrays instead of per-row objects
+    
+    Responses carry an ETag derived from the parameters and the price data
+    version; a request whose If-None-Match still matches the stored data is
+    answered 304 without refreshing the prices, running or serializing the
+    backtest.
     """
     try:
         logger.info("Starting momentum backtest")
         
-        # Get parameters from query string
-        start_date = request.args.get('start_date', None)
-        end_date = request.args.get('end_date', None)
-        
-        # Parse numeric parameters with defaults
-        try:
-            initial_investment = float(request.args.get('initial_investment', 500000))
-        except ValueError:
-            initial_investment = 500000
-            
         try:
-            rebalance_period_days = int(request.args.get('rebalance_period_days', 14))
-        except ValueError:
-            rebalance_period_days = 14
+            parameters = _backtest_parameters(request.args)
+        except ValueError as e:  # includes UnknownUniverseError
+            return jsonify({"error": str(e), "result": None}), 400
         
-        # If no dates provided, use defaults (3 months ago to today)
-        if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            
-        if not start_date:
-            start_date_obj = datetime.now() - timedelta(days=90)
-            start_date = start_date_obj.strftime('%Y-%m-%d')
+        logger.info(f"Running backtest from {parameters['start_date']} to {parameters['end_date']} "
+                    f"with initial investment Rs {parameters['initial_investment']:,.2f}")
         
-        logger.info(f"Running backtest from {start_date} to {end_date} with initial investment Rs {initial_investment:,.2f}")
+        universe = _requested_universe()
         
-        # Use the symbols from momentumnifty100
-        symbols = momentumnifty100.symbols
+        def backtest_etag(version):
+            if version is None:
+                return None
+            return _etag("momentum-backtest", result_key(parameters, universe, version), request.args.get('format'))
         
-        # Run the backtest
-        result = run_momentum_backtest(
-            symbols=symbols,
-            start_date=start_date,
-            end_date=end_date,
-            initial_investment=initial_investment,
-            rebalance_period_days=rebalance_period_days
-        )
+        # Checked against the stored prices; bringing them up to date is left
+        # to a background refresh, so a 304 does no network I/O
+        not_modified = _not_modified(backtest_etag(price_source.stored_version()))
+        if not_modified is not None:
+            refresh_backtest_data(parameters)
+            return not_modified
         
-        # Format currency values for display
-        if 'result' in result:
-            result['result']['initial_investment_formatted'] = f"Rs {result['result']['initial_investment']:,.2f}"
-            result['result']['final_value_formatted'] = f"Rs {result['result']['final_value']:,.2f}"
-            result['result']['total_return_rs_formatted'] = f"Rs {result['result']['total_return_rs']:,.2f}"
-            result['result']['total_return_pct_formatted'] = f"{result['result']['total_return_pct']:.2f}%"
-            result['result']['annualized_return_pct_formatted'] = f"{result['result']['annualized_return_pct']:.2f}%"
+        # Served from the result cache; identical concurrent requests share one run
+        version = backtest_data_version(parameters)
+        etag = backtest_etag(version)
+        result = run_cached_backtest(universe, version=version, **parameters)
         
-        return jsonify(result)
+        if result.get('error') or not result.get('result'):
+            return _backtest_response(result)
+        return _with_validators(_backtest_response(result), etag)
     
     except Exception as e:
         error_message = str(e)
@@ -367,7 +725,402 @@ def momentum_backtest():
             "result": None
         }), 500
 
+@app.route('/api/momentum-backtest/stream', methods=['GET'])
+def momentum_backtest_stream():
+    """
+    Stream a momentum backtest as Server-Sent Events.
+    
+    Takes the /api/momentum-backtest query parameters. Emits a "start" event,
+    one "rebalance" event per rebalance as soon as it is computed and a final
+    "summary" event with the formatted result and performance summary.
+    """
+    try:
+        parameters = _backtest_parameters(request.args)
+    except ValueError as e:  # includes UnknownUniverseError
+        return jsonify({"error": str(e), "result": None}), 400
+    
+    def events():
+        try:
+            for event, data in backtest_engine.stream_momentum_backtest(**parameters):
+                if event == "summary":
+                    data = _format_backtest_result(data)
+                yield _sse(event, data)
+        except Exception as e:
+            error_message = str(e)
+            stack_trace = traceback.format_exc()
+            logger.error(f"Error in momentum backtest stream: {error_message}\n{stack_trace}")
+            yield _sse("error", {"error": f"Error running backtest: {error_message}", "result": None})
+    
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Ask reverse proxies not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+def _sse(event, data):
+    """Encode one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {app.json.dumps(data)}\n\n"
+
+def _backtest_parameters(args):
+    """
+    Read backtest parameters from request arguments
+    
+    Args:
+        args: Mapping with start_date, end_date, initial_investment,
+            rebalance_period_days and universe (all optional)
+    
+    Returns:
+        Keyword arguments for run_momentum_backtest
+    
+    Raises:
+        UnknownUniverseError: If the universe has no symbol list
+        ValueError: If a date is malformed, end_date is before start_date or
+            rebalance_period_days is not positive
+    """
+    symbols = universes.get_universe(args.get('universe') or universes.DEFAULT_UNIVERSE)
+    
+    # Get parameters from query string
+    start_date = args.get('start_date', None)
+    end_date = args.get('end_date', None)
+    
+    # Parse numeric parameters with defaults
+    try:
+        initial_investment = float(args.get('initial_investment', 500000))
+    except (TypeError, ValueError):
+        initial_investment = 500000
+        
+    try:
+        rebalance_period_days = int(args.get('rebalance_period_days', 14))
+    except (TypeError, ValueError):
+        rebalance_period_days = 14
+    
+    # If no dates provided, use defaults (3 months ago to today)
+    if not end_date:
+        end_date = datetime.now().strftime('%Y-%m-%d')
+        
+    if not start_date:
+        start_date_obj = datetime.now() - timedelta(days=90)
+        start_date = start_date_obj.strftime('%Y-%m-%d')
+    
+    if rebalance_period_days <= 0:
+        raise ValueError(f"rebalance_period_days must be a positive integer, got {rebalance_period_days}")
+    try:
+        start, end = datetime.strptime(start_date, '%Y-%m-%d'), datetime.strptime(end_date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f"Dates must be in YYYY-MM-DD format, got {start_date} and {end_date}")
+    if end < start:
+        raise ValueError(f"end_date {end_date} is before start_date {start_date}")
+    
+    return {
+        "symbols": symbols,
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_investment": initial_investment,
+        "rebalance_period_days": rebalance_period_days
+    }
+
+def _format_backtest_result(result):
+    """Add display strings to a backtest result (on a copy, the result may be shared)"""
+    result = dict(result)
+    if result.get('result'):
+        result['result'] = dict(result['result'])
+        result['result']['initial_investment_formatted'] = f"Rs {result['result']['initial_investment']:,.2f}"
+        result['result']['final_value_formatted'] = f"Rs {result['result']['final_value']:,.2f}"
+        result['result']['total_return_rs_formatted'] = f"Rs {result['result']['total_return_rs']:,.2f}"
+        result['result']['total_return_pct_formatted'] = f"{result['result']['total_return_pct']:.2f}%"
+        result['result']['annualized_return_pct_formatted'] = f"{result['result']['annualized_return_pct']:.2f}%"
+    return result
+
+def _backtest_response(result):
+    """Formatted backtest result in the format selected by the 'format' query parameter"""
+    result = _format_backtest_result(result)
+    if request.args.get('format') == 'columnar':
+        return json_response(columnar_backtest(result))
+    return jsonify(result)
+
+@app.route('/api/backtest-jobs', methods=['POST'])
+def submit_backtest_job():
+    """
+    Queue a momentum backtest and return its job id immediately.
+    
+    Accepts the /api/momentum-backtest parameters as a JSON body or as query
+    parameters. Responds 202 with the job status, or 429 when the queue is full.
+    """
+    try:
+        args = request.get_json(silent=True) or request.args
+        try:
+            parameters = _backtest_parameters(args)
+        except ValueError as e:  # includes UnknownUniverseError
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            job = backtest_jobs.submit(
+                universe=args.get('universe') or universes.DEFAULT_UNIVERSE,
+                **parameters
+            )
+        except QueueFullError as e:
+            response = jsonify({"error": str(e)})
+            response.headers["Retry-After"] = "30"
+            return response, 429
+        
+        job = _job_response(job)
+        response = jsonify(job)
+        response.headers["Location"] = job["links"]["status"]
+        return response, 202
+    
+    except Exception as e:
+        error_message = str(e)
+        stack_trace = traceback.format_exc()
+        logger.error(f"Error submitting backtest job: {error_message}\n{stack_trace}")
+        return jsonify({"error": f"Error submitting backtest: {error_message}"}), 500
+
+def _job_response(job):
+    """Job snapshot with links to its status and result"""
+    job = dict(job)
+    job["links"] = {
+        "status": f"/api/backtest-jobs/{job['job_id']}",
+        "result": f"/api/backtest-jobs/{job['job_id']}/result"
+    }
+    return job
+
+@app.route('/api/backtest-jobs/<job_id>', methods=['GET'])
+def backtest_job_status(job_id):
+    """Status and per-rebalance progress of a backtest job."""
+    job = backtest_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job: {job_id}"}), 404
+    return jsonify(_job_response(job))
+
+@app.route('/api/backtest-jobs/<job_id>/result', methods=['GET'])
+def backtest_job_result(job_id):
+    """Result of a finished backtest job, in the /api/momentum-backtest format (format=columnar supported)."""
+    job, result = backtest_jobs.result(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job: {job_id}"}), 404
+    if job["status"] != SUCCEEDED:
+        # Not available (yet): return the status so clients know whether to keep polling
+        return jsonify(_job_response(job)), 409
+    return _backtest_response(result)
+
+@app.route('/api/backtest-jobs/<job_id>', methods=['DELETE'])
+def cancel_backtest_job(job_id):
+    """Cancel a queued or running backtest job."""
+    job = backtest_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown or expired job: {job_id}"}), 404
+    return jsonify(_job_response(job))
+
+def _parse_int_list(args, name, default):
+    """Parse a comma separated list of positive integers from a query parameter"""
+    value = args.get(name)
+    if not value:
+        return default
+    try:
+        values = [int(item) for item in value.split(',') if item.strip()]
+    except ValueError:
+        values = []
+    if not values or any(item <= 0 for item in values):
+        raise ValueError(f"{name} must be positive integers, got {value!r}")
+    return values
+
+@app.route('/api/momentum-sweep', methods=['GET'])
+def momentum_sweep():
+    """
+    Run momentum backtests over a grid of parameters.
+    
+    Query parameters:
+    - start_date: Optional start date in YYYY-MM-DD format (default: 3 months ago)
+    - end_date: Optional end date in YYYY-MM-DD format (default: today)
+    - initial_investment: Initial investment amount in Rs (default: 500000)
+    - lookback_days: Comma separated momentum lookbacks (default: 20)
+    - rebalance_period_days: Comma separated rebalance periods (default: 14)
+    - top_n: Comma separated portfolio sizes (default: 10)
+    - processes: Optional number of worker processes (capped at MAX_SWEEP_PROCESSES)
+    - universe: Optional universe name (default: nifty25)
+    """
+    try:
+        try:
+            symbols = universes.get_universe(_requested_universe())
+        except universes.UnknownUniverseError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        try:
+            initial_investment = float(request.args.get('initial_investment', 500000))
+        except ValueError:
+            initial_investment = 500000
+        
+        try:
+            lookback_days = _parse_int_list(request.args, 'lookback_days', [20])
+            rebalance_period_days = _parse_int_list(request.args, 'rebalance_period_days', [14])
+            top_n = _parse_int_list(request.args, 'top_n', [10])
+            processes = request.args.get('processes', None, type=int)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid sweep parameter: {str(e)}"}), 400
+        if 'processes' in request.args and (processes is None or processes <= 0):
+            return jsonify({"error": "Invalid sweep parameter: processes must be a positive integer"}), 400
+        
+        logger.info(f"Starting parameter sweep: lookback={lookback_days}, "
+                    f"rebalance={rebalance_period_days}, top_n={top_n}")
+        
+        result = backtest_sweep.run_parameter_sweep(
+            symbols=symbols,
+            start_date=request.args.get('start_date', None),
+            end_date=request.args.get('end_date', None),
+            initial_investment=initial_investment,
+            lookback_days=lookback_days,
+            rebalance_period_days=rebalance_period_days,
+            top_n=top_n,
+            processes=processes
+        )
+        return jsonify(result)
+    
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        error_message = str(e)
+        stack_trace = traceback.format_exc()
+        logger.error(f"Error in parameter sweep: {error_message}\n{stack_trace}")
+        return jsonify({"error": f"Error running parameter sweep: {error_message}"}), 500
+
+@app.after_request
+def compress(response):
+    """Compress responses for clients that accept gzip or brotli."""
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+REQUESTS = metrics.counter("http_requests", "HTTP requests by route, method and status", ["route", "method", "status"])
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "Time to produce a response by route", ["route"])
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and record its latency (streamed bodies: until the response starts)."""
+    # The URL rule, not the path, keeps the number of series bounded
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, route=route)
+    return response
+
+def _cache_metrics():
+    """Cache, coalescing and job counters read at scrape time"""
+    momentum = momentum_cache.stats()
+    backtest = backtest_cache.stats()
+    flights = {"momentum_analysis": momentum_flight.stats(), "momentum_backtest": backtest_flight.stats()}
+    jobs = backtest_jobs.stats()
+    return [
+        ("result_cache_lookups_total", "counter", "Result cache lookups by cache and outcome", [
+            ({"cache": "momentum_analysis", "result": "hit"}, momentum["hits"]),
+            ({"cache": "momentum_analysis", "result": "stale_hit"}, momentum["stale_hits"]),
+            ({"cache": "momentum_analysis", "result": "miss"}, momentum["misses"]),
+            ({"cache": "momentum_backtest", "result": "memory_hit"}, backtest["memory_hits"]),
+            ({"cache": "momentum_backtest", "result": "disk_hit"}, backtest["disk_hits"]),
+            ({"cache": "momentum_backtest", "result": "miss"}, backtest["misses"])
+        ]),
+        ("result_cache_refreshes_total", "counter", "Background refreshes of stale momentum analysis results", [
+            ({"result": "ok"}, momentum["refreshes"]),
+            ({"result": "failed"}, momentum["refresh_failures"])
+        ]),
+        ("result_cache_evictions_total", "counter", "Backtest result cache evictions by tier", [
+            ({"tier": "memory"}, backtest["memory_evictions"]),
+            ({"tier": "disk"}, backtest["disk_evictions"])
+        ]),
+        ("result_cache_entries", "gauge", "Entries held by each result cache tier", [
+            ({"cache": "momentum_analysis", "tier": "memory"}, momentum["entries"]),
+            ({"cache": "momentum_backtest", "tier": "memory"}, backtest["memory_entries"]),
+            ({"cache": "momentum_backtest", "tier": "disk"}, backtest["disk_entries"])
+        ]),
+        ("coalescing_executions_total", "counter", "Computations run by each coalescing group",
+         [({"group": name}, flight["executions"]) for name, flight in flights.items()]),
+        ("coalescing_coalesced_total", "counter", "Requests that shared an in-flight computation",
+         [({"group": name}, flight["coalesced"]) for name, flight in flights.items()]),
+        ("coalescing_in_flight", "gauge", "Computations currently running per coalescing group",
+         [({"group": name}, flight["in_flight"]) for name, flight in flights.items()]),
+        ("backtest_jobs", "gauge", "Backtest jobs by state",
+         [({"state": state}, jobs[state]) for state in ("queued", "running", "finished")]),
+        ("backtest_jobs_submitted_total", "counter", "Backtest jobs accepted", [({}, jobs["submitted"])]),
+        ("backtest_jobs_rejected_total", "counter", "Backtest jobs rejected because the queue was full", [({}, jobs["rejected"])])
+    ]
+
+metrics.register_collector("routes", _cache_metrics)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms and counters in the Prometheus text format (per process)."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/profiles')
+def list_profiles():
+    """Recent request profiles (requires PROFILING_ENABLED)."""
+    if not profiling.PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    return jsonify({"profiles": profiling.list_profiles()})
+
+@app.route('/api/profiles/<profile_id>')
+def get_profile(profile_id):
+    """
+    Top functions of a saved profile.
+    
+    Query parameters:
+    - format: Optional "pstats" to download the raw profile for pstats/snakeviz
+    """
+    if not profiling.PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    if request.args.get('format') == 'pstats':
+        path = profiling.profile_path(profile_id)
+        if path is None:
+            return jsonify({"error": f"Unknown profile: {profile_id}"}), 404
+        return send_file(path, mimetype="application/octet-stream", as_attachment=True,
+                         download_name=f"{profile_id}.prof")
+    summary = profiling.load_profile(profile_id)
+    if summary is None:
+        return jsonify({"error": f"Unknown profile: {profile_id}"}), 404
+    return jsonify(summary)
+
+@app.route('/api/backtest-runs')
+def list_backtest_runs():
+    """
+    Recently recorded backtest runs (requires RECORD_BACKTEST_RUNS).
+    
+    Query parameters:
+    - limit: Optional number of runs (default: 50)
+    """
+    if not RECORD_BACKTEST_RUNS:
+        return jsonify({"error": "Backtest runs are not recorded"}), 404
+    try:
+        limit = int(request.args.get('limit', 50))
+    except (TypeError, ValueError):
+        limit = 50
+    return jsonify({"runs": storage.get_storage().list_runs(limit)})
+
+@app.route('/api/backtest-runs/<int:run_id>')
+def get_backtest_run(run_id):
+    """A recorded backtest run with its result, summary, equity curve and holdings."""
+    if not RECORD_BACKTEST_RUNS:
+        return jsonify({"error": "Backtest runs are not recorded"}), 404
+    run = storage.get_storage().load_run(run_id)
+    if run is None:
+        return jsonify({"error": f"Unknown backtest run: {run_id}"}), 404
+    return json_response(run)
+
 @app.route('/api/health')
 def health_check():
     """API health check endpoint."""
     return jsonify({"status": "ok"})
+
+@app.route('/api/stats')
+def stats():
+    """Request coalescing, backtest job and result cache counters."""
+    return jsonify({
+        "coalescing": {
+            "momentum_analysis": momentum_flight.stats(),
+            "momentum_backtest": backtest_flight.stats()
+        },
+        "backtest_jobs": backtest_jobs.stats(),
+        "backtest_cache": backtest_cache.stats(),
+        "momentum_cache": momentum_cache.stats()
+    })
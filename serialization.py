@@ -0,0 +1,229 @@
+import gzip
+import json
+import logging
+from datetime import date, datetime
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional, falls back to the json module
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip is used instead
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _default(value):
+    """Encode the non-JSON types found in engine results"""
+    # Engine results only exist once the engines (and numpy) are loaded
+    import numpy as np
+
+    # pandas Timestamps are datetime instances
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload):
+    """
+    Encode a payload as compact JSON
+
+    Uses orjson when it is installed and the standard json module otherwise.
+    Dates are written as ISO 8601 strings and NaN as null.
+
+    Returns:
+        Encoded bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    # orjson writes NaN as null; the json module would write an invalid NaN token
+    return json.dumps(_replace_nan(payload), default=_default, separators=(",", ":")).encode()
+
+
+def _replace_nan(value):
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, dict):
+        return {key: _replace_nan(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(item) for item in value]
+    return value
+
+
+def json_response(payload, status=200):
+    """Flask response with the payload encoded by dumps"""
+    return Response(dumps(payload), status=status, mimetype="application/json")
+
+
+def _date_strings(dates):
+    import pandas as pd
+    return [pd.Timestamp(value).strftime('%Y-%m-%d') for value in dates]
+
+
+def columnar_backtest(result):
+    """
+    Convert a run_momentum_backtest result to parallel arrays
+
+    portfolio_values and equity_curve become one array of dates and one of
+    values each. The holdings of every rebalance are concatenated into flat
+    symbol, shares, price, value and percentage arrays; the holdings of
+    rebalance i are the slice offsets[i]:offsets[i + 1].
+
+    Args:
+        result: Dictionary returned by run_momentum_backtest
+
+    Returns:
+        Dictionary in the columnar format
+    """
+    portfolio_values = result.get('portfolio_values') or []
+    equity_curve = result.get('equity_curve') or []
+    history = result.get('holdings_history') or []
+
+    offsets = [0]
+    symbols, shares, prices, values, percentages = [], [], [], [], []
+    for entry in history:
+        for stock in entry['holdings']:
+            symbols.append(stock['symbol'])
+            shares.append(stock['shares'])
+            prices.append(stock['price'])
+            values.append(stock['value'])
+            percentages.append(stock['percentage'])
+        offsets.append(len(symbols))
+
+    return {
+        'format': 'columnar',
+        'result': result.get('result'),
+        'summary': result.get('summary'),
+        'rebalance_dates': _date_strings(result.get('rebalance_dates') or []),
+        'portfolio_values': {
+            'dates': _date_strings(entry['date'] for entry in portfolio_values),
+            'values': [float(entry['value']) for entry in portfolio_values]
+        },
+        'equity_curve': {
+            'dates': _date_strings(entry['date'] for entry in equity_curve),
+            'values': [float(entry['value']) for entry in equity_curve]
+        },
+        'holdings_history': {
+            'dates': _date_strings(entry['date'] for entry in history),
+            'cash': [float(entry['cash']) for entry in history],
+            'offsets': offsets,
+            'symbols': symbols,
+            'shares': shares,
+            'prices': prices,
+            'values': values,
+            'percentages': percentages
+        }
+    }
+
+
+def _accepted_encodings(accept_encoding):
+    """Content codings accepted by the client (q=0 excluded)"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding)
+    return accepted
+
+
+def compress_response(response, accept_encoding):
+    """
+    Compress a response body with brotli or gzip if the client accepts it
+
+    Streamed, already encoded and small responses are left alone. Brotli is
+    used when the brotli package is installed, gzip otherwise.
+
+    Args:
+        response: Flask response
+        accept_encoding: Value of the request's Accept-Encoding header
+
+    Returns:
+        The (possibly compressed) response
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code >= 300
+            or "Content-Encoding" in response.headers):
+        return response
+    if response.mimetype not in ("application/json", "text/html", "text/plain", "application/javascript", "text/css"):
+        return response
+
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        encoding = "br"
+    elif "gzip" in accepted:
+        encoding = "gzip"
+    else:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    response.headers["Content-Length"] = str(len(compressed))
+    response.vary.add("Accept-Encoding")
+
+    # A strong validator identifies exact bytes, so each encoding gets its own tag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against the entity tag of a resource
+
+    Uses the weak comparison If-None-Match calls for, and tags of the
+    compressed representations (see compress_response) match the tag of the
+    resource they encode.
+
+    Args:
+        if_none_match: Parsed If-None-Match header (werkzeug ETags)
+        etag: Unquoted entity tag of the current representation
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.star_tag:
+        return True
+    for tag in if_none_match.as_set(include_weak=True):
+        for encoding in ("-gzip", "-br"):
+            if tag.endswith(encoding):
+                tag = tag[:-len(encoding)]
+                break
+        if tag == etag:
+            return True
+    return False
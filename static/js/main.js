@@ -1,5 +1,10 @@
 // React Components for Momentum Analysis
 
+// Fetch options for the analysis endpoints: the browser keeps the last
+// response and revalidates it with If-None-Match, so unchanged results come
+// back as a 304 instead of being recomputed and downloaded again
+const REVALIDATE = { cache: 'no-cache' };
+
 // Helper function to format currency values
 function formatCurrency(value) {
     return new Intl.NumberFormat('en-IN', {
@@ -195,10 +200,8 @@ function ComparisonAnalysis({ comparison }) {
     );
 }
 
-// Duration Tab Component
+// Duration Tab Component (shown before its data is loaded, tabs load lazily)
 function DurationTab({ duration, data, activeTab, setActiveTab }) {
-    if (!data) return null;
-    
     const isActive = activeTab === duration;
     
     return (
@@ -218,7 +221,18 @@ function DurationTab({ duration, data, activeTab, setActiveTab }) {
 
 // Duration Content Component
 function DurationContent({ duration, data, isActive }) {
-    if (!data || !isActive) return null;
+    if (!isActive) return null;
+    
+    if (!data) {
+        return (
+            <div className="d-flex justify-content-center my-4">
+                <div className="spinner-border spinner-border-sm text-primary" role="status">
+                    <span className="visually-hidden">Loading...</span>
+                </div>
+                <span className="ms-3">Loading {duration} momentum...</span>
+            </div>
+        );
+    }
     
     return (
         <div className={`tab-pane fade ${isActive ? 'show active' : ''}`}>
@@ -374,6 +388,8 @@ function BacktestResults({ results, onClear }) {
     if (!results) return null;
     
     const { result, summary, portfolio_values, rebalance_dates } = results;
+    const streaming = !result;
+    const initialInvestment = result ? result.initial_investment : results.initial_investment;
     
     // Format dates to be more readable
     const formatDate = (dateStr) => {
@@ -396,6 +412,12 @@ function BacktestResults({ results, onClear }) {
             <div className="card-header bg-success text-white">
                 <h4 className="mb-0">Backtest Results</h4>
             </div>
+            {streaming && (
+                <div className="alert alert-info m-3 mb-0">
+                    <span className="spinner-border spinner-border-sm me-2" role="status" aria-hidden="true"></span>
+                    Simulating rebalance {results.completed_rebalances || 0} of {results.total_rebalances}...
+                </div>
+            )}
             <div className="card-body">
                 <div className="row mb-4">
                     <div className="col-md-6">
@@ -406,7 +428,7 @@ function BacktestResults({ results, onClear }) {
                             <div className="card-body">
                                 <table className="table table-striped">
                                     <tbody>
-                                        {Object.entries(summary).map(([key, value]) => (
+                                        {Object.entries(summary || {}).map(([key, value]) => (
                                             <tr key={key}>
                                                 <th>{key}</th>
                                                 <td>{value}</td>
@@ -422,6 +444,11 @@ function BacktestResults({ results, onClear }) {
                             <div className="card-header">
                                 <h5 className="mb-0">Performance Details</h5>
                             </div>
+                            {streaming ? (
+                            <div className="card-body">
+                                <p className="text-muted">Available when the simulation completes.</p>
+                            </div>
+                            ) : (
                             <div className="card-body">
                                 <div className="mb-3">
                                     <h6>Initial Investment</h6>
@@ -446,6 +473,7 @@ function BacktestResults({ results, onClear }) {
                                     </p>
                                 </div>
                             </div>
+                            )}
                         </div>
                     </div>
                 </div>
@@ -539,7 +567,7 @@ function BacktestResults({ results, onClear }) {
                             </thead>
                             <tbody>
                                 {portfolio_values.map((entry, index) => {
-                                    const prevValue = index > 0 ? portfolio_values[index - 1].value : result.initial_investment;
+                                    const prevValue = index > 0 ? portfolio_values[index - 1].value : initialInvestment;
                                     const change = (entry.value - prevValue) / prevValue * 100;
                                     
                                     return (
@@ -624,6 +652,7 @@ function BacktestResults({ results, onClear }) {
                     <button
                         onClick={onClear}
                         className="btn btn-outline-primary"
+                        disabled={streaming}
                     >
                         <i className="fas fa-redo me-2"></i>
                         Run Another Simulation
@@ -644,7 +673,53 @@ function App() {
     const [backtestLoading, setBacktestLoading] = React.useState(false);
     const [activeSection, setActiveSection] = React.useState('analysis'); // 'analysis' or 'backtest'
     
-    const durations = ["5d", "10d", "1mo", "3mo", "6mo", "1y"];
+    const [durations, setDurations] = React.useState(["5d", "10d", "1mo", "3mo", "6mo", "1y"]);
+    // Sections requested from the server but not received yet
+    const pendingSections = React.useRef(new Set());
+    
+    // Load one section (a duration or the comparison) and merge it into the data
+    const loadSection = (section) => {
+        if (pendingSections.current.has(section)) {
+            return;
+        }
+        pendingSections.current.add(section);
+        fetch(`/api/momentum-analysis/${section}`, REVALIDATE)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`Server returned ${response.status}: ${response.statusText}`);
+                }
+                return response.json();
+            })
+            .then(result => {
+                setData(previous => ({ ...previous, [section]: result[section] }));
+            })
+            .catch(error => {
+                console.warn(`Loading ${section} momentum failed:`, error);
+                if (section !== 'comparison') {
+                    setData(previous => ({
+                        ...previous,
+                        [section]: { top_performers: {"Error": 0}, bottom_performers: {"Error": 0} }
+                    }));
+                }
+            })
+            .finally(() => {
+                pendingSections.current.delete(section);
+            });
+    };
+    
+    // Switching to a tab that has not been loaded yet fetches just that duration
+    React.useEffect(() => {
+        if (data && !data[activeTab]) {
+            loadSection(activeTab);
+        }
+    }, [activeTab, data]);
+    
+    // The comparison needs the 3mo window, it is loaded after the first paint
+    React.useEffect(() => {
+        if (data && !data.comparison && !data.error) {
+            loadSection('comparison');
+        }
+    }, [data]);
     
     React.useEffect(() => {
         // Check if API is available
@@ -657,9 +732,22 @@ function App() {
             })
             .then(data => {
                 console.log('API Health Check:', data);
+                return fetch('/api/momentum-durations')
+                    .then(response => response.ok ? response.json() : null)
+                    .catch(() => null);
+            })
+            .then(available => {
+                const first = available && available.durations && available.durations.length
+                    ? available.durations[0]
+                    : activeTab;
+                if (available && available.durations && available.durations.length) {
+                    setDurations(available.durations);
+                    setActiveTab(first);
+                }
+                // First paint only needs the shortest duration; other tabs load on demand.
                 // Try to fetch real data first, but use test data as fallback
                 try {
-                    return fetch('/api/momentum-analysis')
+                    return fetch(`/api/momentum-analysis?durations=${first}`, REVALIDATE)
                       .then(response => {
                           if (!response.ok) {
                               console.warn('Momentum analysis API failed, falling back to test data');
@@ -717,7 +805,7 @@ function App() {
                         onClick={() => {
                             setError(null);
                             setLoading(true);
-                            fetch('/api/momentum-analysis')
+                            fetch('/api/momentum-analysis', REVALIDATE)
                                 .then(response => {
                                     if (!response.ok) {
                                         throw new Error(`Server returned ${response.status}: ${response.statusText}`);
@@ -752,7 +840,7 @@ function App() {
                         className="btn btn-primary"
                         onClick={() => {
                             setLoading(true);
-                            fetch('/api/momentum-analysis')
+                            fetch('/api/momentum-analysis', REVALIDATE)
                                 .then(response => {
                                     if (!response.ok) {
                                         throw new Error(`Server returned ${response.status}: ${response.statusText}`);
@@ -811,7 +899,7 @@ function App() {
                             className="btn btn-primary"
                             onClick={() => {
                                 setLoading(true);
-                                fetch('/api/momentum-analysis')
+                                fetch('/api/momentum-analysis', REVALIDATE)
                                     .then(response => {
                                         if (!response.ok) {
                                             throw new Error(`Server returned ${response.status}: ${response.statusText}`);
@@ -886,7 +974,23 @@ function App() {
             rebalance_period_days: params.rebalancePeriod
         });
         
-        fetch(`/api/momentum-backtest?${queryParams.toString()}`)
+        if (window.EventSource) {
+            streamBacktest(queryParams);
+        } else {
+            fetchBacktest(queryParams);
+        }
+    };
+    
+    const handleBacktestError = (error) => {
+        console.error('Error running backtest:', error);
+        setError(`Error running backtest: ${error.message}`);
+        setBacktestLoading(false);
+        showError(`Error running backtest: ${error.message}`);
+    };
+    
+    // Fetch the complete backtest result in one response
+    const fetchBacktest = (queryParams) => {
+        fetch(`/api/momentum-backtest?${queryParams.toString()}`, REVALIDATE)
             .then(response => {
                 if (!response.ok) {
                     throw new Error(`Server returned ${response.status}: ${response.statusText}`);
@@ -898,12 +1002,61 @@ function App() {
                 setBacktestResults(results);
                 setBacktestLoading(false);
             })
-            .catch(error => {
-                console.error('Error running backtest:', error);
-                setError(`Error running backtest: ${error.message}`);
-                setBacktestLoading(false);
-                showError(`Error running backtest: ${error.message}`);
+            .catch(handleBacktestError);
+    };
+    
+    // Stream the backtest, drawing every rebalance as soon as it arrives
+    const streamBacktest = (queryParams) => {
+        const source = new EventSource(`/api/momentum-backtest/stream?${queryParams.toString()}`);
+        let finished = false;
+        
+        source.addEventListener('start', (event) => {
+            const start = JSON.parse(event.data);
+            setBacktestResults({
+                initial_investment: start.initial_investment,
+                total_rebalances: start.total_rebalances,
+                result: null,
+                summary: null,
+                portfolio_values: [],
+                rebalance_dates: [],
+                holdings_history: []
             });
+        });
+        
+        source.addEventListener('rebalance', (event) => {
+            const rebalance = JSON.parse(event.data);
+            setBacktestResults(previous => ({
+                ...previous,
+                completed_rebalances: rebalance.completed,
+                portfolio_values: [...previous.portfolio_values, { date: rebalance.date, value: rebalance.value }],
+                holdings_history: [...previous.holdings_history, {
+                    date: rebalance.date,
+                    holdings: rebalance.holdings,
+                    cash: rebalance.cash
+                }]
+            }));
+        });
+        
+        source.addEventListener('summary', (event) => {
+            finished = true;
+            source.close();
+            const summary = JSON.parse(event.data);
+            console.log('Backtest results:', summary);
+            setBacktestResults(previous => ({ ...previous, ...summary }));
+            setBacktestLoading(false);
+        });
+        
+        source.addEventListener('error', (event) => {
+            source.close();
+            if (finished) {
+                return;
+            }
+            finished = true;
+            // Server-sent error events carry a message, connection errors do not
+            const message = event.data ? JSON.parse(event.data).error : 'Connection to the backtest stream was lost';
+            setBacktestResults(null);
+            handleBacktestError(new Error(message));
+        });
     };
     
     return (
@@ -0,0 +1,490 @@
+"""
+SQL storage of daily prices and backtest runs
+
+Prices are kept in a compact daily_bars table (integer symbol id, day number
+and float32 close, keyed on (symbol, day)); backtest runs and the holdings of
+every rebalance are recorded alongside. PostgreSQL and SQLite URLs are
+supported (upserts use their ON CONFLICT clauses); bulk writes use COPY on
+PostgreSQL (psycopg2) and executemany on SQLite, and a SQLite file is used
+when DATABASE_URL is not set.
+
+Load prices from a configured source into the database:
+
+    python storage.py load synthetic --universe nifty100 --start 2019-01-01
+"""
+import io
+import os
+import csv
+import time
+import logging
+import argparse
+import threading
+import itertools
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    MetaData, Table, Column, ForeignKey, Integer, Float, String, Text, DateTime, JSON,
+    create_engine, select, func, text
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from price_matrix import to_day_numbers, from_day_numbers
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# Database used by get_storage(); a SQLite file under data/ when unset
+DATABASE_URL = os.environ.get("DATABASE_URL")
+DEFAULT_DATABASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "momentum.db")
+
+# Dialects with the ON CONFLICT upserts the storage relies on
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+# Rows sent per executemany batch on databases without COPY
+WRITE_BATCH_ROWS = int(os.environ.get("STORAGE_WRITE_BATCH_ROWS", 50000))
+
+metadata = MetaData()
+
+symbols_table = Table(
+    "symbols", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("symbol", String(32), nullable=False, unique=True),
+    # Time of the last write of the symbol's bars, used for the data version
+    Column("updated_at", Float, nullable=False, default=0.0)
+)
+
+# One row per symbol and trading day. Days are stored as days since
+# 1970-01-01 and closes as 4-byte floats, the layout of the shared price
+# matrix; the primary key is the (symbol, day) index range reads use.
+daily_bars = Table(
+    "daily_bars", metadata,
+    Column("symbol_id", Integer, ForeignKey("symbols.id"), primary_key=True),
+    Column("day", Integer, primary_key=True),
+    Column("close", Float(precision=24), nullable=False),
+    sqlite_with_rowid=False
+)
+
+backtest_runs = Table(
+    "backtest_runs", metadata,
+    Column("id", Integer, primary_key=True),
+    # result_key of the run (parameters, universe and price data version)
+    Column("key", String(64), nullable=False, unique=True),
+    Column("universe", String(64), nullable=False),
+    Column("start_date", String(10), nullable=False),
+    Column("end_date", String(10), nullable=False),
+    Column("initial_investment", Float, nullable=False),
+    Column("rebalance_period_days", Integer, nullable=False),
+    Column("data_version", Text),
+    Column("created_at", DateTime, nullable=False),
+    Column("final_value", Float),
+    Column("total_return_pct", Float),
+    Column("annualized_return_pct", Float),
+    Column("result", JSON),
+    Column("summary", JSON),
+    Column("equity_curve", JSON)
+)
+
+# One row per run, rebalance and held symbol. Rebalances are numbered in run
+# order; with short rebalance periods two of them can fall on the same day.
+holdings = Table(
+    "holdings", metadata,
+    Column("run_id", Integer, ForeignKey("backtest_runs.id", ondelete="CASCADE"), primary_key=True),
+    Column("rebalance", Integer, primary_key=True),
+    Column("symbol_id", Integer, ForeignKey("symbols.id"), primary_key=True),
+    Column("day", Integer, nullable=False),
+    Column("shares", Float, nullable=False),
+    Column("price", Float),
+    Column("value", Float),
+    Column("weight", Float),
+    sqlite_with_rowid=False
+)
+
+
+class Storage:
+    """
+    Prices and backtest runs in a SQL database
+
+    Uses SQLAlchemy Core only; the tables are created on first use. Symbol
+    ids are cached in memory, so writes and range reads never join the
+    symbols table.
+    """
+
+    def __init__(self, url=None):
+        """
+        Initialize the storage
+
+        Args:
+            url: PostgreSQL or SQLite SQLAlchemy URL (default: DATABASE_URL,
+                or a SQLite file under data/)
+
+        Raises:
+            ValueError: If the URL is for another database
+        """
+        if url is None:
+            url = DATABASE_URL or f"sqlite:///{DEFAULT_DATABASE_PATH}"
+        if url.startswith("postgres://"):
+            # Heroku style URL, not accepted by SQLAlchemy
+            url = "postgresql://" + url[len("postgres://"):]
+        if url.startswith("sqlite:///") and url != "sqlite:///:memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(url[len("sqlite:///"):])), exist_ok=True)
+
+        self.engine = create_engine(url, json_serializer=lambda value: dumps(value).decode())
+        if self.dialect not in SUPPORTED_DIALECTS:
+            self.engine.dispose()
+            raise ValueError(f"Unsupported database {self.dialect} (use one of {', '.join(SUPPORTED_DIALECTS)})")
+        self._symbol_ids = {}
+        self._lock = threading.Lock()
+        metadata.create_all(self.engine)
+
+    @property
+    def dialect(self):
+        """Name of the database dialect ("sqlite", "postgresql", ...)"""
+        return self.engine.dialect.name
+
+    def _insert(self, table):
+        """INSERT statement of the dialect, for ON CONFLICT clauses"""
+        if self.dialect == "postgresql":
+            return postgresql.insert(table)
+        return sqlite.insert(table)
+
+    def symbol_ids(self, symbols, create=False):
+        """
+        Ids of the symbols
+
+        Args:
+            symbols: List of symbols
+            create: Add symbols that are not known yet
+
+        Returns:
+            Dictionary mapping each known symbol to its id
+        """
+        with self._lock:
+            missing = [symbol for symbol in symbols if symbol not in self._symbol_ids]
+        if missing:
+            with self.engine.begin() as connection:
+                if create:
+                    connection.execute(
+                        self._insert(symbols_table).on_conflict_do_nothing(index_elements=["symbol"]),
+                        [{"symbol": symbol, "updated_at": 0.0} for symbol in dict.fromkeys(missing)]
+                    )
+                rows = connection.execute(
+                    select(symbols_table.c.symbol, symbols_table.c.id).where(symbols_table.c.symbol.in_(missing))
+                ).all()
+            with self._lock:
+                self._symbol_ids.update(rows)
+        with self._lock:
+            return {symbol: self._symbol_ids[symbol] for symbol in symbols if symbol in self._symbol_ids}
+
+    @property
+    def version(self):
+        """Identifier of the stored prices; changes with every write of bars"""
+        with self.engine.connect() as connection:
+            count, updated_at = connection.execute(
+                select(func.count(), func.max(symbols_table.c.updated_at))
+            ).one()
+        return f"{count}:{updated_at or 0.0}"
+
+    def write_bars(self, price_data):
+        """
+        Insert or update daily closes
+
+        Args:
+            price_data: DataFrame of closes indexed by date with one column
+                per symbol; NaN cells are skipped
+
+        Returns:
+            Number of bars written
+        """
+        if price_data.empty:
+            return 0
+        ids = self.symbol_ids(list(price_data.columns), create=True)
+
+        values = price_data.to_numpy(dtype=np.float64)
+        rows, cols = np.nonzero(~np.isnan(values))
+        symbol_ids = np.array([ids[symbol] for symbol in price_data.columns], dtype=np.int64)[cols]
+        days = to_day_numbers(price_data.index.values)[rows]
+        closes = values[rows, cols]
+        if not len(closes):
+            return 0
+
+        start = time.perf_counter()
+        with self.engine.begin() as connection:
+            if self.dialect == "postgresql" and self.engine.dialect.driver == "psycopg2":
+                self._copy_bars(connection, symbol_ids, days, closes)
+            else:
+                statement = self._insert(daily_bars)
+                statement = statement.on_conflict_do_update(
+                    index_elements=["symbol_id", "day"],
+                    set_={"close": statement.excluded.close}
+                )
+                for offset in range(0, len(closes), WRITE_BATCH_ROWS):
+                    batch = slice(offset, offset + WRITE_BATCH_ROWS)
+                    connection.execute(statement, [
+                        {"symbol_id": symbol_id, "day": day, "close": close}
+                        for symbol_id, day, close in zip(
+                            symbol_ids[batch].tolist(), days[batch].tolist(), closes[batch].tolist()
+                        )
+                    ])
+            connection.execute(
+                symbols_table.update()
+                .where(symbols_table.c.id.in_(sorted(set(ids.values()))))
+                .values(updated_at=time.time())
+            )
+
+        logger.info(f"Wrote {len(closes)} bars of {len(ids)} symbols in {time.perf_counter() - start:.2f}s")
+        return len(closes)
+
+    @staticmethod
+    def _copy_bars(connection, symbol_ids, days, closes):
+        """Bulk load bars with COPY into a temporary table, then upsert them"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(zip(symbol_ids.tolist(), days.tolist(), closes.tolist()))
+        buffer.seek(0)
+
+        connection.execute(text(
+            "CREATE TEMPORARY TABLE daily_bars_load (symbol_id integer, day integer, close real) ON COMMIT DROP"
+        ))
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert("COPY daily_bars_load (symbol_id, day, close) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        connection.execute(text(
+            "INSERT INTO daily_bars (symbol_id, day, close) SELECT symbol_id, day, close FROM daily_bars_load "
+            "ON CONFLICT (symbol_id, day) DO UPDATE SET close = EXCLUDED.close"
+        ))
+
+    @staticmethod
+    def _copy_out(connection, query):
+        """Run a (day, symbol_id, close) query through COPY TO and parse it in C"""
+        sql = str(query.compile(connection, compile_kwargs={"literal_binds": True}))
+        buffer = io.StringIO()
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        buffer.seek(0)
+        return pd.read_csv(buffer, header=None, dtype=np.float64).to_numpy().ravel()
+
+    def read_matrix(self, symbols, start=None, end=None):
+        """
+        Closes of the symbols in a window as a (dates x symbols) matrix
+
+        All bars are read with one indexed range query and scattered into
+        the matrix by day and symbol position.
+
+        Args:
+            symbols: List of symbols (columns of the matrix)
+            start: Optional first date (inclusive)
+            end: Optional last date (exclusive)
+
+        Returns:
+            Tuple of (int32 day numbers of the rows, float64 matrix with NaN
+            where a symbol has no bar)
+        """
+        ids = self.symbol_ids(symbols)
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty((0, len(symbols)))
+
+        query = select(daily_bars.c.day, daily_bars.c.symbol_id, daily_bars.c.close).where(
+            daily_bars.c.symbol_id.in_(sorted(set(ids.values())))
+        )
+        if start is not None:
+            query = query.where(daily_bars.c.day >= int(to_day_numbers(pd.Timestamp(start).date())))
+        if end is not None:
+            query = query.where(daily_bars.c.day < int(to_day_numbers(pd.Timestamp(end).date())))
+
+        with self.engine.connect() as connection:
+            if self.dialect == "postgresql" and self.engine.dialect.driver == "psycopg2":
+                bars = self._copy_out(connection, query)
+            else:
+                # Plain tuples from the DBAPI cursor; Row objects would cost
+                # more than the query itself on large panels
+                rows = connection.execute(query).cursor.fetchall()
+                bars = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.float64, count=3 * len(rows))
+        bars = bars.reshape(-1, 3)
+        if not len(bars):
+            return np.empty(0, dtype=np.int32), np.empty((0, len(symbols)))
+
+        days, row_positions = np.unique(bars[:, 0].astype(np.int32), return_inverse=True)
+
+        # Column of every symbol id (the first one if a symbol is requested twice)
+        first_column = {}
+        for position, symbol in enumerate(symbols):
+            if symbol in ids:
+                first_column.setdefault(ids[symbol], position)
+        id_order = np.array(sorted(first_column), dtype=np.int64)
+        id_columns = np.array([first_column[symbol_id] for symbol_id in id_order])
+
+        matrix = np.full((len(days), len(symbols)), np.nan)
+        matrix[row_positions, id_columns[np.searchsorted(id_order, bars[:, 1].astype(np.int64))]] = bars[:, 2]
+        for position, symbol in enumerate(symbols):
+            if symbol in ids and first_column[ids[symbol]] != position:
+                matrix[:, position] = matrix[:, first_column[ids[symbol]]]
+        return days, matrix
+
+    def read_bars(self, symbols, start=None, end=None):
+        """
+        Closes of the symbols in a window as a price panel
+
+        Returns:
+            DataFrame indexed by date with one column per symbol, only
+            dates on which at least one symbol has a bar
+        """
+        days, matrix = self.read_matrix(symbols, start, end)
+        return pd.DataFrame(matrix, index=from_day_numbers(days), columns=list(symbols))
+
+    def save_run(self, key, universe, parameters, data_version, result):
+        """
+        Record a backtest run and its holdings
+
+        A run already recorded under the key is left as it is.
+
+        Args:
+            key: result_key of the run
+            universe: Universe name
+            parameters: Keyword arguments the backtest ran with
+            data_version: Price data version the run read
+            result: Result dictionary of run_momentum_backtest
+
+        Returns:
+            Id of the run
+        """
+        with self.engine.connect() as connection:
+            existing = connection.execute(select(backtest_runs.c.id).where(backtest_runs.c.key == key)).scalar()
+        if existing is not None:
+            return existing
+
+        totals = result.get("result") or {}
+        history = result.get("holdings_history") or []
+        ids = self.symbol_ids(
+            list(dict.fromkeys(holding["symbol"] for entry in history for holding in entry["holdings"])),
+            create=True
+        )
+
+        with self.engine.begin() as connection:
+            run_id = connection.execute(backtest_runs.insert().values(
+                key=key,
+                universe=universe,
+                start_date=parameters["start_date"],
+                end_date=parameters["end_date"],
+                initial_investment=parameters["initial_investment"],
+                rebalance_period_days=parameters["rebalance_period_days"],
+                data_version=data_version,
+                created_at=pd.Timestamp.now().to_pydatetime(),
+                final_value=totals.get("final_value"),
+                total_return_pct=totals.get("total_return_pct"),
+                annualized_return_pct=totals.get("annualized_return_pct"),
+                result=totals,
+                summary=result.get("summary"),
+                equity_curve=result.get("equity_curve")
+            )).inserted_primary_key[0]
+
+            rows = [
+                {
+                    "run_id": run_id,
+                    "rebalance": rebalance,
+                    "day": int(to_day_numbers(pd.Timestamp(entry["date"]).date())),
+                    "symbol_id": ids[holding["symbol"]],
+                    "shares": holding["shares"],
+                    "price": _finite(holding["price"]),
+                    "value": _finite(holding["value"]),
+                    "weight": _finite(holding["percentage"])
+                }
+                for rebalance, entry in enumerate(history) for holding in entry["holdings"]
+            ]
+            if rows:
+                connection.execute(holdings.insert(), rows)
+
+        logger.info(f"Recorded backtest run {run_id} ({universe} {parameters['start_date']}..{parameters['end_date']}, "
+                    f"{len(history)} rebalances)")
+        return run_id
+
+    def list_runs(self, limit=50):
+        """Most recent backtest runs (without their results), newest first"""
+        columns = [column for column in backtest_runs.c if column.name not in ("result", "summary", "equity_curve")]
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(*columns).order_by(backtest_runs.c.id.desc()).limit(limit)
+            ).mappings().all()
+        return [_run_dict(row) for row in rows]
+
+    def load_run(self, run_id):
+        """
+        A recorded run with its result, summary, equity curve and holdings
+
+        Returns:
+            Dictionary, or None if there is no such run
+        """
+        with self.engine.connect() as connection:
+            row = connection.execute(select(backtest_runs).where(backtest_runs.c.id == run_id)).mappings().first()
+            if row is None:
+                return None
+            positions = connection.execute(
+                select(holdings.c.rebalance, holdings.c.day, symbols_table.c.symbol, holdings.c.shares,
+                       holdings.c.price, holdings.c.value, holdings.c.weight)
+                .join(symbols_table, symbols_table.c.id == holdings.c.symbol_id)
+                .where(holdings.c.run_id == run_id)
+                .order_by(holdings.c.rebalance, holdings.c.value.desc())
+            ).all()
+
+        run = _run_dict(row)
+        run["holdings_history"] = []
+        for _, group in itertools.groupby(positions, key=lambda position: position[0]):
+            group = list(group)
+            run["holdings_history"].append({
+                "date": from_day_numbers([group[0][1]])[0].strftime("%Y-%m-%d"),
+                "holdings": [
+                    {"symbol": symbol, "shares": shares, "price": price, "value": value, "percentage": weight}
+                    for _, _, symbol, shares, price, value, weight in group
+                ]
+            })
+        return run
+
+
+def _finite(value):
+    """None for NaN, which SQL columns cannot hold"""
+    return None if value is None or value != value else value
+
+
+def _run_dict(row):
+    # Column names are str subclasses, which orjson does not accept as keys
+    run = {str(name): value for name, value in row.items()}
+    run["created_at"] = run["created_at"].isoformat()
+    return run
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the storage of DATABASE_URL (created on first use)"""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = Storage()
+            logger.info(f"Using {_storage.dialect} storage")
+        return _storage
+
+
+if __name__ == "__main__":
+    import price_source
+    import universes
+
+    parser = argparse.ArgumentParser(description="Load daily closes into the database")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    load = subcommands.add_parser("load", help="Fetch closes from a price source and store them")
+    load.add_argument("source", help="Price source spec, e.g. yahoo, synthetic:7 or fixture:<path>")
+    load.add_argument("--universe", default=universes.DEFAULT_UNIVERSE, help="Universe to load")
+    load.add_argument("--start", default="2015-01-01", help="First date (YYYY-MM-DD)")
+    load.add_argument("--end", default=None, help="Last date, exclusive (default: today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    source = price_source.source_from_config(args.source)
+    panel = source.fetch(universes.get_universe(args.universe), start=args.start, end=args.end)
+    written = get_storage().write_bars(panel)
+    print(f"Stored {written} bars of {panel.shape[1]} symbols ({args.universe}) from {source.name}")
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import momentum_backtest
+import price_source
+import price_store
+import routes
+from app import app
+from backtest_cache import BacktestResultCache
+
+URL = "/api/momentum-backtest?start_date=2024-01-02&end_date=2024-03-01"
+
+
+class RemoteSyntheticSource(price_source.SyntheticPriceSource):
+    """Synthetic prices that claim to be remote, so they are refreshed"""
+
+    name = "synthetic-remote"
+    remote = True
+
+
+@pytest.fixture
+def remote(monkeypatch):
+    calls = []
+    refreshed = threading.Event()
+    version = {"stored": "synthetic-remote:1d:1"}
+
+    def data_version(symbols, start=None, end=None):
+        calls.append(threading.current_thread().name)
+        refreshed.set()
+        return version["stored"]
+
+    previous = price_source.get_price_source()
+    price_source.set_price_source(RemoteSyntheticSource(seed=3, end="2024-03-01"))
+    monkeypatch.setattr(price_source, "data_version", data_version)
+    monkeypatch.setattr(price_source, "stored_version", lambda: version["stored"])
+    monkeypatch.setattr(price_store, "STORE_ENABLED", False)
+    monkeypatch.setattr(routes, "backtest_cache", BacktestResultCache(disk_bytes=0))
+    yield calls, refreshed, version
+    price_source.set_price_source(previous)
+
+
+def test_conditional_get_does_not_refresh_on_the_request_thread(remote):
+    calls, refreshed, version = remote
+    client = app.test_client()
+    first = client.get(URL)
+    assert first.status_code == 200
+    assert first.get_json()["result"]
+    etag = first.headers["ETag"]
+    calls.clear()
+    refreshed.clear()
+
+    second = client.get(URL, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    # The refresh runs after the response, off the request thread
+    assert refreshed.wait(5)
+    assert calls == ["price-refresh"]
+
+
+def test_new_stored_data_changes_the_tag(remote):
+    calls, refreshed, version = remote
+    client = app.test_client()
+    etag = client.get(URL).headers["ETag"]
+
+    version["stored"] = "synthetic-remote:1d:2"
+    response = client.get(URL, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
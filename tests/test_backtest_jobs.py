@@ -0,0 +1,68 @@
+import time
+import threading
+
+import pytest
+
+import momentum_backtest
+import routes
+from backtest_cache import BacktestResultCache
+from backtest_jobs import BacktestJobManager, CANCELLED
+
+
+PARAMETERS = {
+    "symbols": ["AAA.NS", "BBB.NS"],
+    "start_date": "2024-01-01",
+    "end_date": "2024-06-01",
+    "initial_investment": 500000.0,
+    "rebalance_period_days": 14
+}
+
+
+@pytest.fixture
+def slow_backtest(monkeypatch):
+    """Backtest runner that reports progress until released"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def run_momentum_backtest(progress=None, **parameters):
+        started.set()
+        for step in range(200):
+            if progress is not None:
+                progress(step, 200)
+            if release.wait(0.01):
+                break
+        return {"result": {"final_value": 1.0}, "summary": {}}
+
+    monkeypatch.setattr(momentum_backtest, "run_momentum_backtest", run_momentum_backtest)
+    monkeypatch.setattr(routes, "backtest_data_version", lambda parameters: "v1")
+    monkeypatch.setattr(routes, "backtest_cache", BacktestResultCache(disk_bytes=0))
+    return started, release
+
+
+def test_cancelling_a_job_does_not_fail_a_concurrent_sync_request(slow_backtest):
+    started, release = slow_backtest
+    manager = BacktestJobManager(max_workers=1, runner=routes.run_cached_backtest)
+    job_id = manager.submit(**PARAMETERS)["job_id"]
+    assert started.wait(5)
+
+    sync_result = {}
+
+    def sync_request():
+        try:
+            sync_result["value"] = routes.run_cached_backtest(**PARAMETERS)
+        except Exception as e:
+            sync_result["error"] = e
+
+    thread = threading.Thread(target=sync_request)
+    thread.start()
+    manager.cancel(job_id)
+    for _ in range(100):
+        if manager.get(job_id)["status"] == CANCELLED:
+            break
+        time.sleep(0.05)
+    assert manager.get(job_id)["status"] == CANCELLED
+
+    release.set()
+    thread.join(5)
+    assert "error" not in sync_result
+    assert sync_result["value"]["result"] == {"final_value": 1.0}
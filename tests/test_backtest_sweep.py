@@ -0,0 +1,47 @@
+import pytest
+
+import backtest_sweep
+from app import app
+from price_source import SyntheticPriceSource
+
+
+@pytest.mark.parametrize("processes", ["0", "-4", "many"])
+def test_route_rejects_invalid_process_counts(processes):
+    response = app.test_client().get(f"/api/momentum-sweep?processes={processes}")
+    assert response.status_code == 400
+    assert "processes" in response.get_json()["error"]
+
+
+def test_process_count_is_capped(monkeypatch):
+    monkeypatch.setattr(backtest_sweep, "MAX_SWEEP_PROCESSES", 1)
+    symbols = SyntheticPriceSource.universe(20)
+    prices = SyntheticPriceSource(seed=3).history(symbols).iloc[-300:]
+    result = backtest_sweep.run_parameter_sweep(
+        symbols=symbols,
+        start_date=prices.index[60].strftime("%Y-%m-%d"),
+        end_date=prices.index[-1].strftime("%Y-%m-%d"),
+        lookback_days=[10, 20],
+        top_n=[5],
+        processes=5000,
+        price_df=prices
+    )
+    assert result["parameters"]["processes"] == 1
+    assert len(result["rows"]) == 2
+
+
+def test_non_positive_process_count_is_rejected():
+    with pytest.raises(ValueError):
+        backtest_sweep.run_parameter_sweep(symbols=["A.NS"], processes=0)
+
+
+@pytest.mark.parametrize("query", ["lookback_days=0", "lookback_days=20,-5", "top_n=0", "rebalance_period_days=0", "top_n=x"])
+def test_route_rejects_non_positive_grid_values(query):
+    response = app.test_client().get(f"/api/momentum-sweep?{query}")
+    assert response.status_code == 400
+    assert query.split("=")[0] in response.get_json()["error"]
+
+
+@pytest.mark.parametrize("grid", [{"lookback_days": [0]}, {"lookback_days": [-3]}, {"top_n": [0]}, {"rebalance_period_days": [0]}, {"top_n": []}])
+def test_non_positive_grid_values_are_rejected(grid):
+    with pytest.raises(ValueError):
+        backtest_sweep.run_parameter_sweep(symbols=["A.NS"], **grid)
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import download_scheduler
+from download_scheduler import BatchDownloader, PermanentDownloadError, TokenBucket, backoff_delay
+
+SYMBOLS = [f"S{i:02d}.NS" for i in range(20)]
+
+
+class FakeClock:
+    """Clock whose sleep only advances the time"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self._lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+
+def frame(batch):
+    index = pd.bdate_range("2024-01-01", periods=3)
+    return pd.DataFrame({symbol: np.arange(3.0) + i for i, symbol in enumerate(batch)}, index=index)
+
+
+def test_token_bucket_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4, capacity=2, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        bucket.acquire()
+    # The burst of 2 is free, the other 8 tokens arrive at 4 per second
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_token_bucket_disabled():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0, clock=clock, sleep=clock.sleep)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+@pytest.mark.parametrize("attempt", range(8))
+def test_backoff_delay_bounds(attempt):
+    window = min(10.0, 0.5 * 2 ** attempt)
+    delays = [backoff_delay(attempt, base_delay=0.5, max_delay=10.0) for _ in range(200)]
+    assert all(window / 2 <= delay <= window for delay in delays)
+    # Jitter spreads the retries of concurrent batches
+    assert len(set(delays)) > 1
+
+
+def test_batches_are_rate_limited():
+    clock = FakeClock()
+    downloader = BatchDownloader(frame, batch_size=2, max_workers=1, rate=5, burst=1, sleep=clock.sleep, clock=clock)
+    data = downloader.download(SYMBOLS)
+    assert list(data.columns) == SYMBOLS
+    # 10 batches at 5 per second after the first
+    assert clock.now == pytest.approx(9 / 5)
+
+
+def test_concurrency_is_bounded():
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def fetch(batch):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return frame(batch)
+
+    downloader = BatchDownloader(fetch, batch_size=1, max_workers=3, rate=0)
+    data = downloader.download(SYMBOLS)
+    assert data.notna().all().all()
+    assert 1 < active["max"] <= 3
+
+
+def test_transient_failures_are_retried():
+    clock = FakeClock()
+    failures = {"S00.NS": 2}
+
+    def fetch(batch):
+        if failures.get(batch[0], 0):
+            failures[batch[0]] -= 1
+            raise ConnectionError("reset")
+        return frame(batch)
+
+    downloader = BatchDownloader(fetch, batch_size=5, max_workers=1, rate=0, max_retries=3,
+                                 base_delay=1.0, max_delay=30.0, sleep=clock.sleep, clock=clock)
+    data = downloader.download(SYMBOLS)
+    assert data.notna().all().all()
+    assert downloader.last_stats["retries"] == 2
+    assert downloader.last_stats["failed_batches"] == 0
+    # Backoff of the first and second retry
+    assert 0.5 <= clock.sleeps[0] <= 1.0
+    assert 1.0 <= clock.sleeps[1] <= 2.0
+
+
+def test_exhausted_retries_skip_the_batch():
+    clock = FakeClock()
+    calls = []
+
+    def fetch(batch):
+        calls.append(batch[0])
+        if batch[0] == "S05.NS":
+            raise TimeoutError("timed out")
+        return frame(batch)
+
+    downloader = BatchDownloader(fetch, batch_size=5, max_workers=1, rate=0, max_retries=3, sleep=clock.sleep, clock=clock)
+    data = downloader.download(SYMBOLS)
+    assert calls.count("S05.NS") == 3
+    assert data[SYMBOLS[5:10]].isna().all().all()
+    assert data[SYMBOLS[:5] + SYMBOLS[10:]].notna().all().all()
+    assert downloader.last_stats["failed_batches"] == 1
+    assert downloader.last_stats["retries"] == 2
+
+
+def test_permanent_failure_is_not_retried():
+    clock = FakeClock()
+    calls = []
+
+    def fetch(batch):
+        calls.append(batch[0])
+        raise PermanentDownloadError("invalid period")
+
+    downloader = BatchDownloader(fetch, batch_size=10, max_workers=1, rate=0, max_retries=3, sleep=clock.sleep, clock=clock)
+    data = downloader.download(SYMBOLS)
+    assert calls == ["S00.NS", "S10.NS"]
+    assert clock.sleeps == []
+    assert list(data.columns) == SYMBOLS and data.empty
+    assert downloader.last_stats["failed_batches"] == 2
+
+
+def test_throughput_is_reported():
+    symbols_before = download_scheduler.DOWNLOAD_SYMBOLS._values[()]
+    downloader = BatchDownloader(frame, batch_size=4, max_workers=2, rate=0)
+    downloader.download(SYMBOLS)
+    assert downloader.last_stats["symbols"] == len(SYMBOLS)
+    assert downloader.last_stats["symbols_per_second"] > 0
+    assert download_scheduler.DOWNLOAD_SYMBOLS._values[()] == symbols_before + len(SYMBOLS)
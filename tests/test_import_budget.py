@@ -0,0 +1,7 @@
+from benchmarks import import_budget
+
+
+def test_import_main_is_lazy_and_within_budget():
+    result = import_budget.measure(runs=3)
+    assert result["eagerly_loaded"] == []
+    assert import_budget.check(result) == []
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import intraday
+import price_source
+from app import app
+from intraday import IntradayMomentum, synthetic_bars
+
+SYMBOLS = ["AAA.NS", "BBB.NS", "CCC.NS"]
+
+
+def naive_returns(bars, windows):
+    """Trailing returns recomputed from the forward filled panel"""
+    filled = bars.ffill()
+    available = len(filled) - 1
+    last = filled.iloc[-1]
+    return {window: last / filled.iloc[-1 - min(length, available)] - 1 for window, length in windows.items()}
+
+
+def assert_matches_naive(engine, bars):
+    expected = naive_returns(bars, engine.windows)
+    for window in engine.windows:
+        np.testing.assert_allclose(engine.returns(window).to_numpy(), expected[window].to_numpy(), equal_nan=True)
+
+
+@pytest.fixture
+def restore_source():
+    previous = price_source.get_price_source()
+    yield
+    price_source.set_price_source(previous)
+    intraday._engines.clear()
+
+
+def test_ring_buffer_wraps_around():
+    engine = IntradayMomentum(SYMBOLS, "1h")
+    bars = synthetic_bars(SYMBOLS, "1h", sessions=4, seed=3)
+    assert len(bars) > 2 * engine.capacity
+    for end, (timestamp, closes) in enumerate(zip(bars.index.values, bars.to_numpy()), start=1):
+        assert engine.ingest(timestamp, closes)
+        assert_matches_naive(engine, bars.iloc[:end])
+    assert engine.bars == len(bars)
+    assert engine.last_time == bars.index[-1]
+
+
+def test_window_returns_match_naive_recomputation_with_missing_bars():
+    engine = IntradayMomentum(SYMBOLS, "5m")
+    bars = synthetic_bars(SYMBOLS, "5m", sessions=2, seed=11)
+    bars = bars.mask(np.random.default_rng(5).random(bars.shape) < 0.1)
+    intraday.replay(engine, bars)
+    assert_matches_naive(engine, bars)
+
+
+def test_same_timestamp_revises_the_latest_bar():
+    engine = IntradayMomentum(SYMBOLS, "15m")
+    times = pd.date_range("2024-01-02 09:15", periods=3, freq="15min")
+    engine.ingest(times[0], np.array([100.0, 50.0, 10.0]))
+    engine.ingest(times[1], np.array([101.0, 49.0, 11.0]))
+    engine.ingest(times[2], np.array([102.0, 48.0, 12.0]))
+
+    # The forming bar is revised; a NaN keeps the previous bar's close
+    assert engine.ingest(times[2], np.array([110.0, np.nan, 9.0]))
+    assert engine.bars == 3
+    revised = pd.DataFrame([[100.0, 50.0, 10.0], [101.0, 49.0, 11.0], [110.0, np.nan, 9.0]], index=times, columns=SYMBOLS)
+    assert_matches_naive(engine, revised)
+    assert engine.returns("30m")["AAA.NS"] == pytest.approx(0.10)
+
+
+def test_out_of_order_bars_are_ignored():
+    engine = IntradayMomentum(SYMBOLS, "15m")
+    times = pd.date_range("2024-01-02 09:15", periods=3, freq="15min")
+    bars = pd.DataFrame([[100.0, 50.0, 10.0], [101.0, 49.0, 11.0], [102.0, 48.0, 12.0]], index=times, columns=SYMBOLS)
+    intraday.replay(engine, bars)
+
+    assert not engine.ingest(times[0], np.array([1.0, 1.0, 1.0]))
+    assert engine.bars == 3
+    assert engine.last_time == times[-1]
+    assert_matches_naive(engine, bars)
+
+
+def test_ingest_frame_skips_bars_already_ingested():
+    engine = IntradayMomentum(SYMBOLS, "5m")
+    bars = synthetic_bars(SYMBOLS, "5m", sessions=1, seed=2)
+    assert engine.ingest_frame(bars.iloc[:40]) == 40
+    # The overlapping latest bar is a revision, the rest are new
+    assert engine.ingest_frame(bars) == len(bars) - 39
+    assert engine.bars == len(bars)
+    assert_matches_naive(engine, bars)
+
+
+def test_route_serves_synthetic_source(restore_source):
+    price_source.set_price_source(price_source.SyntheticPriceSource(seed=4))
+    response = app.test_client().get("/api/momentum-intraday?universe=nifty25&interval=15m")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert "error" not in data
+    assert data["bars"] > 1
+    assert data["windows"] == list(intraday.window_bars("15m"))
+
+
+def test_route_rejects_daily_only_source(restore_source):
+    frame = pd.DataFrame({"AAA.NS": [1.0, 2.0]}, index=pd.bdate_range("2024-01-01", periods=2))
+    price_source.set_price_source(price_source.FixturePriceSource(frame=frame))
+    response = app.test_client().get("/api/momentum-intraday?universe=nifty25")
+    assert response.status_code == 501
+    assert "fixture" in response.get_json()["error"]
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from momentum_backtest import MomentumBacktest
+
+SYMBOLS = ["A.NS", "B.NS", "C.NS", "D.NS"]
+
+
+def run(prices, **parameters):
+    options = dict(
+        start_date=prices.index[5].strftime("%Y-%m-%d"),
+        end_date=(prices.index[-1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+        rebalance_period_days=1,
+        lookback_days=2,
+        top_n=2,
+        price_df=prices
+    )
+    options.update(parameters)
+    backtest = MomentumBacktest(list(prices.columns), **options)
+    result = backtest.run_backtest()
+    assert result
+    return backtest, result
+
+
+def test_unchanged_holdings_have_no_turnover():
+    days = pd.date_range("2024-01-01", periods=40, freq="D")
+    growth = np.array([1.01, 1.01, 1.005, 1.005])
+    prices = pd.DataFrame(100 * growth ** np.arange(len(days))[:, None], index=days, columns=SYMBOLS)
+
+    backtest, result = run(prices)
+    assert all(set(entry["holdings"]) == {"A.NS", "B.NS"} for entry in backtest.holdings_history)
+    # Buying from cash is a full turnover, keeping the holdings is none
+    assert backtest.turnover_history[0] == pytest.approx(1.0)
+    np.testing.assert_allclose(backtest.turnover_history[1:], 0.0, atol=1e-12)
+    assert result["turnover_pct"] == pytest.approx(100.0 / len(backtest.turnover_history))
+
+
+def test_full_rotation_has_full_turnover():
+    days = pd.date_range("2024-01-01", periods=40, freq="D")
+    # A and B lead on even days, C and D on odd days
+    up = np.where(np.arange(len(days)) % 2 == 0, 1.02, 0.99)
+    steps = np.column_stack([up, up, 2.01 - up, 2.01 - up])
+    steps[0] = 1.0
+    prices = pd.DataFrame(100 * np.cumprod(steps, axis=0), index=days, columns=SYMBOLS)
+
+    backtest, result = run(prices)
+    held = [frozenset(entry["holdings"]) for entry in backtest.holdings_history]
+    assert all(a.isdisjoint(b) for a, b in zip(held, held[1:]))
+    np.testing.assert_allclose(backtest.turnover_history, 1.0)
+    assert result["turnover_pct"] == pytest.approx(100.0)
+
+
+def baseline_backtest(price_df, start_date, end_date, initial_investment, rebalance_period_days, lookback_days, top_n):
+    """The per-rebalance loop run_backtest used before it was vectorized"""
+    def price(symbol, date):
+        return price_df.loc[date, symbol]
+
+    def portfolio_value(holdings, date, cash):
+        value = cash
+        for symbol, shares in holdings.items():
+            if not np.isnan(price(symbol, date)):
+                value += shares * price(symbol, date)
+        return value
+
+    def momentum(date):
+        subset = price_df.loc[price_df.index <= date]
+        if len(subset) <= 1:
+            return pd.Series(dtype=float)
+        latest = subset.iloc[-1]
+        past = subset.iloc[-lookback_days] if len(subset) >= lookback_days else subset.iloc[0]
+        return ((latest - past) / past).sort_values(ascending=False).dropna()
+
+    cash = initial_investment
+    holdings = {}
+    values, history, rebalance_dates = [], [], []
+    current = pd.Timestamp(start_date)
+    while current <= pd.Timestamp(end_date):
+        later = price_df.index[price_df.index >= current]
+        if len(later) == 0:
+            break
+        date = later[0]
+        rebalance_dates.append(date)
+        ranked = momentum(date)
+        if len(ranked) == 0:
+            current += pd.Timedelta(days=rebalance_period_days)
+            continue
+        top = ranked.head(min(top_n, len(ranked)))
+        cash = portfolio_value(holdings, date, cash)
+        holdings = {}
+        amount = cash / len(top)
+        for symbol in top.index:
+            if not np.isnan(price(symbol, date)) and price(symbol, date) > 0:
+                holdings[symbol] = amount / price(symbol, date)
+                cash -= holdings[symbol] * price(symbol, date)
+        history.append({"date": date, "holdings": dict(holdings), "cash": cash})
+        values.append({"date": date, "value": portfolio_value(holdings, date, cash)})
+        current += pd.Timedelta(days=rebalance_period_days)
+    return values, history, rebalance_dates
+
+
+@pytest.mark.parametrize("rebalance_period_days,lookback_days,top_n", [(14, 20, 10), (1, 5, 3), (30, 60, 25)])
+def test_vectorized_backtest_matches_baseline_loop(rebalance_period_days, lookback_days, top_n):
+    from price_source import SyntheticPriceSource
+
+    symbols = SyntheticPriceSource.universe(40)
+    source = SyntheticPriceSource(seed=21, nan_probability=0.02)
+    prices = source.history(symbols).loc["2022-06-01":"2024-06-30"]
+    parameters = dict(start_date="2023-01-02", end_date="2024-05-31", initial_investment=500000.0,
+                      rebalance_period_days=rebalance_period_days, lookback_days=lookback_days, top_n=top_n)
+
+    backtest = MomentumBacktest(symbols, price_df=prices, **parameters)
+    assert backtest.run_backtest()
+    values, history, rebalance_dates = baseline_backtest(backtest.price_df, **parameters)
+
+    assert list(backtest.rebalance_dates) == rebalance_dates
+    assert [entry["date"] for entry in backtest.portfolio_values] == [entry["date"] for entry in values]
+    np.testing.assert_allclose([entry["value"] for entry in backtest.portfolio_values], [entry["value"] for entry in values], rtol=1e-9)
+    assert len(backtest.holdings_history) == len(history)
+    for vectorized, baseline in zip(backtest.holdings_history, history):
+        assert vectorized["date"] == baseline["date"]
+        assert set(vectorized["holdings"]) == set(baseline["holdings"])
+        for symbol, shares in baseline["holdings"].items():
+            assert vectorized["holdings"][symbol] == pytest.approx(shares, rel=1e-9)
+        assert vectorized["cash"] == pytest.approx(baseline["cash"], abs=1e-6)
+
+
+@pytest.mark.parametrize("query", [
+    "rebalance_period_days=0",
+    "rebalance_period_days=-7",
+    "start_date=2024-03-01&end_date=2024-01-01",
+    "start_date=01-01-2024"
+])
+def test_backtest_route_rejects_invalid_parameters(query):
+    from app import app
+
+    client = app.test_client()
+    for path in ("/api/momentum-backtest", "/api/momentum-backtest/stream"):
+        response = client.get(f"{path}?{query}")
+        assert response.status_code == 400
+        assert response.get_json()["error"]
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import momentumnifty100
+import routes
+from app import app
+from result_cache import StaleWhileRevalidateCache
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Count the store refreshes (data_version) and analyses behind the momentum routes"""
+    calls = {"data_version": 0, "analysis": 0}
+    version = {"value": "v1"}
+
+    def data_version(symbol_list=None, durations=None):
+        calls["data_version"] += 1
+        return version["value"]
+
+    def get_momentum_data(price_data=None, symbol_list=None, durations=None):
+        calls["analysis"] += 1
+        sections = durations or momentumnifty100.SECTIONS
+        return {section: {"top_performers": {"A": 1.0}, "bottom_performers": {"B": -1.0}} for section in sections}
+
+    monkeypatch.setattr(momentumnifty100, "data_version", data_version)
+    monkeypatch.setattr(momentumnifty100, "get_momentum_data", get_momentum_data)
+    monkeypatch.setattr(routes, "momentum_cache", StaleWhileRevalidateCache(ttl_seconds=3600, name="test"))
+    calls["version"] = version
+    return calls
+
+
+def test_conditional_get_on_cached_entry_skips_the_store(counted):
+    client = app.test_client()
+    first = client.get("/api/momentum-analysis?universe=nifty25")
+    assert first.status_code == 200
+    assert counted["data_version"] == 1
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/momentum-analysis?universe=nifty25", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert counted["data_version"] == 1
+    assert counted["analysis"] == 1
+
+
+def test_store_refresh_runs_in_background_revalidation(counted, monkeypatch):
+    client = app.test_client()
+    first = client.get("/api/momentum-analysis?universe=nifty25")
+    etag = first.headers["ETag"]
+
+    # Expire the entry; the stale copy is served while the refresh picks up new data
+    routes.momentum_cache.ttl_seconds = 0
+    counted["version"]["value"] = "v2"
+    refreshed = threading.Event()
+    original = routes.compute_momentum_analysis
+
+    def compute(*args, **kwargs):
+        try:
+            return original(*args, **kwargs)
+        finally:
+            refreshed.set()
+
+    monkeypatch.setattr(routes, "compute_momentum_analysis", compute)
+    stale = client.get("/api/momentum-analysis?universe=nifty25", headers={"If-None-Match": etag})
+    assert stale.status_code == 304
+    assert refreshed.wait(5)
+
+    routes.momentum_cache.ttl_seconds = 3600
+    for _ in range(50):
+        fresh = client.get("/api/momentum-analysis?universe=nifty25", headers={"If-None-Match": etag})
+        if fresh.status_code == 200:
+            break
+        refreshed.wait(0.1)
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert counted["data_version"] == 2
+
+
+def test_section_conditional_get_on_cached_entry_skips_the_store(counted):
+    client = app.test_client()
+    first = client.get("/api/momentum-analysis/5d?universe=nifty25")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    calls = counted["data_version"]
+
+    second = client.get("/api/momentum-analysis/5d?universe=nifty25", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert counted["data_version"] == calls
@@ -0,0 +1,55 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from momentum_index import CumulativeReturnIndex, index_for_panel
+
+
+def make_panel(rows, symbols=3, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=rows, name="Date")
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (rows, symbols)), axis=0))
+    return pd.DataFrame(prices, index=index, columns=[f"S{i}.NS" for i in range(symbols)])
+
+
+def test_extending_for_a_newer_panel_leaves_the_previous_index_unchanged():
+    panel = make_panel(300)
+    previous = CumulativeReturnIndex(panel.iloc[:250])
+    dates, log_prices = previous.dates, previous.log_prices.copy()
+    trailing = previous.trailing_returns(20)
+
+    index = index_for_panel(panel, previous)
+    assert index is not previous
+    assert len(previous) == 250
+    assert previous.dates.equals(dates)
+    np.testing.assert_array_equal(previous.log_prices, log_prices)
+    pd.testing.assert_series_equal(previous.trailing_returns(20), trailing)
+
+    np.testing.assert_allclose(index.log_prices, CumulativeReturnIndex(panel).log_prices)
+
+
+def test_reads_are_consistent_while_newer_panels_are_indexed():
+    panel = make_panel(1000)
+    previous = CumulativeReturnIndex(panel.iloc[:100])
+    expected = previous.trailing_returns(50)
+    stop = threading.Event()
+    mismatches = []
+
+    def read():
+        while not stop.is_set():
+            if not np.allclose(previous.trailing_returns(50), expected):
+                mismatches.append(len(previous))
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    index = previous
+    for end in range(101, 1000, 7):
+        index = index_for_panel(panel.iloc[:end], index if end % 2 else previous)
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    assert not mismatches
+    assert len(previous) == 100
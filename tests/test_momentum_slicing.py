@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import momentumnifty100
+import price_source
+from momentumnifty100 import DURATION_TRADING_DAYS, COMPARISON
+
+
+@pytest.fixture
+def source():
+    """NaN-free synthetic prices served through the fixture source"""
+    symbols = price_source.SyntheticPriceSource.universe(30)
+    prices = price_source.SyntheticPriceSource(seed=9).history(symbols).iloc[-400:]
+    assert not prices.isna().any().any()
+    fixture = price_source.FixturePriceSource(frame=prices)
+    previous = price_source.get_price_source()
+    price_source.set_price_source(fixture)
+    yield fixture
+    price_source.set_price_source(previous)
+    momentumnifty100._panel_indexes.clear()
+
+
+def per_period_returns(source, duration):
+    """Returns of a separate download of the duration's window (the pre-slicing computation)"""
+    data = source.fetch(source.symbols, period=f"{DURATION_TRADING_DAYS[duration]}d")
+    change = data.pct_change().dropna()
+    return (change + 1).prod() - 1
+
+
+def test_sliced_returns_match_per_period_downloads(source):
+    panel = momentumnifty100.safe_download(source.symbols, period=momentumnifty100.PANEL_PERIOD, interval="1d")
+    index = momentumnifty100.panel_index(panel)
+    for duration in DURATION_TRADING_DAYS:
+        sliced = momentumnifty100.duration_returns(index, duration, panel.shape[0])
+        pd.testing.assert_series_equal(sliced, per_period_returns(source, duration), check_names=False)
+        sliced_window = momentumnifty100.calculate_period_returns(momentumnifty100.slice_duration(panel, duration), duration)
+        pd.testing.assert_series_equal(sliced_window, per_period_returns(source, duration), check_names=False)
+
+
+def test_momentum_data_matches_per_period_rankings(source):
+    results = momentumnifty100.get_momentum_data(symbol_list=source.symbols)
+    assert "error" not in results
+    for duration in DURATION_TRADING_DAYS:
+        top, bottom = momentumnifty100.select_performers(per_period_returns(source, duration))
+        assert list(results[duration]["top_performers"].items()) == list(top.items())
+        assert list(results[duration]["bottom_performers"].items()) == list(bottom.items())
+
+    expected = momentumnifty100.compare_top_10(per_period_returns(source, "5d"), per_period_returns(source, "3mo"))
+    for key, names in expected.items():
+        assert sorted(results[COMPARISON][key]) == sorted(names)
+
+
+def test_single_section_matches_full_analysis(source):
+    full = momentumnifty100.get_momentum_data(symbol_list=source.symbols)
+    for section in momentumnifty100.SECTIONS:
+        single = momentumnifty100.get_momentum_data(symbol_list=source.symbols, durations=[section])
+        assert single[section] == full[section]
@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from yfinance import exceptions as yf_exceptions
+
+import price_source
+from price_source import YahooPriceSource
+
+
+class StubTicker:
+    """yf.Ticker replacement serving canned histories"""
+
+    calls = []
+    failures = {}
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, **options):
+        StubTicker.calls.append(self.symbol)
+        failure = StubTicker.failures.get(self.symbol)
+        if failure:
+            raise failure.pop(0)
+        if self.symbol == "BAD.NS":
+            raise yf_exceptions.YFPricesMissingError(self.symbol, "")
+        index = pd.date_range("2024-01-01", periods=3, name="Date")
+        return pd.DataFrame({"Close": [1.0, 2.0, 3.0]}, index=index)
+
+
+@pytest.fixture
+def stub_yahoo(monkeypatch):
+    StubTicker.calls = []
+    StubTicker.failures = {}
+    monkeypatch.setattr(price_source.yf, "Ticker", StubTicker)
+    return StubTicker
+
+
+def fetch(symbols):
+    source = YahooPriceSource(batch_size=3, max_workers=1, rate=0)
+    return source.fetch(symbols, start="2024-01-01", max_retries=3, retry_delay=0)
+
+
+def test_missing_symbol_does_not_drop_its_batch(stub_yahoo):
+    prices = fetch(["AAA.NS", "BAD.NS", "CCC.NS"])
+
+    assert list(prices.columns) == ["AAA.NS", "BAD.NS", "CCC.NS"]
+    assert prices["AAA.NS"].tolist() == [1.0, 2.0, 3.0]
+    assert prices["CCC.NS"].tolist() == [1.0, 2.0, 3.0]
+    assert prices["BAD.NS"].isna().all()
+    # Fetched once: a missing symbol is not retried
+    assert stub_yahoo.calls.count("BAD.NS") == 1
+
+
+def test_transport_errors_are_retried(stub_yahoo):
+    stub_yahoo.failures["AAA.NS"] = [ConnectionError("reset"), yf_exceptions.YFRateLimitError()]
+    prices = fetch(["AAA.NS", "BAD.NS"])
+
+    assert prices["AAA.NS"].tolist() == [1.0, 2.0, 3.0]
+    assert stub_yahoo.calls.count("AAA.NS") == 3
+
+
+def test_invalid_period_is_not_retried(stub_yahoo):
+    stub_yahoo.failures["AAA.NS"] = [yf_exceptions.YFInvalidPeriodError("AAA.NS", "7y", "1d, 5d")]
+    prices = fetch(["AAA.NS"])
+
+    assert prices["AAA.NS"].isna().all()
+    assert stub_yahoo.calls.count("AAA.NS") == 1
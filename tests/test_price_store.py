@@ -0,0 +1,128 @@
+import os
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore
+
+
+def make_fetch(calls, fail=False):
+    """Fetch stub: GOOD.NS gets bars, BAD.NS only NaN"""
+    def fetch(symbols, start, end):
+        calls.append((tuple(symbols), start))
+        if fail:
+            raise ConnectionError("unreachable")
+        index = pd.bdate_range(start, "2024-03-01", name="Date")
+        data = {symbol: np.arange(len(index), dtype=float) + 1 if symbol == "GOOD.NS" else np.nan
+                for symbol in symbols}
+        return pd.DataFrame(data, index=index)
+    return fetch
+
+
+def test_symbols_without_bars_are_not_downloaded_again(tmp_path):
+    store = PriceStore(root=str(tmp_path), shared_matrix=False)
+    calls = []
+    fetch = make_fetch(calls)
+
+    first = store.load(["GOOD.NS", "BAD.NS"], "2024-01-01", fetch=fetch)
+    assert first["GOOD.NS"].notna().all()
+    assert first["BAD.NS"].isna().all()
+    assert len(calls) == 1
+
+    # A warm read within max_age_seconds touches neither symbol
+    store.load(["GOOD.NS", "BAD.NS"], "2024-01-01", fetch=fetch)
+    store.load(["BAD.NS"], "2024-01-01", fetch=fetch)
+    assert len(calls) == 1
+
+    # Once due, the empty symbol is checked again like any other
+    plan = store.plan_refresh(["BAD.NS"], "2024-01-01", now=pd.Timestamp.now().timestamp() + store.max_age_seconds + 1)
+    assert plan == {"2024-01-01": ["BAD.NS"]}
+
+
+def test_failed_download_is_not_retried_on_every_request(tmp_path):
+    store = PriceStore(root=str(tmp_path), shared_matrix=False)
+    calls = []
+    fetch = make_fetch(calls, fail=True)
+
+    store.load(["GOOD.NS"], "2024-01-01", fetch=fetch)
+    store.load(["GOOD.NS"], "2024-01-01", fetch=fetch)
+    assert len(calls) == 1
+    assert store.version == 0
+
+
+def test_an_earlier_window_is_still_fetched(tmp_path):
+    store = PriceStore(root=str(tmp_path), shared_matrix=False)
+    calls = []
+    fetch = make_fetch(calls)
+
+    store.load(["BAD.NS"], "2024-02-01", fetch=fetch)
+    store.load(["BAD.NS"], "2024-01-01", fetch=fetch)
+    assert [start for _, start in calls] == ["2024-02-01", "2024-01-01"]
+
+
+def test_failed_backfill_does_not_extend_the_covered_range(tmp_path):
+    store = PriceStore(root=str(tmp_path), shared_matrix=False)
+    calls = []
+    store.load(["GOOD.NS"], "2024-01-01", fetch=make_fetch(calls))
+
+    # The backfill to 2023 fails; the stored history still starts in 2024
+    store.load(["GOOD.NS"], "2023-01-02", fetch=make_fetch(calls, fail=True))
+    assert store._read_manifest()["symbols"]["GOOD.NS"]["covered_from"] == "2024-01-01"
+    # ...and is not retried on every request
+    store.load(["GOOD.NS"], "2023-01-02", fetch=make_fetch(calls))
+    assert len(calls) == 2
+
+    due = pd.Timestamp.now().timestamp() + store.max_age_seconds + 1
+    assert store.plan_refresh(["GOOD.NS"], "2023-01-02", now=due) == {"2023-01-02": ["GOOD.NS"]}
+    store.max_age_seconds = -1
+    store.refresh(["GOOD.NS"], "2023-01-02", None, make_fetch(calls))
+    dates, _ = store.read_symbol("GOOD.NS")
+    assert str(dates[0]) == "2023-01-02"
+    assert store._read_manifest()["symbols"]["GOOD.NS"]["covered_from"] == "2023-01-02"
+
+
+def test_shared_matrix_is_published_off_the_refresh_and_matches_the_symbol_files(tmp_path, monkeypatch):
+    store = PriceStore(root=str(tmp_path))
+    published = threading.Event()
+    release = threading.Event()
+    publish = store.matrix.publish
+
+    def slow_publish(columns, version):
+        release.wait(5)
+        token = publish(columns, version)
+        published.set()
+        return token
+
+    monkeypatch.setattr(store.matrix, "publish", slow_publish)
+    fetch = make_fetch([])
+    fetch_prices = lambda symbols, start, end: fetch(symbols, start, end) / 3
+    # refresh returns while the publisher is still blocked
+    store.refresh(["GOOD.NS", "BAD.NS"], "2024-01-01", None, fetch_prices)
+    assert store.matrix.current() is None
+    from_files = store.read(["GOOD.NS", "BAD.NS"], start="2024-01-10")
+
+    release.set()
+    assert published.wait(5)
+    assert store.matrix.current().version == store.version
+    from_matrix = store.read(["GOOD.NS", "BAD.NS"], start="2024-01-10")
+    assert from_matrix["GOOD.NS"].dtype == np.float64
+    pd.testing.assert_frame_equal(from_matrix, from_files)
+
+
+def test_float32_snapshot_is_ignored(tmp_path):
+    store = PriceStore(root=str(tmp_path))
+    store.write(make_fetch([])(["GOOD.NS"], "2024-01-01", None) / 3)
+    store.publish_matrix()
+    pointer_path = os.path.join(store.matrix.directory, "current.json")
+    with open(pointer_path) as f:
+        pointer = json.load(f)
+    del pointer["dtype"]
+    with open(pointer_path, "w") as f:
+        json.dump(pointer, f)
+
+    assert store.matrix.current() is None
+    assert store.matrix.version is None
+    assert store.publish_matrix() == store.version
+    assert store.matrix.current().values.dtype == np.float64
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+from price_source import SyntheticPriceSource
+
+
+@pytest.fixture
+def db(tmp_path):
+    return storage.Storage(f"sqlite:///{tmp_path / 'prices.db'}")
+
+
+def panel(symbols, start, periods, seed=0):
+    """Closes representable as float32, the precision of the daily_bars table"""
+    values = np.random.default_rng(seed).uniform(10, 5000, (periods, len(symbols))).astype(np.float32)
+    return pd.DataFrame(values.astype(np.float64), index=pd.bdate_range(start, periods=periods), columns=symbols)
+
+
+def test_round_trip_500_symbols_5_years(db):
+    symbols = SyntheticPriceSource.universe(500)
+    prices = panel(symbols, "2019-01-01", 5 * 252)
+    assert db.write_bars(prices) == prices.size
+
+    read = db.read_bars(symbols)
+    pd.testing.assert_frame_equal(read, prices, check_freq=False, check_names=False)
+
+
+def test_nan_bars_are_preserved(db):
+    prices = panel(["A.NS", "B.NS", "C.NS"], "2024-01-01", 20)
+    prices.iloc[3, 0] = np.nan
+    prices.iloc[5:9, 1] = np.nan
+    prices.iloc[:, 2] = np.nan
+    # C.NS has no bars at all, every date still has one
+    assert db.write_bars(prices) == prices.notna().sum().sum()
+
+    read = db.read_bars(list(prices.columns))
+    pd.testing.assert_frame_equal(read, prices, check_freq=False, check_names=False)
+
+
+def test_duplicate_and_unknown_symbols(db):
+    prices = panel(["A.NS", "B.NS"], "2024-01-01", 10)
+    db.write_bars(prices)
+
+    read = db.read_bars(["B.NS", "UNKNOWN.NS", "A.NS", "B.NS"])
+    assert list(read.columns) == ["B.NS", "UNKNOWN.NS", "A.NS", "B.NS"]
+    np.testing.assert_array_equal(read.iloc[:, 0].to_numpy(), prices["B.NS"].to_numpy())
+    np.testing.assert_array_equal(read.iloc[:, 3].to_numpy(), prices["B.NS"].to_numpy())
+    np.testing.assert_array_equal(read.iloc[:, 2].to_numpy(), prices["A.NS"].to_numpy())
+    assert read["UNKNOWN.NS"].isna().all()
+    assert db.read_bars(["UNKNOWN.NS"]).empty
+
+
+def test_upsert_updates_closes_and_bumps_version(db):
+    prices = panel(["A.NS", "B.NS"], "2024-01-01", 10)
+    db.write_bars(prices)
+    version = db.version
+
+    revised = prices.iloc[-3:] * 2
+    db.write_bars(revised)
+    assert db.version != version
+
+    read = db.read_bars(["A.NS", "B.NS"])
+    assert len(read) == len(prices)
+    np.testing.assert_array_equal(read.iloc[-3:].to_numpy(), revised.to_numpy())
+    np.testing.assert_array_equal(read.iloc[:-3].to_numpy(), prices.iloc[:-3].to_numpy())
+
+
+def test_unsupported_database_fails_fast(monkeypatch, tmp_path):
+    create_engine = storage.create_engine
+
+    def other_database(url, **options):
+        engine = create_engine(url, **options)
+        engine.dialect.name = "oracle"
+        return engine
+
+    monkeypatch.setattr(storage, "create_engine", other_database)
+    with pytest.raises(ValueError, match="oracle"):
+        storage.Storage(f"sqlite:///{tmp_path / 'other.db'}")
+    assert not (tmp_path / "other.db").exists()
+
+
+def test_runs_with_several_rebalances_on_one_day_are_recorded(db):
+    import momentum_backtest
+
+    symbols = SyntheticPriceSource.universe(12)
+    prices = SyntheticPriceSource(seed=5).history(symbols).loc["2023-06-01":"2024-03-01"]
+    parameters = dict(start_date="2024-01-01", end_date="2024-02-01", initial_investment=100000.0,
+                      rebalance_period_days=1, lookback_days=10, top_n=3)
+    result = momentum_backtest.run_momentum_backtest(symbols, price_df=prices, **parameters)
+    history = result["holdings_history"]
+    dates = [entry["date"] for entry in history]
+    # Saturday and Sunday rebalance on Monday
+    assert len(dates) > len(set(dates))
+
+    run_id = db.save_run("key", "test", parameters, "v1", result)
+    run = db.load_run(run_id)
+    assert len(run["holdings_history"]) == len(history)
+    for saved, entry in zip(run["holdings_history"], history):
+        assert saved["date"] == pd.Timestamp(entry["date"]).strftime("%Y-%m-%d")
+        assert sorted(holding["symbol"] for holding in saved["holdings"]) == sorted(holding["symbol"] for holding in entry["holdings"])
+
+
+def test_failed_recording_is_logged_and_counted(monkeypatch, caplog):
+    import routes
+
+    class BrokenStorage:
+        def save_run(self, *args):
+            raise RuntimeError("disk full")
+
+    monkeypatch.setattr(routes.storage, "get_storage", lambda: BrokenStorage())
+    before = routes.RECORD_FAILURES._values[()]
+    routes.record_backtest_run("key", "test", {}, "v1", {"result": {"final_value": 1.0}})
+    assert routes.RECORD_FAILURES._values[()] == before + 1
+    assert "disk full" in caplog.text
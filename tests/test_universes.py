@@ -0,0 +1,22 @@
+import pytest
+
+import universes
+from app import app
+
+
+@pytest.mark.parametrize("name", ["../../etc/notes", "nifty25/../nifty100", "..", "a b", "nifty25.txt"])
+def test_invalid_universe_names_are_rejected(name):
+    with pytest.raises(universes.UnknownUniverseError):
+        universes.get_universe(name)
+
+
+def test_bundled_universe_loads():
+    assert len(universes.get_universe("nifty25")) == 25
+
+
+def test_route_rejects_path_traversal(tmp_path):
+    (tmp_path / "notes.txt").write_text("SECRET\n")
+    traversal = f"../../../../../../..{tmp_path}/notes"
+    response = app.test_client().get(f"/api/momentum-analysis/5d?universe={traversal}")
+    assert response.status_code == 400
+    assert "SECRET" not in response.get_data(as_text=True)
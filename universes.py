@@ -0,0 +1,123 @@
+import os
+import re
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the bundled universe files (<name>.txt)
+UNIVERSE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes")
+
+# Optional extra directory for custom universes, searched first
+CUSTOM_UNIVERSE_DIR = os.environ.get("UNIVERSE_DIR")
+
+DEFAULT_UNIVERSE = "nifty25"
+
+# Universes the application knows about even if their file is not present.
+# The Nifty 500 list is not bundled; drop a nifty500.txt into UNIVERSE_DIR or
+# CUSTOM_UNIVERSE_DIR to enable it.
+KNOWN_UNIVERSES = ["nifty25", "nifty100", "nifty500"]
+
+
+# Universe names double as file names, so they must not contain path separators
+_UNIVERSE_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class UnknownUniverseError(ValueError):
+    """Raised when a universe name has no symbol list"""
+
+
+_registered = {}
+_cache = {}
+_lock = threading.Lock()
+
+
+def _search_dirs():
+    return [directory for directory in (CUSTOM_UNIVERSE_DIR, UNIVERSE_DIR) if directory]
+
+
+def _universe_path(name):
+    for directory in _search_dirs():
+        path = os.path.join(directory, f"{name}.txt")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _read_universe_file(path):
+    """Read one symbol per line, ignoring blank lines and # comments"""
+    symbols = []
+    seen = set()
+    with open(path, "r") as f:
+        for line in f:
+            symbol = line.split("#", 1)[0].strip()
+            if symbol and symbol not in seen:
+                seen.add(symbol)
+                symbols.append(symbol)
+    return symbols
+
+
+def register_universe(name, symbols):
+    """
+    Register an in-memory universe
+
+    Args:
+        name: Universe name
+        symbols: List of symbols
+    """
+    with _lock:
+        _registered[name] = list(symbols)
+        _cache.pop(name, None)
+
+
+def available_universes():
+    """
+    List the universes that can be loaded
+
+    Returns:
+        Sorted list of universe names with a symbol list
+    """
+    names = set(_registered)
+    for directory in _search_dirs():
+        if os.path.isdir(directory):
+            names.update(entry[:-4] for entry in os.listdir(directory) if entry.endswith(".txt"))
+    return sorted(names)
+
+
+def get_universe(name=None):
+    """
+    Return the symbols of a universe
+
+    Args:
+        name: Universe name (default: DEFAULT_UNIVERSE)
+
+    Returns:
+        List of symbols
+
+    Raises:
+        UnknownUniverseError: If the name is invalid or the universe has no
+            symbol list
+    """
+    name = name or DEFAULT_UNIVERSE
+    if not _UNIVERSE_NAME.match(name):
+        raise UnknownUniverseError(f"Invalid universe name '{name}', use letters, digits, '_' and '-'")
+    with _lock:
+        if name in _registered:
+            return list(_registered[name])
+        if name in _cache:
+            return list(_cache[name])
+
+    path = _universe_path(name)
+    if path is None:
+        if name in KNOWN_UNIVERSES:
+            raise UnknownUniverseError(f"Universe '{name}' is not installed, add {name}.txt to {UNIVERSE_DIR}")
+        raise UnknownUniverseError(f"Unknown universe '{name}', available: {', '.join(available_universes())}")
+
+    symbols = _read_universe_file(path)
+    if not symbols:
+        raise UnknownUniverseError(f"Universe '{name}' is empty")
+
+    logger.info(f"Loaded universe {name} with {len(symbols)} symbols from {path}")
+    with _lock:
+        _cache[name] = symbols
+    return list(symbols)